@@ -9,8 +9,10 @@ from flask_migrate import Migrate
 import os
 from datetime import datetime
 
+from app.services.replica import SesionEnrutada
+
 # Inicializar extensiones
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})  # lecturas marcadas a la réplica
 login_manager = LoginManager()
 migrate = Migrate()
 # mail = Mail()  # Temporarily disabled
@@ -23,6 +25,14 @@ def create_app(config_name='default'):
     from config import config
     app.config.from_object(config[config_name])
     
+    # Pool de conexiones con métricas (antes de que db.init_app cree el engine)
+    from app.services.pool_bd import register_pool_bd
+    register_pool_bd(app)
+    
+    # Réplica de solo lectura para reportes (bind 'replica')
+    from app.services.replica import register_replica
+    register_replica(app)
+    
     # Inicializar extensiones
     db.init_app(app)
     login_manager.init_app(app)
@@ -34,12 +44,44 @@ def create_app(config_name='default'):
     login_manager.login_message = 'Por favor, inicia sesión para acceder a esta página.'
     login_manager.login_message_category = 'info'
     
-    # Callback para cargar usuario
-    from app.models.user import Usuario
+    # Callback para cargar usuario (identidad compacta cacheada en la sesión)
+    from app.services.principal import register_principal
+    register_principal(login_manager)
     
-    @login_manager.user_loader
-    def load_user(user_id):
-        return Usuario.query.get(int(user_id))
+    # Escrituras diferidas (último acceso y auditoría)
+    from app.services.write_behind import register_write_behind
+    register_write_behind(app)
+
+    from app.services.auditoria import register_auditoria
+    register_auditoria(app)
+
+    # Generador de datos sintéticos (flask generar-datos)
+    from app.services.datos_sinteticos import register_datos_sinteticos
+    register_datos_sinteticos(app)
+
+    # Índice de búsqueda por prefijo (autocompletado de tutores y mascotas)
+    from app.services.busqueda import register_busqueda
+    register_busqueda(app)
+
+    # Alertas de inventario por lote (badge del menú y flask escanear-inventario)
+    from app.services.alertas_inventario import register_alertas_inventario
+    register_alertas_inventario(app)
+
+    # Notificaciones masivas y su entrega (flask notificar / enviar-notificaciones)
+    from app.services.notificaciones import register_notificaciones
+    register_notificaciones(app)
+
+    # Eventos en vivo de citas para los veterinarios (SSE)
+    from app.services.eventos import register_eventos
+    register_eventos(app)
+
+    # Tareas programadas con bloqueo por tarea (flask ejecutar-tareas / estado-tareas)
+    from app.services.planificador import register_planificador
+    register_planificador(app)
+
+    # Inicialización explícita de la BD (flask init-db)
+    from app.services.arranque import register_arranque
+    register_arranque(app)
     
     # Registrar blueprints
     from app.controllers.auth_controller import auth_bp
@@ -52,6 +94,18 @@ def create_app(config_name='default'):
     app.register_blueprint(veterinario_bp, url_prefix='/veterinario')
     app.register_blueprint(tutor_bp, url_prefix='/tutor')
     
+    # Assets estáticos con huella y caché de larga duración
+    from app.services.assets import register_assets
+    register_assets(app)
+    
+    # Compresión gzip/brotli y ETags para HTML/JSON
+    from app.services.compresion import register_compresion
+    register_compresion(app)
+    
+    # Conteo de consultas por request (pruebas de carga)
+    from app.services.perfil_consultas import register_perfil_consultas
+    register_perfil_consultas(app)
+    
     # Ruta principal (Landing Page)
     @app.route('/')
     def index():
@@ -112,7 +166,7 @@ def create_app(config_name='default'):
 def init_database():
     """Inicializa la base de datos con datos de ejemplo"""
     from app.models import Usuario, Servicio, Medicamento, ConfiguracionSistema
-    from werkzeug.security import generate_password_hash
+    from app.services.carga_masiva import upsert_por_clave
     
     # Crear usuario administrador por defecto
     admin = Usuario.query.filter_by(username='admin').first()
@@ -142,11 +196,7 @@ def init_database():
         {'codigo': 'DESP-01', 'nombre': 'Desparasitación', 'categoria': 'tratamiento', 'precio': 25.00, 'duracion_estimada': 15}
     ]
     
-    for servicio_data in servicios_base:
-        servicio = Servicio.query.filter_by(codigo=servicio_data['codigo']).first()
-        if not servicio:
-            servicio = Servicio(**servicio_data)
-            db.session.add(servicio)
+    upsert_por_clave(Servicio, 'codigo', servicios_base)
     
     # Configuraciones del sistema
     configuraciones = [
@@ -160,11 +210,7 @@ def init_database():
         {'clave': 'direccion_clinica', 'valor': 'Av. Principal #123, La Paz, Bolivia', 'tipo': 'string', 'descripcion': 'Dirección de la clínica'}
     ]
     
-    for config_data in configuraciones:
-        config = ConfiguracionSistema.query.filter_by(clave=config_data['clave']).first()
-        if not config:
-            config = ConfiguracionSistema(**config_data)
-            db.session.add(config)
+    upsert_por_clave(ConfiguracionSistema, 'clave', configuraciones)
     
     db.session.commit()
     print("Base de datos inicializada con datos de ejemplo")
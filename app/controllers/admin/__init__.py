@@ -12,6 +12,7 @@ from .pagos_controller import pagos_bp
 from .reportes_controller import reportes_bp
 from .perfil_controller import perfil_bp
 from .servicios_controller import servicios_bp
+from .busqueda_controller import busqueda_bp
 
 def register_admin_blueprints(app):
     """Registra todos los blueprints del modulo admin"""
@@ -28,5 +29,6 @@ def register_admin_blueprints(app):
     app.register_blueprint(reportes_bp, url_prefix='/admin/reportes')
     app.register_blueprint(perfil_bp, url_prefix='/admin')
     app.register_blueprint(servicios_bp, url_prefix='/admin')
+    app.register_blueprint(busqueda_bp, url_prefix='/admin')
     
     print("[OK] Modulo admin registrado correctamente")
@@ -1,7 +1,7 @@
 """
 Controlador de APIs para Estadísticas
 """
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from datetime import datetime
 from sqlalchemy import func
 from app import db
@@ -35,3 +35,36 @@ def estadisticas_especies():
         'especie': e.especie,
         'cantidad': e.cantidad
     } for e in especies])
+
+
+@api_bp.route('/api/metricas/compresion')
+@admin_required
+def metricas_compresion():
+    """API con el ratio de compresión y respuestas 304 por endpoint"""
+    from app.services.compresion import metricas_compresion as metricas
+    return jsonify(metricas.resumen())
+
+
+@api_bp.route('/api/auditoria')
+@admin_required
+def auditoria():
+    """API del visor de auditoría filtrada por entidad, usuario, acción y rango de fechas"""
+    from app.services.auditoria import consultar_auditoria
+
+    def _fecha(valor):
+        try:
+            return datetime.fromisoformat(valor) if valor else None
+        except ValueError:
+            return None
+
+    registros = consultar_auditoria(
+        entidad=request.args.get('entidad') or None,
+        entidad_id=request.args.get('entidad_id', type=int),
+        desde=_fecha(request.args.get('desde')),
+        hasta=_fecha(request.args.get('hasta')),
+        usuario_id=request.args.get('usuario_id', type=int),
+        accion=request.args.get('accion') or None,
+        limite=min(request.args.get('limite', 50, type=int), 500),
+        incluir_archivo=request.args.get('archivo') == '1',
+    )
+    return jsonify(registros)
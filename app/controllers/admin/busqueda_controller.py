@@ -0,0 +1,128 @@
+"""
+Controlador de Búsqueda Global
+Un solo endpoint para encontrar tutores, mascotas, citas y pagos por nombre, cédula,
+teléfono, chip, código de pago o número de factura (índice de services/busqueda.py)
+"""
+import re
+
+from flask import Blueprint, jsonify, request, url_for
+from sqlalchemy.orm import joinedload
+
+from app.models import Cita, Mascota, Pago, Usuario
+from app.services.busqueda import buscar_pagina
+from .utils import admin_required
+
+busqueda_bp = Blueprint('admin_busqueda', __name__)
+
+TIPOS = ('usuario', 'mascota', 'cita', 'pago')
+POR_PAGINA = 5
+MAX_POR_PAGINA = 50
+MAX_PAGINAS = 20  # el ranking se calcula sobre los primeros resultados; más allá, refinar la búsqueda
+
+# Hasta 9 dígitos: cabe en un INTEGER de SQL Server; números más largos (teléfonos, códigos) no son citas
+_NUMERO_CITA = re.compile(r'^(?:cita\s*)?#?\s*(\d{1,9})$', re.IGNORECASE)
+
+
+def _cargar(modelo, ids, *opciones):
+    """Objetos en el orden de relevancia de `ids`"""
+    if not ids:
+        return []
+    objetos = {o.id: o for o in modelo.query.options(*opciones).filter(modelo.id.in_(ids))}
+    return [objetos[i] for i in ids if i in objetos]
+
+
+def _usuario(usuario):
+    if usuario.rol == 'tutor':
+        url = url_for('admin_tutores.ver', tutor_id=usuario.id)
+    elif usuario.rol == 'veterinario':
+        url = url_for('admin_veterinarios.ver', vet_id=usuario.id)
+    else:
+        url = None
+    detalles = [usuario.email, usuario.cedula and f'CI {usuario.cedula}', usuario.telefono]
+    return {
+        'tipo': usuario.rol,
+        'id': usuario.id,
+        'titulo': usuario.nombre_completo,
+        'detalle': ' · '.join(d for d in detalles if d),
+        'url': url,
+    }
+
+
+def _mascota(mascota):
+    detalles = [mascota.especie, mascota.raza,
+                mascota.chip_identificacion and f'chip {mascota.chip_identificacion}',
+                mascota.tutor and f'tutor {mascota.tutor.nombre_completo}']
+    return {
+        'tipo': 'mascota',
+        'id': mascota.id,
+        'titulo': mascota.nombre,
+        'detalle': ' · '.join(d for d in detalles if d),
+        'url': url_for('admin_mascotas.ver', mascota_id=mascota.id),
+    }
+
+
+def _cita(cita):
+    return {
+        'tipo': 'cita',
+        'id': cita.id,
+        'titulo': f'Cita #{cita.id}' + (f' - {cita.mascota.nombre}' if cita.mascota else ''),
+        'detalle': f"{cita.fecha.strftime('%d/%m/%Y %H:%M')} · {cita.estado}",
+        'url': url_for('admin_mascotas.ver', mascota_id=cita.mascota_id),
+    }
+
+
+def _pago(pago):
+    detalles = [f'Bs. {pago.monto:,.2f}', pago.estado,
+                pago.numero_factura and f'factura {pago.numero_factura}',
+                pago.usuario and pago.usuario.nombre_completo]
+    return {
+        'tipo': 'pago',
+        'id': pago.id,
+        'titulo': pago.codigo_pago,
+        'detalle': ' · '.join(d for d in detalles if d),
+        'url': url_for('pagos.ver', pago_id=pago.id),
+    }
+
+
+def _grupo(tipo, texto, pagina, por_pagina):
+    """(resultados, hay más) de un tipo"""
+    if tipo == 'cita':
+        # Las citas no tienen campos de texto propios: se buscan por número (#123)
+        numero = _NUMERO_CITA.match(texto.strip())
+        cita = Cita.query.options(joinedload(Cita.mascota)).get(int(numero.group(1))) if numero else None
+        return ([_cita(cita)] if cita and pagina == 1 else []), False
+
+    ids, hay_mas = buscar_pagina(tipo, texto, pagina, por_pagina)
+    if tipo == 'usuario':
+        return [_usuario(u) for u in _cargar(Usuario, ids)], hay_mas
+    if tipo == 'mascota':
+        return [_mascota(m) for m in _cargar(Mascota, ids, joinedload(Mascota.tutor))], hay_mas
+    return [_pago(p) for p in _cargar(Pago, ids, joinedload(Pago.usuario))], hay_mas
+
+
+@busqueda_bp.route('/buscar')
+@admin_required
+def buscar():
+    """
+    Búsqueda global (JSON)
+
+    Parámetros: q, tipo (usuario, mascota, cita o pago; por defecto todos),
+    pagina y por_pagina (por tipo).
+    """
+    texto = request.args.get('q', '').strip()
+    tipo = request.args.get('tipo')
+    pagina = min(max(request.args.get('pagina', 1, type=int), 1), MAX_PAGINAS)
+    por_pagina = min(max(request.args.get('por_pagina', POR_PAGINA, type=int), 1), MAX_POR_PAGINA)
+
+    tipos = [tipo] if tipo in TIPOS else list(TIPOS)
+    grupos = []
+    if len(texto) >= 2:
+        for nombre in tipos:
+            resultados, hay_mas = _grupo(nombre, texto, pagina, por_pagina)
+            if not resultados and pagina == 1 and len(tipos) > 1:
+                continue
+            siguiente = url_for('admin_busqueda.buscar', q=texto, tipo=nombre, pagina=pagina + 1,
+                                por_pagina=por_pagina) if hay_mas and pagina < MAX_PAGINAS else None
+            grupos.append({'tipo': nombre, 'resultados': resultados, 'siguiente': siguiente})
+
+    return jsonify({'q': texto, 'pagina': pagina, 'por_pagina': por_pagina, 'grupos': grupos})
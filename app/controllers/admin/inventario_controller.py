@@ -5,9 +5,11 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from functools import wraps
 from datetime import datetime, timedelta, date
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, or_
 from app import db
 from app.models import Medicamento
+from app.services import alertas_inventario
+from app.services.paginacion import paginar_keyset
 
 inventario_bp = Blueprint('inventario', __name__)
 
@@ -28,7 +30,7 @@ def admin_required(f):
 @admin_required
 def lista():
     """Lista de medicamentos con filtros"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     search = request.args.get('search', '', type=str)
     categoria = request.args.get('categoria', '', type=str)
     estado = request.args.get('estado', '', type=str)
@@ -50,26 +52,17 @@ def lista():
     if categoria:
         query = query.filter(Medicamento.categoria == categoria)
 
-    # Filtrar por estado
-    if estado == 'bajo_stock':
-        query = query.filter(Medicamento.stock_actual <= Medicamento.stock_minimo)
-    elif estado == 'por_vencer':
-        fecha_limite = date.today() + timedelta(days=30)
-        query = query.filter(
-            and_(
-                Medicamento.fecha_vencimiento <= fecha_limite,
-                Medicamento.fecha_vencimiento > date.today()
-            )
-        )
-    elif estado == 'vencido':
-        query = query.filter(Medicamento.fecha_vencimiento <= date.today())
+    # Filtrar por estado (bajo stock y vencimientos por lote: alertas materializadas)
+    if estado in ('bajo_stock', 'por_vencer', 'vencido'):
+        query = query.filter(Medicamento.id.in_(alertas_inventario.ids_con_alerta(estado)))
     elif estado == 'activo':
         query = query.filter(Medicamento.activo == True)
     elif estado == 'inactivo':
         query = query.filter(Medicamento.activo == False)
 
-    medicamentos = query.order_by(Medicamento.nombre.asc()).paginate(
-        page=page, per_page=15, error_out=False
+    medicamentos = paginar_keyset(
+        query, [(Medicamento.nombre, False), (Medicamento.id, False)],
+        cursor=cursor, per_page=15
     )
 
     # Obtener categorías únicas para el filtro
@@ -79,22 +72,15 @@ def lista():
     categorias = [c[0] for c in categorias if c[0]]
 
     # Estadísticas rápidas
+    conteos = alertas_inventario.conteos()
     stats = {
         'total': Medicamento.query.count(),
         'activos': Medicamento.query.filter_by(activo=True).count(),
-        'bajo_stock': Medicamento.query.filter(
-            Medicamento.stock_actual <= Medicamento.stock_minimo
-        ).count(),
-        'por_vencer': Medicamento.query.filter(
-            and_(
-                Medicamento.fecha_vencimiento <= date.today() + timedelta(days=30),
-                Medicamento.fecha_vencimiento > date.today()
-            )
-        ).count(),
-        'vencidos': Medicamento.query.filter(
-            Medicamento.fecha_vencimiento <= date.today()
-        ).count()
+        'bajo_stock': conteos['bajo_stock'],
+        'por_vencer': conteos['por_vencer'],
+        'vencidos': conteos['vencido']
     }
+    alertas = alertas_inventario.tipos_por_medicamento([m.id for m in medicamentos.items])
 
     return render_template(
         'admin/inventario/lista.html',
@@ -103,7 +89,8 @@ def lista():
         search=search,
         categoria=categoria,
         estado=estado,
-        stats=stats
+        stats=stats,
+        alertas=alertas
     )
 
 
@@ -326,28 +313,10 @@ def eliminar(med_id):
 @inventario_bp.route('/alertas')
 @admin_required
 def alertas():
-    """Vista de alertas de inventario"""
-    # Medicamentos con bajo stock
-    bajo_stock = Medicamento.query.filter(
-        Medicamento.stock_actual <= Medicamento.stock_minimo,
-        Medicamento.activo == True
-    ).all()
-
-    # Medicamentos por vencer (próximos 30 días)
-    fecha_limite = date.today() + timedelta(days=30)
-    por_vencer = Medicamento.query.filter(
-        and_(
-            Medicamento.fecha_vencimiento <= fecha_limite,
-            Medicamento.fecha_vencimiento > date.today(),
-            Medicamento.activo == True
-        )
-    ).all()
-
-    # Medicamentos vencidos
-    vencidos = Medicamento.query.filter(
-        Medicamento.fecha_vencimiento <= date.today(),
-        Medicamento.activo == True
-    ).all()
+    """Vista de alertas de inventario (por lote, calculadas por services/alertas_inventario.py)"""
+    vencidos = alertas_inventario.alertas('vencido')
+    por_vencer = alertas_inventario.alertas('por_vencer')
+    bajo_stock = alertas_inventario.alertas('bajo_stock')
 
     return render_template(
         'admin/inventario/alertas.html',
@@ -6,13 +6,15 @@ from flask_login import login_required, current_user
 from functools import wraps
 from datetime import datetime, timedelta, date
 from sqlalchemy import func, and_, or_, extract
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Pago, HistorialPago, Cita, Usuario
 from io import BytesIO
 import base64
-import plotly.express as px
-import plotly.io as pio
-import pandas as pd
+from app.services.busqueda import buscar_modelos
+from app.services.carga_diferida import dataframe, grafico_html, plotly_express
+from app.services.paginacion import paginar_keyset
+from app.services.replica import solo_lectura
 
 pagos_bp = Blueprint('pagos', __name__)
 
@@ -31,6 +33,7 @@ def admin_required(f):
 
 @pagos_bp.route('/')
 @admin_required
+@solo_lectura
 def dashboard():
     """Dashboard principal de pagos e ingresos"""
     # Obtener rango de fechas (por defecto último mes)
@@ -121,7 +124,8 @@ def dashboard():
 
     # Generar gráfico de Métodos de Pago con Plotly
     if ingresos_por_metodo:
-        df_metodos = pd.DataFrame(ingresos_por_metodo, columns=['Metodo', 'Cantidad', 'Total'])
+        px = plotly_express()
+        df_metodos = dataframe(ingresos_por_metodo, columns=['Metodo', 'Cantidad', 'Total'])
         # Mapeo de nombres de métodos para mejor visualización
         metodos_labels = {
             'efectivo': 'Efectivo',
@@ -145,7 +149,7 @@ def dashboard():
         )
         fig_metodos.update_traces(textposition='inside', textinfo='percent', textfont_size=12,
                                   marker=dict(line=dict(color='#ffffff', width=2)))
-        graph_metodos = pio.to_html(fig_metodos, full_html=False, config={'displayModeBar': False})
+        graph_metodos = grafico_html(fig_metodos)
     else:
         graph_metodos = "<div class='text-center text-muted py-5'>No hay datos disponibles</div>"
 
@@ -163,7 +167,8 @@ def dashboard():
 
     # Generar gráfico de Ingresos por Día con Plotly
     if ingresos_por_dia:
-        df_dia = pd.DataFrame(ingresos_por_dia, columns=['Fecha', 'Total'])
+        px = plotly_express()
+        df_dia = dataframe(ingresos_por_dia, columns=['Fecha', 'Total'])
         fig_dia = px.area(df_dia, x='Fecha', y='Total', markers=True,
                           line_shape='spline')
         fig_dia.update_traces(
@@ -193,7 +198,7 @@ def dashboard():
             tickfont=dict(size=10, color='#6c757d'),
             tickprefix='Bs. '
         )
-        graph_dia = pio.to_html(fig_dia, full_html=False, config={'displayModeBar': False})
+        graph_dia = grafico_html(fig_dia)
     else:
         graph_dia = "<div class='text-center text-muted py-5'>No hay datos disponibles</div>"
 
@@ -247,12 +252,10 @@ def listar():
             )
         )
 
-    # Paginación
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
-
-    pagos = query.order_by(Pago.fecha_creacion.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    # Paginación por llave (fecha_creacion, id): cualquier página cuesta lo mismo
+    pagos = paginar_keyset(
+        query, [(Pago.fecha_creacion, True), (Pago.id, True)],
+        cursor=request.args.get('cursor'), per_page=20
     )
 
     return render_template(
@@ -326,11 +329,11 @@ def crear():
             return redirect(url_for('pagos.crear'))
 
     # GET - Mostrar formulario
-    # Obtener usuarios (tutores) para el dropdown
-    usuarios = Usuario.query.filter_by(rol='tutor', activo=True).order_by(Usuario.nombre).all()
-
+    # El cliente se elige con el autocompletado (api_buscar_usuario), no con la lista de todos los tutores
     # Obtener citas pendientes de pago
-    citas_pendientes = Cita.query.filter(
+    citas_pendientes = Cita.query.options(
+        joinedload(Cita.mascota), joinedload(Cita.tutor)
+    ).filter(
         and_(
             Cita.pagado == False,
             Cita.estado.in_(['completada', 'pendiente'])
@@ -339,7 +342,6 @@ def crear():
 
     return render_template(
         'admin/pagos/crear.html',
-        usuarios=usuarios,
         citas_pendientes=citas_pendientes
     )
 
@@ -541,20 +543,13 @@ def obtener_qr_image(pago_id):
 @pagos_bp.route('/api/buscar-usuario')
 @admin_required
 def api_buscar_usuario():
-    """API para buscar usuarios (para autocompletado)"""
+    """API para buscar tutores (autocompletado por prefijo, ver services/busqueda.py)"""
     busqueda = request.args.get('q', '')
 
-    usuarios = Usuario.query.filter(
-        and_(
-            Usuario.rol == 'tutor',
-            Usuario.activo == True,
-            or_(
-                Usuario.nombre.contains(busqueda),
-                Usuario.apellido.contains(busqueda),
-                Usuario.email.contains(busqueda)
-            )
-        )
-    ).limit(10).all()
+    usuarios = buscar_modelos(
+        'usuario', busqueda, limite=10,
+        filtros=(Usuario.rol == 'tutor', Usuario.activo == True)
+    )
 
     resultados = [{
         'id': u.id,
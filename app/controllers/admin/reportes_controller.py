@@ -8,8 +8,10 @@ from datetime import datetime, timedelta, date
 from sqlalchemy import func, and_, or_, extract
 from app import db
 from app.models import Usuario, Mascota, Cita, Medicamento, Servicio, HistorialClinico
-import pandas as pd
-from io import BytesIO
+from app.models.user import BLOQUE_IDS
+from app.services import alertas_inventario
+from app.services.carga_diferida import dataframe, excel_en_memoria, grafico_html, plotly_express
+from app.services.replica import solo_lectura
 
 reportes_bp = Blueprint('reportes', __name__)
 
@@ -28,6 +30,7 @@ def admin_required(f):
 
 @reportes_bp.route('/')
 @admin_required
+@solo_lectura
 def dashboard():
     """Dashboard principal de reportes"""
     # Obtener rango de fechas (por defecto último mes)
@@ -58,8 +61,7 @@ def dashboard():
     }
 
     # --- GENERACIÓN DE GRÁFICOS CON PLOTLY ---
-    import plotly.express as px
-    import plotly.io as pio
+    px = plotly_express()
 
     # 1. Citas por estado
     citas_por_estado = db.session.query(
@@ -73,7 +75,7 @@ def dashboard():
     ).group_by(Cita.estado).all()
 
     if citas_por_estado:
-        df_estado = pd.DataFrame(citas_por_estado, columns=['Estado', 'Cantidad'])
+        df_estado = dataframe(citas_por_estado, columns=['Estado', 'Cantidad'])
         df_estado['Estado'] = df_estado['Estado'].str.title()
         fig_estado = px.pie(df_estado, values='Cantidad', names='Estado', hole=0.45,
                             color_discrete_sequence=['#26A69A', '#FFA726', '#42A5F5', '#EF5350', '#66BB6A'])
@@ -86,7 +88,7 @@ def dashboard():
         )
         fig_estado.update_traces(textposition='inside', textinfo='percent+label', textfont_size=10,
                                 marker=dict(line=dict(color='#ffffff', width=2)))
-        graph_estado = pio.to_html(fig_estado, full_html=False, config={'displayModeBar': False})
+        graph_estado = grafico_html(fig_estado)
     else:
         graph_estado = "<div class='text-center text-muted py-5'>No hay datos disponibles</div>"
 
@@ -101,7 +103,7 @@ def dashboard():
     ).group_by(extract('year', Cita.fecha), extract('month', Cita.fecha)).order_by(extract('year', Cita.fecha), extract('month', Cita.fecha)).all()
 
     if citas_por_mes:
-        df_mes = pd.DataFrame(citas_por_mes, columns=['Año', 'Mes', 'Total'])
+        df_mes = dataframe(citas_por_mes, columns=['Año', 'Mes', 'Total'])
         df_mes['Periodo'] = df_mes.apply(lambda x: f"{int(x['Mes'])}/{int(x['Año'])}", axis=1)
         fig_mes = px.area(df_mes, x='Periodo', y='Total', markers=True,
                           line_shape='spline')
@@ -122,7 +124,7 @@ def dashboard():
         )
         fig_mes.update_xaxes(showgrid=False, tickfont=dict(size=10, color='#6c757d'))
         fig_mes.update_yaxes(showgrid=True, gridcolor='rgba(0,0,0,0.06)', tickfont=dict(size=10, color='#6c757d'))
-        graph_mes = pio.to_html(fig_mes, full_html=False, config={'displayModeBar': False})
+        graph_mes = grafico_html(fig_mes)
     else:
         graph_mes = "<div class='text-center text-muted py-5'>No hay datos disponibles</div>"
 
@@ -140,7 +142,7 @@ def dashboard():
     ).group_by(extract('year', Pago.fecha_pago), extract('month', Pago.fecha_pago)).order_by(extract('year', Pago.fecha_pago), extract('month', Pago.fecha_pago)).all()
 
     if ingresos_por_mes:
-        df_ingresos = pd.DataFrame(ingresos_por_mes, columns=['Año', 'Mes', 'Total'])
+        df_ingresos = dataframe(ingresos_por_mes, columns=['Año', 'Mes', 'Total'])
         df_ingresos['Periodo'] = df_ingresos.apply(lambda x: f"{int(x['Mes'])}/{int(x['Año'])}", axis=1)
         fig_ingresos = px.bar(df_ingresos, x='Periodo', y='Total', text='Total')
         fig_ingresos.update_traces(
@@ -164,7 +166,7 @@ def dashboard():
         )
         fig_ingresos.update_xaxes(showgrid=False, tickfont=dict(size=10, color='#6c757d'))
         fig_ingresos.update_yaxes(showgrid=True, gridcolor='rgba(0,0,0,0.06)', tickfont=dict(size=10, color='#6c757d'))
-        graph_ingresos = pio.to_html(fig_ingresos, full_html=False, config={'displayModeBar': False})
+        graph_ingresos = grafico_html(fig_ingresos)
     else:
         graph_ingresos = "<div class='text-center text-muted py-5'>No hay datos disponibles</div>"
 
@@ -182,11 +184,8 @@ def dashboard():
         )
     ).group_by(Usuario.id, Usuario.nombre, Usuario.apellido).order_by(func.count(Cita.id).desc()).limit(5).all()
 
-    # Medicamentos con bajo stock
-    medicamentos_bajo_stock = Medicamento.query.filter(
-        Medicamento.stock_actual <= Medicamento.stock_minimo,
-        Medicamento.activo == True
-    ).count()
+    # Medicamentos con bajo stock (alertas materializadas)
+    medicamentos_bajo_stock = alertas_inventario.conteos()['bajo_stock']
 
     return render_template(
         'admin/reportes/dashboard.html',
@@ -203,6 +202,7 @@ def dashboard():
 
 @reportes_bp.route('/tutores')
 @admin_required
+@solo_lectura
 def tutores():
     """Reporte detallado de tutores y sus mascotas"""
     # Obtener todos los tutores con sus mascotas
@@ -210,18 +210,29 @@ def tutores():
 
     tutores = Usuario.query.filter_by(rol='tutor', activo=True).order_by(Usuario.nombre).all()
 
+    # Mascotas activas y citas por mascota por lotes de tutores (antes dos consultas por tutor y una por mascota)
+    mascotas_por_tutor = {}
+    citas_por_mascota = {}
+    ids = [tutor.id for tutor in tutores]
+    for i in range(0, len(ids), BLOQUE_IDS):
+        lote = ids[i:i + BLOQUE_IDS]
+        for mascota in Mascota.query.filter(Mascota.tutor_id.in_(lote), Mascota.activo == True).order_by(Mascota.id):
+            mascotas_por_tutor.setdefault(mascota.tutor_id, []).append(mascota)
+        citas_por_mascota.update(db.session.query(Cita.mascota_id, func.count(Cita.id)).join(
+            Mascota, Cita.mascota_id == Mascota.id
+        ).filter(
+            Mascota.tutor_id.in_(lote), Mascota.activo == True
+        ).group_by(Cita.mascota_id).all())
+
     for tutor in tutores:
         mascotas_list = []
-        for mascota in tutor.mascotas.filter_by(activo=True).all():
-            # Contar citas por mascota
-            total_citas = Cita.query.filter_by(mascota_id=mascota.id).count()
-
+        for mascota in mascotas_por_tutor.get(tutor.id, []):
             mascotas_list.append({
                 'nombre': mascota.nombre,
                 'especie': mascota.especie,
                 'raza': mascota.raza or 'N/A',
                 'edad': mascota.edad_detallada,
-                'total_citas': total_citas
+                'total_citas': citas_por_mascota.get(mascota.id, 0)
             })
 
         tutores_data.append({
@@ -242,17 +253,23 @@ def tutores():
 
 @reportes_bp.route('/veterinarios')
 @admin_required
+@solo_lectura
 def veterinarios():
     """Reporte de desempeño de veterinarios"""
     veterinarios_data = []
 
     vets = Usuario.query.filter_by(rol='veterinario', activo=True).order_by(Usuario.nombre).all()
 
+    # Una consulta agrupada para todos los veterinarios (antes seis por veterinario)
+    try:
+        estadisticas = Usuario.estadisticas_veterinarios([vet.id for vet in vets])
+    except Exception as e:
+        print(f"Error al obtener estadísticas de los veterinarios: {e}")
+        estadisticas = {}
+
     for vet in vets:
-        try:
-            stats = vet.get_estadisticas_veterinario()
-        except Exception as e:
-            print(f"Error al obtener estadísticas del veterinario {vet.id}: {e}")
+        stats = estadisticas.get(vet.id)
+        if stats is None:
             stats = {
                 'total_citas': 0,
                 'citas_pendientes': 0,
@@ -279,25 +296,18 @@ def veterinarios():
 
 @reportes_bp.route('/inventario')
 @admin_required
+@solo_lectura
 def inventario():
     """Reporte de inventario"""
-    # Estadísticas de inventario
+    # Estadísticas de inventario (vencimientos por lote: alertas materializadas)
+    conteos = alertas_inventario.conteos()
     stats = {
         'total_items': Medicamento.query.filter_by(activo=True).count(),
         'valor_total': db.session.query(
             func.sum(Medicamento.stock_actual * Medicamento.precio_compra)
         ).filter(Medicamento.activo == True).scalar() or 0,
-        'bajo_stock': Medicamento.query.filter(
-            Medicamento.stock_actual <= Medicamento.stock_minimo,
-            Medicamento.activo == True
-        ).count(),
-        'por_vencer': Medicamento.query.filter(
-            and_(
-                Medicamento.fecha_vencimiento <= date.today() + timedelta(days=30),
-                Medicamento.fecha_vencimiento > date.today(),
-                Medicamento.activo == True
-            )
-        ).count()
+        'bajo_stock': conteos['bajo_stock'],
+        'por_vencer': conteos['por_vencer']
     }
 
     # Medicamentos por categoría
@@ -326,6 +336,7 @@ def inventario():
 
 @reportes_bp.route('/citas')
 @admin_required
+@solo_lectura
 def citas():
     """Reporte de citas"""
     # Obtener rango de fechas
@@ -384,15 +395,19 @@ def citas():
 
 @reportes_bp.route('/exportar/tutores')
 @admin_required
+@solo_lectura
 def exportar_tutores():
     """Exportar reporte de tutores a Excel"""
     try:
         # Obtener datos
         tutores = Usuario.query.filter_by(rol='tutor', activo=True).all()
 
+        # Cantidad y nombres de mascotas de todos los tutores, agrupados en la BD
+        mascotas = Usuario.resumen_mascotas_tutores([t.id for t in tutores], solo_activas=True)
+
         data = []
         for tutor in tutores:
-            mascotas_nombres = ', '.join([m.nombre for m in tutor.mascotas.filter_by(activo=True).all()])
+            resumen = mascotas[tutor.id]
 
             data.append({
                 'ID': tutor.id,
@@ -401,20 +416,14 @@ def exportar_tutores():
                 'Teléfono': tutor.telefono or 'N/A',
                 'Dirección': tutor.direccion or 'N/A',
                 'Ciudad': tutor.ciudad or 'N/A',
-                'Total Mascotas': tutor.mascotas.filter_by(activo=True).count(),
-                'Nombres de Mascotas': mascotas_nombres,
+                'Total Mascotas': resumen['total_mascotas'],
+                'Nombres de Mascotas': ', '.join(resumen['nombres']),
                 'Fecha Registro': tutor.fecha_registro.strftime('%d/%m/%Y') if tutor.fecha_registro else 'N/A'
             })
 
         # Crear DataFrame
-        df = pd.DataFrame(data)
-
         # Crear archivo Excel en memoria
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Tutores', index=False)
-
-        output.seek(0)
+        output = excel_en_memoria(data, 'Tutores')
 
         return send_file(
             output,
@@ -430,6 +439,7 @@ def exportar_tutores():
 
 @reportes_bp.route('/exportar/inventario')
 @admin_required
+@solo_lectura
 def exportar_inventario():
     """Exportar reporte de inventario a Excel"""
     try:
@@ -455,13 +465,8 @@ def exportar_inventario():
                 'Vencido': 'SÍ' if med.esta_vencido else 'NO'
             })
 
-        df = pd.DataFrame(data)
-
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Inventario', index=False)
-
-        output.seek(0)
+        # Crear archivo Excel en memoria
+        output = excel_en_memoria(data, 'Inventario')
 
         return send_file(
             output,
@@ -2,9 +2,11 @@
 Controlador CRUD para Tutores
 """
 from flask import Blueprint, render_template, redirect, url_for, flash, request
-from sqlalchemy import or_
 from app import db
 from app.models import Usuario, Mascota, Cita
+from app.services.busqueda import ids_coincidentes
+from app.services.eliminacion import eliminar_tutor
+from app.services.paginacion import paginar_keyset
 from .utils import admin_required, registrar_auditoria
 
 tutores_bp = Blueprint('admin_tutores', __name__)
@@ -13,30 +15,27 @@ tutores_bp = Blueprint('admin_tutores', __name__)
 @admin_required
 def lista():
     """Lista de tutores con sus mascotas"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     search = request.args.get('search', '')
     
     query = Usuario.query.filter_by(rol='tutor')
     
     if search:
-        query = query.filter(
-            or_(
-                Usuario.nombre.ilike(f'%{search}%'),
-                Usuario.apellido.ilike(f'%{search}%'),
-                Usuario.email.ilike(f'%{search}%')
-            )
-        )
+        query = query.filter(Usuario.id.in_(ids_coincidentes('usuario', search)))
     
-    tutores = query.order_by(Usuario.nombre.asc()).paginate(page=page, per_page=10, error_out=False)
+    tutores = paginar_keyset(
+        query, [(Usuario.nombre, False), (Usuario.id, False)], cursor=cursor, per_page=10
+    )
     
-    # Calcular total de mascotas de forma segura
+    # Total de mascotas de la página en una sola consulta, de forma segura
     if tutores.items:
+        try:
+            resumen = Usuario.resumen_mascotas_tutores([tutor.id for tutor in tutores.items])
+        except Exception as e:
+            print(f"Error al contar mascotas de los tutores: {e}")
+            resumen = {}
         for tutor in tutores.items:
-            try:
-                tutor.total_mascotas = tutor.mascotas.count()
-            except Exception as e:
-                print(f"Error al contar mascotas del tutor {tutor.id}: {e}")
-                tutor.total_mascotas = 0
+            tutor.total_mascotas = resumen.get(tutor.id, {}).get('total_mascotas', 0)
     
     return render_template('admin/tutores/lista.html', tutores=tutores, search=search)
 
@@ -172,29 +171,30 @@ def eliminar(tutor_id):
     
     try:
         nombre_tutor = tutor.nombre_completo
-        total_mascotas = tutor.mascotas.count()
-        
-        # Eliminar mascotas asociadas (esto también eliminará citas, historiales, etc. por CASCADE)
-        for mascota in tutor.mascotas:
-            db.session.delete(mascota)
-        
-        # Eliminar citas del tutor
-        for cita in tutor.citas_como_tutor:
-            db.session.delete(cita)
         
-        # Eliminar el tutor
-        db.session.delete(tutor)
+        # DELETE/UPDATE por conjuntos; con pagos el tutor se anonimiza en lugar de borrarse
+        resultado = eliminar_tutor(tutor)
         
-        # Registrar auditoría
+        # Registrar auditoría con las filas afectadas
+        if resultado.modo == 'eliminado':
+            descripcion = f'Admin eliminó al tutor: {nombre_tutor} ({resultado.resumen()})'
+        else:
+            descripcion = f'Admin anonimizó (tiene pagos) al tutor: {nombre_tutor}'
         registrar_auditoria(
             'eliminar_tutor', 
             'usuario', 
             tutor_id, 
-            f'Admin eliminó al tutor: {nombre_tutor} (con {total_mascotas} mascotas)'
+            descripcion,
+            datos_anteriores={'nombre': nombre_tutor},
+            datos_nuevos=resultado.como_dict()
         )
         
         db.session.commit()
-        flash(f'Tutor "{nombre_tutor}" eliminado exitosamente', 'success')
+        if resultado.modo == 'anonimizado':
+            flash(f'El tutor "{nombre_tutor}" tiene pagos registrados: se anonimizó y desactivó '
+                  f'en lugar de eliminarse', 'info')
+        else:
+            flash(f'Tutor "{nombre_tutor}" eliminado exitosamente ({resultado.resumen()})', 'success')
         
     except Exception as e:
         db.session.rollback()
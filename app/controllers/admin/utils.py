@@ -4,8 +4,7 @@ Utilidades compartidas para el módulo de administración
 from flask import flash, redirect, url_for, request
 from flask_login import login_required, current_user
 from functools import wraps
-from app import db
-from app.models import AuditoriaAccion
+from app.services.auditoria import encolar_auditoria
 
 # --- LISTA DE ESPECIALIDADES VETERINARIAS ---
 LISTA_ESPECIALIDADES = [
@@ -29,29 +28,37 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def datos_auditoria(accion, entidad, entidad_id, descripcion, datos_anteriores=None, datos_nuevos=None):
+    """Arma las columnas de una fila de auditoría a partir del request actual"""
+    import json
+    from datetime import datetime
+
+    # Convertir datos a JSON string si no son None
+    datos_ant_str = json.dumps(datos_anteriores) if datos_anteriores is not None else None
+    datos_new_str = json.dumps(datos_nuevos) if datos_nuevos is not None else None
+
+    # Obtener user agent de forma segura (se normaliza en la tabla user_agents al escribir)
+    user_agent = request.headers.get('User-Agent', 'Unknown') if request and hasattr(request, 'headers') else None
+
+    return {
+        'usuario_id': current_user.id,
+        'accion': accion,
+        'entidad': entidad,
+        'entidad_id': entidad_id,
+        'descripcion': descripcion,
+        'datos_anteriores': datos_ant_str,
+        'datos_nuevos': datos_new_str,
+        'ip_address': request.remote_addr if request and hasattr(request, 'remote_addr') else None,
+        'user_agent': user_agent,
+        'fecha': datetime.utcnow()
+    }
+
 def registrar_auditoria(accion, entidad, entidad_id, descripcion, datos_anteriores=None, datos_nuevos=None):
     """Registra una acción en el sistema de auditoría"""
-    import json
     try:
-        # Convertir datos a JSON string si no son None
-        datos_ant_str = json.dumps(datos_anteriores) if datos_anteriores is not None else None
-        datos_new_str = json.dumps(datos_nuevos) if datos_nuevos is not None else None
-        
-        # Obtener user agent de forma segura
-        user_agent = request.headers.get('User-Agent', 'Unknown')[:255] if request and hasattr(request, 'headers') else None
-        
-        auditoria = AuditoriaAccion(
-            usuario_id=current_user.id,
-            accion=accion,
-            entidad=entidad,
-            entidad_id=entidad_id,
-            descripcion=descripcion,
-            datos_anteriores=datos_ant_str,
-            datos_nuevos=datos_new_str,
-            ip_address=request.remote_addr if request and hasattr(request, 'remote_addr') else None,
-            user_agent=user_agent
-        )
-        db.session.add(auditoria)
-        # El commit se hará junto con la operación principal
+        # Se escribe en lote cuando la operación principal confirma; si hace rollback se descarta
+        encolar_auditoria(datos_auditoria(
+            accion, entidad, entidad_id, descripcion, datos_anteriores, datos_nuevos
+        ))
     except Exception as e:
         print(f"Error al registrar auditoria: {e}")
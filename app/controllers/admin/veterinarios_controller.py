@@ -4,6 +4,8 @@ Controlador CRUD para Veterinarios
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from app import db
 from app.models import Usuario, Cita, Servicio
+from app.services.eliminacion import eliminar_veterinario
+from app.services.paginacion import paginar_keyset
 from .utils import admin_required, registrar_auditoria
 
 veterinarios_bp = Blueprint('admin_veterinarios', __name__)
@@ -12,7 +14,7 @@ veterinarios_bp = Blueprint('admin_veterinarios', __name__)
 @admin_required
 def lista():
     """Lista de veterinarios con estadísticas y filtrado"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     especialidad_filtro = request.args.get('especialidad')
     
     query = Usuario.query.filter_by(rol='veterinario')
@@ -20,25 +22,26 @@ def lista():
     if especialidad_filtro:
         query = query.filter(Usuario.especialidad == especialidad_filtro)
         
-    veterinarios = query.order_by(Usuario.nombre).paginate(
-        page=page, per_page=10, error_out=False
+    veterinarios = paginar_keyset(
+        query, [(Usuario.nombre, False), (Usuario.id, False)], cursor=cursor, per_page=10
     )
     
     # Obtener servicios para el filtro
     servicios = Servicio.query.filter_by(activo=True).order_by(Servicio.nombre).all()
     
-    # Obtener estadísticas de forma segura
+    # Estadísticas de la página en una sola consulta, de forma segura
     if veterinarios.items:
+        try:
+            estadisticas = Usuario.estadisticas_veterinarios([vet.id for vet in veterinarios.items])
+        except Exception as e:
+            print(f"Error al obtener estadísticas de los veterinarios: {e}")
+            estadisticas = {}
         for vet in veterinarios.items:
-            try:
-                vet.stats = vet.get_estadisticas_veterinario()
-            except Exception as e:
-                print(f"Error al obtener estadísticas del veterinario {vet.id}: {e}")
-                vet.stats = {
-                    'citas_completadas': 0,
-                    'citas_pendientes': 0,
-                    'total_citas': 0
-                }
+            vet.stats = estadisticas.get(vet.id) or {
+                'citas_completadas': 0,
+                'citas_pendientes': 0,
+                'total_citas': 0
+            }
     
     return render_template('admin/veterinarios/lista.html', 
                          veterinarios=veterinarios,
@@ -177,25 +180,29 @@ def eliminar(vet_id):
     
     try:
         nombre_vet = veterinario.nombre_completo
-        total_citas = veterinario.citas_como_veterinario.count()
-        
-        # Eliminar citas asociadas
-        for cita in veterinario.citas_como_veterinario:
-            db.session.delete(cita)
         
-        # Eliminar el veterinario
-        db.session.delete(veterinario)
+        # Sus citas abiertas vuelven a pendientes; si ya atendió, se anonimiza en lugar de borrarse
+        resultado = eliminar_veterinario(veterinario)
         
-        # Registrar auditoría
+        # Registrar auditoría con las filas afectadas
+        accion = 'eliminó' if resultado.modo == 'eliminado' else 'anonimizó (tiene historia clínica)'
         registrar_auditoria(
             'eliminar_veterinario', 
             'usuario', 
             vet_id, 
-            f'Admin eliminó al veterinario: {nombre_vet} (con {total_citas} citas)'
+            f'Admin {accion} al veterinario: {nombre_vet}',
+            datos_anteriores={'nombre': nombre_vet},
+            datos_nuevos=resultado.como_dict()
         )
         
         db.session.commit()
-        flash(f'Veterinario "{nombre_vet}" eliminado exitosamente', 'success')
+        reasignadas = resultado.actualizadas.get('citas.reasignadas', 0)
+        if resultado.modo == 'anonimizado':
+            flash(f'El veterinario "{nombre_vet}" tiene atenciones registradas: se anonimizó y '
+                  f'desactivó en lugar de eliminarse ({reasignadas} citas vuelven a pendientes)', 'info')
+        else:
+            flash(f'Veterinario "{nombre_vet}" eliminado exitosamente '
+                  f'({reasignadas} citas vuelven a pendientes)', 'success')
         
     except Exception as e:
         db.session.rollback()
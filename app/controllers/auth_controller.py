@@ -6,6 +6,8 @@ from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
 from app.models import Usuario
+from app.services.principal import guardar_principal, limpiar_principal
+from app.services.write_behind import buffer_escritura
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -33,11 +35,13 @@ def login():
                 return redirect(url_for('auth.login'))
             
             login_user(user, remember=remember)
-            user.actualizar_ultimo_acceso()
+            guardar_principal(user)
             
-            # Registrar en auditoría
-            from app.controllers.admin.utils import registrar_auditoria
-            registrar_auditoria('login', 'usuario', user.id, f'Inicio de sesión: {user.nombre_completo}')
+            # Último acceso y auditoría se escriben en lote fuera del camino crítico
+            from app.controllers.admin.utils import datos_auditoria
+            buffer = buffer_escritura()
+            buffer.registrar_acceso(user.id)
+            buffer.registrar_auditoria(datos_auditoria('login', 'usuario', user.id, f'Inicio de sesión: {user.nombre_completo}'))
             
             flash(f'Bienvenido, {user.nombre}!', 'success')
             
@@ -56,10 +60,13 @@ def login():
 @login_required
 def logout():
     """Cerrar sesión"""
-    from app.controllers.admin.utils import registrar_auditoria
-    registrar_auditoria('logout', 'usuario', current_user.id, f'Cierre de sesión: {current_user.nombre_completo}')
+    from app.controllers.admin.utils import datos_auditoria
+    buffer_escritura().registrar_auditoria(
+        datos_auditoria('logout', 'usuario', current_user.id, f'Cierre de sesión: {current_user.nombre_completo}')
+    )
     
     logout_user()
+    limpiar_principal()
     flash('Has cerrado sesión exitosamente', 'info')
     return redirect(url_for('auth.login'))
 
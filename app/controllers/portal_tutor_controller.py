@@ -14,6 +14,7 @@ from datetime import datetime
 import base64
 import os
 from io import BytesIO
+from app.services.eventos import publicar_cita
 
 tutor_bp = Blueprint('tutor', __name__)
 
@@ -287,6 +288,8 @@ def nueva_cita():
 
         try:
             db.session.add(nueva_cita)
+            db.session.flush()
+            publicar_cita(nueva_cita, 'cita_nueva')
             db.session.commit()
             flash(f'Cita solicitada al Dr. elegido. Costo: Bs. {servicio.precio}. Esperando confirmación del veterinario.', 'success')
             return redirect(url_for('tutor.pagar_cita', cita_id=nueva_cita.id))
@@ -409,6 +412,7 @@ def pagar_cita(cita_id):
             # Asegurar que el costo final quede registrado en la cita si era 0
             if cita.costo == 0:
                 cita.costo = monto_final
+            publicar_cita(cita, 'cita_confirmada')
 
             db.session.commit()
 
@@ -11,9 +11,15 @@ from app.models.mascota import Mascota
 from app.models.historial_clinico import HistorialClinico
 from app.models.medicamento import Medicamento, Receta
 from app.models.pago import Pago
-from datetime import datetime
+from app.models.user import Usuario
+from datetime import datetime, timedelta
 from sqlalchemy import func, or_, desc
+from sqlalchemy.orm import joinedload
 from io import BytesIO
+from app.services.busqueda import ids_coincidentes
+from app.services.paginacion import paginar_keyset
+from app.services.replica import solo_lectura
+from app.services.eventos import CANAL_CITAS, publicar_cita, respuesta_sondeo, respuesta_sse
 
 veterinario_bp = Blueprint('veterinario', __name__)
 
@@ -57,6 +63,8 @@ def dashboard():
         estado='pendiente'
     ).filter(
         db.func.cast(Cita.fecha, db.Date) == hoy
+    ).options(
+        joinedload(Cita.mascota), joinedload(Cita.tutor)
     ).order_by(Cita.fecha.asc()).all()
 
     # Ingresos del veterinario (su porcentaje de los pagos)
@@ -93,12 +101,79 @@ def dashboard():
                          total_pagos=total_pagos)
 
 
+URGENCIAS = ('baja', 'normal', 'alta', 'emergencia')
+
+
+def _filtros_pendientes(args):
+    """Filtros válidos de la cola de pendientes (los inválidos se ignoran)"""
+    filtros = {
+        'asignacion': args.get('asignacion') if args.get('asignacion') == 'mias' else '',
+        'especialidad': args.get('especialidad', '').strip(),
+        'urgencia': args.get('urgencia') if args.get('urgencia') in URGENCIAS else '',
+        'desde': '',
+        'hasta': '',
+    }
+    for clave in ('desde', 'hasta'):
+        try:
+            filtros[clave] = datetime.strptime(args.get(clave, ''), '%Y-%m-%d').date().isoformat()
+        except ValueError:
+            pass
+    return filtros
+
+
 @veterinario_bp.route('/citas/pendientes')
 @veterinario_required
 def citas_pendientes():
-    """Ver citas pendientes"""
-    citas = Cita.query.filter_by(estado='pendiente').order_by(Cita.fecha.asc()).all()
-    return render_template('veterinario/citas/citas_pendientes.html', citas=citas)
+    """Cola de citas pendientes con filtros, paginada por llave (fecha, id)"""
+    filtros = _filtros_pendientes(request.args)
+
+    query = Cita.query.filter(Cita.estado == 'pendiente').options(
+        joinedload(Cita.mascota), joinedload(Cita.tutor)
+    )
+    if filtros['asignacion'] == 'mias':
+        query = query.filter(Cita.veterinario_id == current_user.id)
+    if filtros['especialidad']:
+        veterinarios = db.session.query(Usuario.id).filter(
+            Usuario.rol == 'veterinario', Usuario.especialidad == filtros['especialidad']
+        )
+        query = query.filter(Cita.veterinario_id.in_(veterinarios))
+    if filtros['urgencia']:
+        query = query.filter(Cita.urgencia == filtros['urgencia'])
+    if filtros['desde']:
+        query = query.filter(Cita.fecha >= datetime.fromisoformat(filtros['desde']))
+    if filtros['hasta']:
+        query = query.filter(Cita.fecha < datetime.fromisoformat(filtros['hasta']) + timedelta(days=1))
+
+    citas = paginar_keyset(
+        query, [(Cita.fecha, False), (Cita.id, False)],
+        cursor=request.args.get('cursor'), per_page=20,
+        total='exacto'  # los contadores de la vista se ajustan en vivo a partir de este total
+    )
+
+    especialidades = [e for (e,) in db.session.query(Usuario.especialidad).filter(
+        Usuario.rol == 'veterinario', Usuario.especialidad.isnot(None)
+    ).distinct().order_by(Usuario.especialidad) if e]
+
+    return render_template('veterinario/citas/citas_pendientes.html',
+                         citas=citas,
+                         filtros=filtros,
+                         especialidades=especialidades,
+                         urgencias=URGENCIAS)
+
+
+@veterinario_bp.route('/eventos')
+@veterinario_required
+def eventos():
+    """Canal en vivo (SSE) de citas nuevas, confirmadas, aceptadas y pospuestas"""
+    return respuesta_sse([CANAL_CITAS], request.headers.get('Last-Event-ID') or request.args.get('desde'))
+
+
+@veterinario_bp.route('/eventos/sondeo')
+@veterinario_required
+def eventos_sondeo():
+    """Mismos eventos por sondeo, cuando no hay lugar para otra conexión SSE"""
+    return respuesta_sondeo([CANAL_CITAS], request.args.get('desde'))
+
 
 @veterinario_bp.route('/citas/mis-citas')
 @veterinario_required
@@ -135,15 +210,12 @@ def mis_citas():
         except ValueError:
             pass
     
-    # Búsqueda por mascota o tutor
+    # Búsqueda por mascota o tutor (índice de búsqueda por prefijo)
     if buscar:
-        from app.models.mascota import Mascota
-        from app.models.usuario import Usuario
-        query = query.join(Mascota).join(Usuario, Mascota.tutor_id == Usuario.id).filter(
+        query = query.filter(
             db.or_(
-                Mascota.nombre.ilike(f'%{buscar}%'),
-                Usuario.nombre.ilike(f'%{buscar}%'),
-                Usuario.apellido.ilike(f'%{buscar}%')
+                Cita.mascota_id.in_(ids_coincidentes('mascota', buscar)),
+                Cita.tutor_id.in_(ids_coincidentes('usuario', buscar))
             )
         )
     
@@ -176,21 +248,39 @@ def mis_citas():
 def aceptar_cita(id):
     """Aceptar una cita pendiente"""
     cita = Cita.query.get_or_404(id)
+    volver = _volver_a_pendientes()
 
     if cita.estado != 'pendiente':
         flash('Esta cita ya no está pendiente.', 'warning')
-        return redirect(url_for('veterinario.citas_pendientes'))
+        return redirect(volver)
 
+    antes = {
+        'pendiente': True,
+        'veterinario_id': cita.veterinario_id,
+        'especialidad': cita.veterinario.especialidad if cita.veterinario else None,
+    }
     try:
-        # Asignar veterinario y confirmar la cita
-        cita.veterinario_id = current_user.id
-        cita.confirmar()
+        # UPDATE condicional: si otro veterinario la aceptó primero no se modifica nada
+        if not Cita.reclamar(cita.id, current_user.id):
+            db.session.rollback()
+            flash('Otro veterinario ya aceptó esta cita.', 'warning')
+            return redirect(volver)
+        db.session.refresh(cita)
+        publicar_cita(cita, 'cita_aceptada', antes=antes)  # en la misma transacción
+        db.session.commit()
         flash('Cita aceptada exitosamente.', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Error al aceptar cita: {str(e)}', 'danger')
 
-    return redirect(url_for('veterinario.citas_pendientes'))
+    return redirect(volver)
+
+
+def _volver_a_pendientes():
+    """La cola de pendientes con los filtros y la página desde donde se aceptó"""
+    base = url_for('veterinario.citas_pendientes')
+    volver = request.form.get('volver', '')
+    return volver if volver.startswith(base) and '//' not in volver else base
 
 
 @veterinario_bp.route('/cita/<int:id>/posponer', methods=['GET', 'POST'])
@@ -226,6 +316,7 @@ def posponer_cita(id):
                 cita.fecha = nueva_fecha_hora
             cita.estado = 'pendiente'
             cita.razon_cancelacion = f"Pospuesta: {motivo}"
+            publicar_cita(cita, 'cita_pospuesta')
             db.session.commit()
             flash('Cita pospuesta. El tutor será notificado.', 'success')
             return redirect(url_for('veterinario.citas_pendientes'))
@@ -386,6 +477,7 @@ def perfil():
 
 @veterinario_bp.route('/historial')
 @veterinario_required
+@solo_lectura
 def historial_medico():
     """Lista de pacientes con historial médico"""
     # Obtener parámetros de búsqueda y filtro
@@ -8,11 +8,15 @@ from .cita import Cita, ArchivoCita, ServicioCita
 from .medicamento import Medicamento, Receta
 from .historial_clinico import HistorialClinico
 from .servicio import Servicio
-from .notificacion import Notificacion
+from .notificacion import Notificacion, ContadorNotificaciones
 from .configuracion_sistema import ConfiguracionSistema
-from .auditoria_accion import AuditoriaAccion
+from .auditoria_accion import AuditoriaAccion, AuditoriaAccionArchivo, UserAgent
 from .pago import Pago, HistorialPago
 from .lote import Lote
+from .termino_busqueda import TerminoBusqueda
+from .alerta_inventario import AlertaInventario
+from .tarea_programada import TareaProgramada
+from .evento import Evento
 
 __all__ = [
     'Usuario',
@@ -27,9 +31,16 @@ __all__ = [
     'HistorialClinico',
     'Servicio',
     'Notificacion',
+    'ContadorNotificaciones',
     'ConfiguracionSistema',
     'AuditoriaAccion',
+    'AuditoriaAccionArchivo',
+    'UserAgent',
     'Pago',
     'HistorialPago',
-    'Lote'
+    'Lote',
+    'TerminoBusqueda',
+    'AlertaInventario',
+    'TareaProgramada',
+    'Evento'
 ]
@@ -0,0 +1,39 @@
+"""
+Modelo de alertas de inventario
+Una fila por alerta vigente (lote vencido o por vencer, medicamento con bajo stock).
+Las calcula app/services/alertas_inventario.py; no debe escribirse a mano.
+"""
+from datetime import datetime
+from app import db
+
+
+class AlertaInventario(db.Model):
+    """Alerta vigente de un medicamento o de uno de sus lotes"""
+    __tablename__ = 'alertas_inventario'
+    __table_args__ = (
+        # Páginas de alertas por tipo, las más urgentes primero
+        db.Index('ix_alertas_inventario_tipo', 'tipo', 'fecha_vencimiento', 'medicamento_id'),
+        # Recalcular las alertas de un medicamento tras un movimiento
+        db.Index('ix_alertas_inventario_medicamento', 'medicamento_id', 'tipo'),
+    )
+
+    TIPOS = ('vencido', 'por_vencer', 'bajo_stock')
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)  # vencido, por_vencer, bajo_stock
+    # Sin llave foránea, como terminos_busqueda: es una tabla derivada que se reemplaza entera
+    medicamento_id = db.Column(db.Integer, nullable=False)
+    lote_id = db.Column(db.Integer)  # None: alerta del medicamento (bajo stock o sin lotes)
+    lote = db.Column(db.String(50))
+    fecha_vencimiento = db.Column(db.Date)
+    cantidad = db.Column(db.Integer)  # unidades del lote, o stock actual del medicamento
+    stock_minimo = db.Column(db.Integer)
+    calculada_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    medicamento = db.relationship(
+        'Medicamento', primaryjoin='foreign(AlertaInventario.medicamento_id) == Medicamento.id',
+        viewonly=True, lazy='joined'
+    )
+
+    def __repr__(self):
+        return f'<AlertaInventario {self.tipo} medicamento={self.medicamento_id} lote={self.lote_id}>'
@@ -5,9 +5,21 @@ from datetime import datetime
 from app import db
 
 
+class UserAgent(db.Model):
+    """Catálogo de user-agents: cada cadena distinta se guarda una sola vez"""
+    __tablename__ = 'user_agents'
+
+    id = db.Column(db.Integer, primary_key=True)
+    huella = db.Column(db.String(40), unique=True, nullable=False, index=True)  # sha1 del texto
+    valor = db.Column(db.Text, nullable=False)
+
+
 class AuditoriaAccion(db.Model):
     """Registro de auditoría de acciones en el sistema"""
     __tablename__ = 'auditoria_acciones'
+    __table_args__ = (
+        db.Index('ix_auditoria_entidad_fecha', 'entidad', 'entidad_id', 'fecha'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
@@ -21,6 +33,32 @@ class AuditoriaAccion(db.Model):
     datos_nuevos = db.Column(db.Text, nullable=True)  # Cambiado de JSON a Text para SQL Server
 
     ip_address = db.Column(db.String(45), nullable=True)
-    user_agent = db.Column(db.Text, nullable=True)  # Cambiado a Text para user-agents largos
+    user_agent = db.Column(db.Text, nullable=True)  # Solo registros antiguos; los nuevos usan user_agent_id
+    user_agent_id = db.Column(db.Integer, db.ForeignKey('user_agents.id'), nullable=True)
+
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class AuditoriaAccionArchivo(db.Model):
+    """Registros de auditoría antiguos movidos fuera de la tabla activa"""
+    __tablename__ = 'auditoria_acciones_archivo'
+    __table_args__ = (
+        db.Index('ix_auditoria_archivo_entidad_fecha', 'entidad', 'entidad_id', 'fecha'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # Conserva el id original
+    usuario_id = db.Column(db.Integer)
+
+    accion = db.Column(db.String(100))
+    entidad = db.Column(db.String(50))
+    entidad_id = db.Column(db.Integer)
+
+    descripcion = db.Column(db.Text, nullable=False)
+    datos_anteriores = db.Column(db.Text, nullable=True)
+    datos_nuevos = db.Column(db.Text, nullable=True)
+
+    ip_address = db.Column(db.String(45), nullable=True)
+    user_agent = db.Column(db.Text, nullable=True)
+    user_agent_id = db.Column(db.Integer, nullable=True)
 
-    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha = db.Column(db.DateTime)
@@ -7,6 +7,10 @@ from app import db
 class Cita(db.Model):
     """Modelo de Cita con información detallada"""
     __tablename__ = 'citas'
+    __table_args__ = (
+        db.Index('ix_citas_estado_fecha', 'estado', 'fecha'),  # recordatorios y cola de pendientes
+        db.Index('ix_citas_estado_veterinario_fecha', 'estado', 'veterinario_id', 'fecha'),  # pendientes de cada veterinario
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -61,9 +65,9 @@ class Cita(db.Model):
     comentario_calificacion = db.Column(db.Text)
     
     # Relaciones
-    mascota_id = db.Column(db.Integer, db.ForeignKey('mascotas.id'), nullable=False)
-    tutor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
-    veterinario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    mascota_id = db.Column(db.Integer, db.ForeignKey('mascotas.id'), nullable=False, index=True)
+    tutor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
+    veterinario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), index=True)
     recepcionista_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
     
     # Archivos adjuntos
@@ -96,6 +100,25 @@ class Cita(db.Model):
         self.fecha_confirmacion = datetime.utcnow()
         db.session.commit()
     
+    @classmethod
+    def reclamar(cls, cita_id, veterinario_id):
+        """
+        Acepta una cita pendiente para el veterinario, sin carreras entre veterinarios
+
+        Es un UPDATE condicional (WHERE estado = 'pendiente'): si dos veterinarios
+        aceptan a la vez, solo uno modifica la fila. No confirma la transacción.
+
+        Returns:
+            True si la cita quedó asignada a este veterinario
+        """
+        resultado = db.session.execute(
+            db.update(cls)
+            .where(cls.id == cita_id, cls.estado == 'pendiente')
+            .values(veterinario_id=veterinario_id, estado='confirmada', fecha_confirmacion=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        return resultado.rowcount == 1
+
     def iniciar_atencion(self):
         """Inicia la atención de la cita"""
         self.estado = 'en_progreso'
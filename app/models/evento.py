@@ -0,0 +1,25 @@
+"""
+Modelo de eventos para los canales en vivo
+Una fila por evento publicado (cita nueva, confirmada, aceptada...). Se escribe en la
+misma transacción que el cambio y la leen los procesos web para empujarlo a los
+navegadores suscritos (app/services/eventos.py). Se purga pasadas unas horas.
+"""
+from datetime import datetime
+from app import db
+
+
+class Evento(db.Model):
+    """Evento publicado en un canal"""
+    __tablename__ = 'eventos'
+    __table_args__ = (
+        db.Index('ix_eventos_fecha', 'fecha'),  # purga
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # orden de entrega y Last-Event-ID
+    canal = db.Column(db.String(50), nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    datos = db.Column(db.Text)  # JSON
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Evento {self.id} {self.canal}:{self.tipo}>'
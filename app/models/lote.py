@@ -8,6 +8,12 @@ class Lote(db.Model):
     Cada lote tiene una cantidad disponible, una fecha de vencimiento y un identificador de lote.
     """
     __tablename__ = 'lotes'
+    __table_args__ = (
+        # Lotes de un medicamento por vencimiento (PEPS y alertas tras un movimiento)
+        db.Index('ix_lotes_medicamento_vencimiento', 'medicamento_id', 'fecha_vencimiento'),
+        # Escaneo diario de vencimientos: rango sobre la fecha
+        db.Index('ix_lotes_vencimiento', 'fecha_vencimiento', 'cantidad'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     medicamento_id = db.Column(db.Integer, db.ForeignKey('medicamentos.id'), nullable=False)
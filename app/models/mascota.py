@@ -100,6 +100,8 @@ class Mascota(db.Model):
     
     def get_historial_peso(self):
         """Obtiene el historial de peso de los últimos 6 meses"""
+        from app.models.historial_clinico import HistorialClinico
+
         historial = []
         for h in self.historiales.order_by(HistorialClinico.fecha.desc()).limit(6):
             if h.peso:
@@ -129,6 +131,9 @@ class Mascota(db.Model):
 class Vacuna(db.Model):
     """Modelo de Vacunas"""
     __tablename__ = 'vacunas'
+    __table_args__ = (
+        db.Index('ix_vacunas_fecha_proxima', 'fecha_proxima'),  # recordatorios de vacunas
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     mascota_id = db.Column(db.Integer, db.ForeignKey('mascotas.id'), nullable=False)
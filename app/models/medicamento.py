@@ -9,6 +9,9 @@ from app import db
 class Medicamento(db.Model):
     """Modelo de Medicamentos e Inventario"""
     __tablename__ = 'medicamentos'
+    __table_args__ = (
+        db.Index('ix_medicamentos_nombre_id', 'nombre', 'id'),  # paginación por llave
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     codigo = db.Column(db.String(50), unique=True)
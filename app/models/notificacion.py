@@ -8,6 +8,15 @@ from app import db
 class Notificacion(db.Model):
     """Modelo de Notificaciones"""
     __tablename__ = 'notificaciones'
+    __table_args__ = (
+        # Tareas programadas: no repetir recordatorios y purgar las expiradas
+        db.Index('ix_notificaciones_cita_tipo', 'cita_id', 'tipo'),
+        db.Index('ix_notificaciones_mascota_tipo', 'mascota_id', 'tipo', 'fecha_creacion'),
+        db.Index('ix_notificaciones_expiracion', 'fecha_expiracion'),
+        # Contador de no leídas por usuario y entrega de las recientes por canal
+        db.Index('ix_notificaciones_usuario_leida', 'usuario_id', 'leida'),
+        db.Index('ix_notificaciones_fecha_creacion', 'fecha_creacion'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -30,7 +39,7 @@ class Notificacion(db.Model):
     prioridad = db.Column(db.String(20), default='normal')  # baja, normal, alta, urgente
 
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
-    fecha_lectura = db.Column(db.DateTime)
+    fecha_expiracion = db.Column(db.DateTime)  # UTC, como fecha_creacion
     fecha_expiracion = db.Column(db.DateTime)
 
     def marcar_como_leida(self):
@@ -38,3 +47,19 @@ class Notificacion(db.Model):
         self.leida = True
         self.fecha_lectura = datetime.utcnow()
         db.session.commit()
+
+
+class ContadorNotificaciones(db.Model):
+    """
+    Notificaciones no leídas por usuario
+    Lo mantiene app/services/notificaciones.py (se recalcula para los usuarios afectados
+    en cada cambio); no debe escribirse a mano. Sin fila: ninguna no leída.
+    """
+    __tablename__ = 'contadores_notificaciones'
+
+    # Sin llave foránea, como terminos_busqueda: es una tabla derivada
+    usuario_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    no_leidas = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ContadorNotificaciones usuario={self.usuario_id} no_leidas={self.no_leidas}>'
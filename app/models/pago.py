@@ -3,13 +3,16 @@ Modelo de Pago - Sistema de Pagos Modernizado
 """
 from datetime import datetime
 from app import db
-import qrcode
-from io import BytesIO
-import base64
 
 class Pago(db.Model):
     """Modelo de Pago con múltiples métodos de pago y QR"""
     __tablename__ = 'pagos'
+    __table_args__ = (
+        db.Index('ix_pagos_fecha_creacion_id', 'fecha_creacion', 'id'),  # paginación por llave
+        # Tareas programadas de vencimiento
+        db.Index('ix_pagos_estado_vencimiento', 'estado', 'fecha_vencimiento'),
+        db.Index('ix_pagos_qr_vencimiento', 'qr_vencimiento'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -135,23 +138,9 @@ class Pago(db.Model):
 
         self.qr_code_data = datos_qr
 
-        # Generar imagen QR
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(datos_qr)
-        qr.make(fit=True)
-
-        # Crear imagen
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        # Convertir a base64
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        # Generar imagen QR en base64 (qrcode/PIL se importan en el primer uso)
+        from app.services.carga_diferida import qr_png_base64
+        img_str = qr_png_base64(datos_qr)
 
         self.qr_code_image = img_str
 
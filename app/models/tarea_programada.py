@@ -0,0 +1,29 @@
+"""
+Modelo de tareas programadas
+Una fila por tarea registrada en app/services/planificador.py: próxima ejecución,
+bloqueo (qué nodo la está ejecutando y hasta cuándo) y resultado de la última corrida.
+"""
+from app import db
+
+
+class TareaProgramada(db.Model):
+    """Estado y bloqueo de una tarea periódica (compartido por todos los nodos)"""
+    __tablename__ = 'tareas_programadas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), unique=True, nullable=False)
+    cron = db.Column(db.String(100), nullable=False)  # minuto hora día mes día_semana
+
+    proxima_ejecucion = db.Column(db.DateTime)
+    # Bloqueo: lo toma un UPDATE condicional; si el nodo muere, vence solo
+    bloqueada_por = db.Column(db.String(100))  # host:pid
+    bloqueada_hasta = db.Column(db.DateTime)
+
+    ultimo_inicio = db.Column(db.DateTime)
+    ultimo_fin = db.Column(db.DateTime)
+    ultimo_resultado = db.Column(db.Text)  # JSON con las filas procesadas
+    ultimo_error = db.Column(db.Text)
+    ejecuciones = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f'<TareaProgramada {self.nombre} ({self.cron})>'
@@ -0,0 +1,26 @@
+"""
+Modelo del índice de búsqueda
+Una fila por (entidad, registro, término normalizado). Lo mantiene
+app/services/busqueda.py; no debe escribirse a mano.
+"""
+from app import db
+
+
+class TerminoBusqueda(db.Model):
+    """Término normalizado (minúsculas, sin acentos) de un registro indexado"""
+    __tablename__ = 'terminos_busqueda'
+    __table_args__ = (
+        # Búsqueda por prefijo: rango sobre termino dentro de la entidad (cubre la consulta)
+        db.Index('ix_terminos_busqueda_prefijo', 'entidad', 'termino', 'entidad_id', 'peso'),
+        # Intersección de palabras (mismo registro) y reemplazo de los términos de un registro
+        db.Index('ix_terminos_busqueda_registro', 'entidad', 'entidad_id', 'termino', 'peso'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entidad = db.Column(db.String(20), nullable=False)  # usuario, mascota
+    entidad_id = db.Column(db.Integer, nullable=False)
+    termino = db.Column(db.String(64), nullable=False)
+    peso = db.Column(db.SmallInteger, nullable=False, default=1)  # relevancia del campo de origen
+
+    def __repr__(self):
+        return f'<TerminoBusqueda {self.entidad}:{self.entidad_id} {self.termino}>'
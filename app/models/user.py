@@ -3,14 +3,20 @@ Modelo de Usuario Mejorado con Estadísticas
 """
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, date
-from sqlalchemy import func, and_
+from datetime import datetime, date, timedelta
+from sqlalchemy import func, and_, case
 from app import db
 from app.models.cita import Cita
 
+BLOQUE_IDS = 1000  # ids por consulta IN (SQL Server admite hasta 2100 parámetros)
+SEPARADOR_NOMBRES = '\x1f'  # no aparece en nombres escritos por usuarios
+
 class Usuario(UserMixin, db.Model):
     """Modelo de Usuario con soporte para múltiples roles y estadísticas"""
     __tablename__ = 'usuarios'
+    __table_args__ = (
+        db.Index('ix_usuarios_rol_nombre_id', 'rol', 'nombre', 'id'),  # listados por rol paginados por llave
+    )
     
     # Campos principales
     id = db.Column(db.Integer, primary_key=True)
@@ -106,50 +112,95 @@ class Usuario(UserMixin, db.Model):
         """Obtiene estadísticas del veterinario"""
         if not self.is_veterinario():
             return None
+        return Usuario.estadisticas_veterinarios([self.id])[self.id]
+    
+    @staticmethod
+    def estadisticas_veterinarios(veterinario_ids):
+        """
+        Estadísticas de varios veterinarios en una sola consulta (GROUP BY con agregados condicionales)
+        
+        Args:
+            veterinario_ids: Ids de los veterinarios
             
+        Returns:
+            dict: {veterinario_id: estadísticas}, con las mismas claves que get_estadisticas_veterinario
+        """
+        ids = list(set(veterinario_ids))
         hoy = date.today()
+        inicio_hoy = datetime(hoy.year, hoy.month, hoy.day)
+        inicio_mes = datetime(hoy.year, hoy.month, 1)
+        inicio_mes_siguiente = datetime(hoy.year + hoy.month // 12, hoy.month % 12 + 1, 1)
         
-        # Citas totales
-        total_citas = self.citas_como_veterinario.count()
-        
-        # Citas pendientes
-        citas_pendientes = self.citas_como_veterinario.filter(
-            Cita.estado == 'pendiente'
-        ).count()
+        completada = Cita.estado == 'completada'
+        filas = db.session.query(
+            Cita.veterinario_id,
+            func.count(Cita.id),
+            func.sum(case((Cita.estado == 'pendiente', 1), else_=0)),
+            func.sum(case((and_(Cita.fecha >= inicio_hoy, Cita.fecha < inicio_hoy + timedelta(days=1)), 1), else_=0)),
+            func.sum(case((completada, 1), else_=0)),
+            # Pacientes únicos atendidos
+            func.count(func.distinct(case((completada, Cita.mascota_id)))),
+            # Ingresos generados en el mes
+            func.sum(case(
+                (and_(completada, Cita.fecha >= inicio_mes, Cita.fecha < inicio_mes_siguiente),
+                 func.cast(Cita.costo, db.Numeric(10, 2)))
+            )),
+        ).filter(Cita.veterinario_id.in_(ids)).group_by(Cita.veterinario_id).all() if ids else []
         
-        # Citas hoy
-        citas_hoy = self.citas_como_veterinario.filter(
-            func.cast(Cita.fecha, db.Date) == hoy
-        ).count()
+        estadisticas = {vet_id: {
+            'total_citas': 0,
+            'citas_pendientes': 0,
+            'citas_hoy': 0,
+            'citas_completadas': 0,
+            'pacientes_unicos': 0,
+            'ingresos_mes': 0,
+            'tasa_completacion': 0
+        } for vet_id in ids}
+        for vet_id, total, pendientes, de_hoy, completadas, pacientes, ingresos in filas:
+            estadisticas[vet_id] = {
+                'total_citas': total,
+                'citas_pendientes': pendientes or 0,
+                'citas_hoy': de_hoy or 0,
+                'citas_completadas': completadas or 0,
+                'pacientes_unicos': pacientes,
+                'ingresos_mes': ingresos or 0,
+                'tasa_completacion': ((completadas or 0) / total * 100) if total > 0 else 0
+            }
+        return estadisticas
+    
+    @staticmethod
+    def resumen_mascotas_tutores(tutor_ids, solo_activas=False):
+        """
+        Cantidad y nombres de las mascotas de varios tutores, en una consulta agrupada por bloque de ids
         
-        # Citas completadas
-        citas_completadas = self.citas_como_veterinario.filter(
-            Cita.estado == 'completada'
-        ).count()
+        Los nombres se concatenan en la BD con aggregate_strings (group_concat en SQLite,
+        string_agg en SQL Server y PostgreSQL).
         
-        # Pacientes únicos atendidos
-        pacientes_unicos = db.session.query(func.count(func.distinct(Cita.mascota_id))).filter(
-            Cita.veterinario_id == self.id,
-            Cita.estado == 'completada'
-        ).scalar()
-        
-        # Ingresos generados (si se maneja facturación)
-        ingresos_mes = db.session.query(func.sum(func.cast(Cita.costo, db.Numeric(10, 2)))).filter(
-            Cita.veterinario_id == self.id,
-            Cita.estado == 'completada',
-            func.extract('month', Cita.fecha) == hoy.month,
-            func.extract('year', Cita.fecha) == hoy.year
-        ).scalar() or 0
+        Args:
+            tutor_ids: Ids de los tutores (una página o un lote)
+            solo_activas: Contar solo las mascotas activas
+            
+        Returns:
+            dict: {tutor_id: {'total_mascotas': int, 'nombres': [str, ...] ordenados}}
+        """
+        from app.models.mascota import Mascota
         
-        return {
-            'total_citas': total_citas,
-            'citas_pendientes': citas_pendientes,
-            'citas_hoy': citas_hoy,
-            'citas_completadas': citas_completadas,
-            'pacientes_unicos': pacientes_unicos,
-            'ingresos_mes': ingresos_mes,
-            'tasa_completacion': (citas_completadas / total_citas * 100) if total_citas > 0 else 0
-        }
+        ids = list(set(tutor_ids))
+        resumen = {tutor_id: {'total_mascotas': 0, 'nombres': []} for tutor_id in ids}
+        for i in range(0, len(ids), BLOQUE_IDS):
+            consulta = db.session.query(
+                Mascota.tutor_id,
+                func.count(Mascota.id),
+                func.aggregate_strings(Mascota.nombre, SEPARADOR_NOMBRES)
+            ).filter(Mascota.tutor_id.in_(ids[i:i + BLOQUE_IDS]))
+            if solo_activas:
+                consulta = consulta.filter(Mascota.activo == True)
+            for tutor_id, total, nombres in consulta.group_by(Mascota.tutor_id):
+                resumen[tutor_id] = {
+                    'total_mascotas': total,
+                    'nombres': sorted(nombres.split(SEPARADOR_NOMBRES)) if nombres else []
+                }
+        return resumen
     
     # Métodos de estadísticas para tutores
     def get_estadisticas_tutor(self):
@@ -169,8 +220,9 @@ class Usuario(UserMixin, db.Model):
         }
     
     def get_notificaciones_no_leidas(self):
-        """Obtiene el número de notificaciones no leídas"""
-        return self.notificaciones.filter_by(leida=False).count()
+        """Obtiene el número de notificaciones no leídas (contador mantenido, sin COUNT)"""
+        from app.services.notificaciones import no_leidas
+        return no_leidas(self.id)
     
     def puede_editar_usuario(self, usuario):
         """Verifica si puede editar un usuario"""
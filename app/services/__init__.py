@@ -0,0 +1,4 @@
+"""
+Servicios de la aplicación
+Componentes de infraestructura compartidos por los controladores
+"""
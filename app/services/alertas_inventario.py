@@ -0,0 +1,292 @@
+"""
+Alertas de inventario materializadas
+La lista de medicamentos, la página de alertas y el reporte de inventario calculaban
+cada uno, con recorridos completos, los conjuntos de bajo stock, por vencer y vencidos,
+y lo hacían con `Medicamento.fecha_vencimiento` (informativa) en lugar de los
+vencimientos reales de cada lote.
+
+Aquí se evalúan una vez y se guardan en `alertas_inventario`:
+- vencido / por_vencer: por lote con unidades disponibles (o por medicamento si no
+  tiene lotes), vencido hasta hoy o dentro de DIAS_POR_VENCER días.
+- bajo_stock: medicamentos activos con stock_actual <= stock_minimo.
+
+Los conteos por tipo (medicamentos distintos) se guardan en configuracion_sistema, así
+que las tarjetas y el badge del menú leen una sola fila.
+
+Cuándo se recalcula:
+- En cada flush que mueve stock o cambia un lote o medicamento, solo para esos
+  medicamentos (misma transacción).
+- Una vez al día, completo: la tarea programada `escanear_inventario` (o
+  `flask escanear-inventario` desde cron) y la primera inicialización de la BD. Las
+  cargas por Core (generar-datos) deben ejecutarlo al terminar.
+
+La lectura nunca escribe: se ejecuta al renderizar cualquier plantilla de admin y en
+vistas que leen de la réplica. Si el último escaneo completo no es de hoy, se sirven
+los conteos guardados y se avisa en el log.
+"""
+import json
+import threading
+from datetime import date, datetime, timedelta
+
+from flask import g
+from flask_login import current_user
+from sqlalchemy import delete, event, exists, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import AlertaInventario, ConfiguracionSistema, Lote, Medicamento
+
+DIAS_POR_VENCER = 30
+CLAVE_CONTEOS = 'alertas_inventario'  # configuracion_sistema: fecha del último escaneo y conteos
+
+_aviso_desactualizado = {'fecha': None}  # un aviso por proceso y día
+_lock = threading.Lock()
+
+# Campos que cambian las alertas de un medicamento
+CAMPOS_MOVIMIENTO = {
+    Lote: ('cantidad', 'fecha_vencimiento', 'medicamento_id'),
+    Medicamento: ('stock_actual', 'stock_minimo', 'activo', 'fecha_vencimiento', 'lote'),
+}
+
+
+# ============================================
+# CÁLCULO
+# ============================================
+
+def _calcular(conexion, hoy, medicamento_ids=None):
+    """Filas de alertas_inventario de todos los medicamentos activos (o de los indicados)"""
+    limite = hoy + timedelta(days=DIAS_POR_VENCER)
+    ahora = datetime.utcnow()
+    filtros = [Medicamento.activo == True]
+    if medicamento_ids is not None:
+        filtros.append(Medicamento.id.in_(medicamento_ids))
+
+    def fila(tipo, medicamento_id, lote_id, lote, fecha, cantidad, stock_minimo):
+        return {'tipo': tipo, 'medicamento_id': medicamento_id, 'lote_id': lote_id, 'lote': lote,
+                'fecha_vencimiento': fecha, 'cantidad': cantidad, 'stock_minimo': stock_minimo,
+                'calculada_en': ahora}
+
+    def por_fecha(fecha):
+        return 'vencido' if fecha <= hoy else 'por_vencer'
+
+    filas = []
+    lotes = conexion.execute(
+        select(Lote.id, Lote.medicamento_id, Lote.lote, Lote.fecha_vencimiento, Lote.cantidad,
+               Medicamento.stock_minimo)
+        .join(Medicamento, Medicamento.id == Lote.medicamento_id)
+        .where(*filtros, Lote.cantidad > 0, Lote.fecha_vencimiento <= limite)
+    )
+    for l in lotes:
+        filas.append(fila(por_fecha(l.fecha_vencimiento), l.medicamento_id, l.id, l.lote,
+                          l.fecha_vencimiento, l.cantidad, l.stock_minimo))
+
+    # Medicamentos registrados antes de los lotes: su fecha de vencimiento es la única que hay
+    sin_lotes = conexion.execute(
+        select(Medicamento.id, Medicamento.lote, Medicamento.fecha_vencimiento,
+               Medicamento.stock_actual, Medicamento.stock_minimo)
+        .where(*filtros, Medicamento.fecha_vencimiento <= limite,
+               ~exists().where(Lote.medicamento_id == Medicamento.id))
+    )
+    for m in sin_lotes:
+        filas.append(fila(por_fecha(m.fecha_vencimiento), m.id, None, m.lote,
+                          m.fecha_vencimiento, m.stock_actual, m.stock_minimo))
+
+    bajo_stock = conexion.execute(
+        select(Medicamento.id, Medicamento.stock_actual, Medicamento.stock_minimo)
+        .where(*filtros, Medicamento.stock_actual <= Medicamento.stock_minimo)
+    )
+    for m in bajo_stock:
+        filas.append(fila('bajo_stock', m.id, None, None, None, m.stock_actual, m.stock_minimo))
+    return filas
+
+
+def _contar(conexion):
+    """Medicamentos distintos por tipo de alerta, y en total"""
+    tabla = AlertaInventario.__table__
+    conteos = {tipo: 0 for tipo in AlertaInventario.TIPOS}
+    conteos.update(conexion.execute(
+        select(tabla.c.tipo, func.count(tabla.c.medicamento_id.distinct())).group_by(tabla.c.tipo)
+    ).all())
+    conteos['total'] = conexion.execute(select(func.count(tabla.c.medicamento_id.distinct()))).scalar()
+    return conteos
+
+
+def _reemplazar(conexion, hoy, medicamento_ids=None):
+    """Reemplaza las alertas (todas o las de unos medicamentos) y devuelve los conteos"""
+    tabla = AlertaInventario.__table__
+    borrar = delete(tabla)
+    if medicamento_ids is not None:
+        borrar = borrar.where(tabla.c.medicamento_id.in_(medicamento_ids))
+    conexion.execute(borrar)
+    filas = _calcular(conexion, hoy, medicamento_ids)
+    if filas:
+        conexion.execute(insert(tabla), filas)
+    return _contar(conexion)
+
+
+# ============================================
+# ESCANEO DIARIO Y LECTURA
+# ============================================
+
+def escaneado():
+    """True si ya hubo algún escaneo completo"""
+    return db.session.execute(
+        select(ConfiguracionSistema.id).where(ConfiguracionSistema.clave == CLAVE_CONTEOS)
+    ).first() is not None
+
+
+def escanear(hoy=None):
+    """Recalcula todas las alertas y guarda los conteos (confirma la transacción)"""
+    from app.services.carga_masiva import upsert_por_clave
+
+    hoy = hoy or date.today()
+    conteos = _reemplazar(db.session.connection(), hoy)
+    upsert_por_clave(ConfiguracionSistema, 'clave', [{
+        'clave': CLAVE_CONTEOS,
+        'valor': json.dumps({'fecha': hoy.isoformat(), 'conteos': conteos}),
+        'tipo': 'json',
+        'descripcion': 'Último escaneo de alertas de inventario y medicamentos por tipo',
+    }], actualizar=('valor',))
+    db.session.commit()
+    g.pop('conteos_alertas', None)
+    return conteos
+
+
+def conteos():
+    """
+    Medicamentos con alertas por tipo ({'vencido', 'por_vencer', 'bajo_stock', 'total'})
+
+    Una lectura por request de la fila guardada. Solo lectura: si el último escaneo
+    completo no es de hoy se devuelven sus conteos igual (los recalcula la tarea diaria).
+    """
+    if 'conteos_alertas' in g:
+        return g.conteos_alertas
+    guardado = db.session.execute(
+        select(ConfiguracionSistema.valor).where(ConfiguracionSistema.clave == CLAVE_CONTEOS)
+    ).scalar()
+    try:
+        datos = json.loads(guardado) if guardado else {}
+    except ValueError:
+        datos = {}
+    if 'conteos' in datos:
+        resultado = datos['conteos']
+        _avisar_si_desactualizado(datos.get('fecha'))
+    else:
+        # Nunca se escaneó: lo que haya materializado (vacío hasta el primer escaneo)
+        resultado = _contar(db.session.connection())
+        _avisar_si_desactualizado(None)
+    g.conteos_alertas = resultado
+    return resultado
+
+
+def _avisar_si_desactualizado(fecha):
+    hoy = date.today().isoformat()
+    if fecha == hoy:
+        return
+    with _lock:
+        if _aviso_desactualizado['fecha'] == hoy:
+            return
+        _aviso_desactualizado['fecha'] = hoy
+    print(f"[WARN] Alertas de inventario sin escaneo completo hoy (último: {fecha or 'nunca'}): "
+          f"se ejecutan con la tarea escanear_inventario o `flask escanear-inventario`")
+
+
+def alertas(tipo):
+    """Alertas vigentes de un tipo, las más próximas a vencer primero"""
+    return AlertaInventario.query.filter(AlertaInventario.tipo == tipo).order_by(
+        AlertaInventario.fecha_vencimiento, AlertaInventario.medicamento_id
+    ).all()
+
+
+def tipos_por_medicamento(medicamento_ids):
+    """{medicamento_id: {tipos de alerta}} de una página de medicamentos"""
+    if not medicamento_ids:
+        return {}
+    tipos = {}
+    for medicamento_id, tipo in db.session.execute(
+        select(AlertaInventario.medicamento_id, AlertaInventario.tipo)
+        .where(AlertaInventario.medicamento_id.in_(medicamento_ids)).distinct()
+    ):
+        tipos.setdefault(medicamento_id, set()).add(tipo)
+    return tipos
+
+
+def ids_con_alerta(tipo):
+    """Subconsulta de los medicamentos con una alerta del tipo (filtros de listados)"""
+    return select(AlertaInventario.medicamento_id).where(AlertaInventario.tipo == tipo)
+
+
+# ============================================
+# RECÁLCULO POR MOVIMIENTO
+# ============================================
+
+def _medicamentos_movidos(session):
+    ids = set()
+    for objeto in list(session.new) + list(session.deleted):
+        if isinstance(objeto, Lote):
+            ids.add(objeto.medicamento_id)
+        elif isinstance(objeto, Medicamento):
+            ids.add(objeto.id)
+    for objeto in session.dirty:
+        campos = CAMPOS_MOVIMIENTO.get(type(objeto))
+        if not campos:
+            continue
+        estado = db.inspect(objeto)
+        if not any(estado.attrs[c].history.has_changes() for c in campos):
+            continue
+        if isinstance(objeto, Lote):
+            ids.add(objeto.medicamento_id)
+            ids.update(estado.attrs.medicamento_id.history.deleted or ())  # lote movido de medicamento
+        else:
+            ids.add(objeto.id)
+    ids.discard(None)
+    return ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _recalcular_movimientos(session, flush_context):
+    """Recalcula las alertas de los medicamentos cuyo stock o lotes cambiaron en este flush"""
+    ids = _medicamentos_movidos(session)
+    if not ids:
+        return
+    conexion = session.connection()
+    conteos_nuevos = _reemplazar(conexion, date.today(), sorted(ids))
+
+    # Se conserva la fecha del último escaneo completo: los demás medicamentos siguen igual
+    tabla = ConfiguracionSistema.__table__
+    guardado = conexion.execute(select(tabla.c.valor).where(tabla.c.clave == CLAVE_CONTEOS)).scalar()
+    try:
+        datos = json.loads(guardado) if guardado else None
+    except ValueError:
+        datos = None
+    if datos:
+        datos['conteos'] = conteos_nuevos
+        conexion.execute(update(tabla).where(tabla.c.clave == CLAVE_CONTEOS).values(valor=json.dumps(datos)))
+    g.pop('conteos_alertas', None)
+
+
+# ============================================
+# REGISTRO
+# ============================================
+
+def register_alertas_inventario(app):
+    """Registra el badge de alertas del menú de administración y el comando de escaneo"""
+
+    @app.context_processor
+    def inyectar_alertas_stock():
+        if not (current_user.is_authenticated and current_user.is_admin()):
+            return {}
+        try:
+            return {'alertas_stock': conteos()['total']}
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"[WARN] No se pudieron leer las alertas de inventario: {e}")
+            return {}
+
+    @app.cli.command('escanear-inventario')
+    def escanear_inventario():
+        """Recalcula las alertas de vencimiento y stock (programar una vez al día)"""
+        resultado = escanear()
+        print(f"[OK] Alertas de inventario: {resultado['vencido']} vencidos, "
+              f"{resultado['por_vencer']} por vencer, {resultado['bajo_stock']} con bajo stock")
@@ -0,0 +1,151 @@
+"""
+Arranque e inicialización de la base de datos
+`run.py` ya no ejecuta db.create_all() + init_database() en cada arranque (reflexión
+del esquema y ~20 consultas por worker): solo lee la versión de esquema guardada en
+`configuracion_sistema`, una consulta. Si falta o es anterior a VERSION_ESQUEMA se
+inicializa una única vez; también puede hacerse explícitamente con `flask init-db`.
+
+Al agregar tablas, índices o datos base nuevos, incrementar VERSION_ESQUEMA. Cada tabla
+nueva suma una consulta a create_all(): regenerar también las entradas `arranque/` de
+benchmarks/baseline.json (`python benchmarks/micro.py --tamanos xs --salida ...`).
+"""
+import click
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from app import db, init_database
+from app.models import ConfiguracionSistema
+from app.services import alertas_inventario, notificaciones
+from app.services.busqueda import indexar_faltantes
+from app.services.carga_masiva import upsert_por_clave
+from app.services.principal import CLAVE_GENERACION
+
+VERSION_ESQUEMA = 11  # 2: índices de paginación por llave, 3: índice de búsqueda, 4: búsqueda global,
+                     # 5: alertas de inventario, 6: tareas programadas,
+                     # 7: contador de notificaciones, 8: eventos en vivo, 9: cola de pendientes,
+                     # 10: columnas nuevas en tablas existentes (auditoria_acciones.user_agent_id)
+                     # 11: generación de principales en configuracion_sistema
+CLAVE_VERSION = 'version_esquema'
+
+
+def version_instalada():
+    """Versión de esquema registrada en la BD, o None si no está inicializada"""
+    try:
+        valor = db.session.execute(
+            select(ConfiguracionSistema.valor).where(ConfiguracionSistema.clave == CLAVE_VERSION)
+        ).scalar()
+    except (OperationalError, ProgrammingError):
+        # La tabla aún no existe
+        db.session.rollback()
+        return None
+    try:
+        return int(valor) if valor is not None else None
+    except ValueError:
+        return None
+
+
+def crear_indices_faltantes():
+    """create_all() no agrega índices nuevos a tablas que ya existen"""
+    for tabla in db.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            indice.create(db.engine, checkfirst=True)
+
+
+def agregar_columnas_faltantes():
+    """
+    create_all() tampoco agrega columnas a tablas que ya existen
+
+    Agrega con ALTER TABLE ... ADD las columnas nulables del modelo que falten (las
+    restricciones de llave foránea quedan para los scripts .sql de cada motor). Una
+    columna NOT NULL faltante necesita un script propio: solo se avisa.
+    """
+    inspector = inspect(db.engine)
+    tablas = set(inspector.get_table_names())
+    preparador = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as conexion:
+        for tabla in db.metadata.sorted_tables:
+            if tabla.name not in tablas:
+                continue
+            existentes = {c['name'] for c in inspector.get_columns(tabla.name)}
+            for columna in tabla.columns:
+                if columna.name in existentes:
+                    continue
+                if not columna.nullable:
+                    print(f"[WARN] Falta la columna NOT NULL {tabla.name}.{columna.name}: aplicar su script .sql")
+                    continue
+                tipo = columna.type.compile(dialect=db.engine.dialect)
+                conexion.execute(text(
+                    f"ALTER TABLE {preparador.format_table(tabla)} ADD {preparador.format_column(columna)} {tipo}"
+                ))
+                print(f"[OK] Columna agregada: {tabla.name}.{columna.name}")
+
+
+def inicializar_bd():
+    """Crea las tablas, columnas e índices faltantes, carga los datos base y registra la versión del esquema"""
+    db.create_all()
+    agregar_columnas_faltantes()
+    crear_indices_faltantes()
+    init_database()
+    indexar_faltantes()
+    upsert_por_clave(ConfiguracionSistema, 'clave', [{
+        'clave': CLAVE_VERSION,
+        'valor': str(VERSION_ESQUEMA),
+        'tipo': 'integer',
+        'descripcion': 'Versión del esquema inicializado (flask init-db)',
+    }], actualizar=('valor',))
+    # Contadores de no leídas: la tabla nace vacía al actualizar y debe reflejar lo existente
+    notificaciones.recontar()
+    # Solo se crea: su valor lo cambia invalidar_principales()
+    upsert_por_clave(ConfiguracionSistema, 'clave', [{
+        'clave': CLAVE_GENERACION,
+        'valor': '0',
+        'tipo': 'string',
+        'descripcion': 'Generación de los principales en sesión (cambia al modificar rol o estado de un usuario)',
+    }])
+    db.session.commit()
+    if not alertas_inventario.escaneado():
+        alertas_inventario.escanear()  # primer escaneo; después lo hace la tarea diaria
+
+
+def asegurar_esquema(app):
+    """
+    Verifica la versión del esquema al arrancar
+
+    Con AUTO_INIT_DB inicializa la BD si hace falta (solo la primera vez); si no,
+    solo avisa que debe ejecutarse `flask init-db`.
+
+    Returns:
+        bool: True si el esquema ya estaba al día
+    """
+    version = version_instalada()
+    if version is not None and version >= VERSION_ESQUEMA:
+        return True
+
+    if not app.config.get('AUTO_INIT_DB', True):
+        print(f"[WARN] Esquema en versión {version}, se requiere {VERSION_ESQUEMA}: ejecute `flask init-db`")
+        return False
+
+    try:
+        inicializar_bd()
+    except (IntegrityError, OperationalError, ProgrammingError):
+        # Otro worker hizo la inicialización al mismo tiempo
+        db.session.rollback()
+        if (version_instalada() or 0) < VERSION_ESQUEMA:
+            raise
+    print(f"[OK] Base de datos inicializada (esquema versión {VERSION_ESQUEMA})")
+    return False
+
+
+def register_arranque(app):
+    """Registra el comando de inicialización de la BD"""
+
+    @app.cli.command('init-db')
+    @click.option('--forzar', is_flag=True, help='Reinicializar aunque la versión ya esté al día')
+    def init_db_command(forzar):
+        """Crea las tablas y los datos base y registra la versión del esquema"""
+        version = version_instalada()
+        if version is not None and version >= VERSION_ESQUEMA and not forzar:
+            print(f"[OK] Esquema al día (versión {version}), nada que hacer")
+            return
+        inicializar_bd()
+        print(f"[OK] Base de datos inicializada (esquema versión {VERSION_ESQUEMA})")
@@ -0,0 +1,296 @@
+"""
+Pipeline de assets estáticos
+Minifica y agrupa CSS/JS por layout, recomprime imágenes, agrega huellas (hash)
+a los nombres de archivo y sirve versiones precomprimidas con caché de larga duración.
+
+Uso:
+    flask build-assets
+
+El resultado queda en static/dist/ junto con un manifest.json que traduce
+cada ruta lógica (css/styles.css) a su versión con huella (dist/css/styles.1a2b3c4d.css).
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli solo se generan .gz
+    brotli = None
+
+DIST_DIR = 'dist'
+
+# Archivos propios que carga cada layout (en el mismo orden que las plantillas)
+BUNDLES = {
+    'admin': {
+        'css': ['css/admin_modern.css'],
+        'js': [],
+    },
+    'veterinario': {
+        'css': ['css/veterinario_modern.css'],
+        'js': ['js/validaciones.js'],
+    },
+    'tutor': {
+        'css': ['css/tutor_modern.css', 'css/shared.css'],
+        'js': ['js/validaciones.js'],
+    },
+}
+
+# Anchos de las variantes redimensionadas de imágenes
+ANCHOS_IMAGEN = (480, 960)
+
+EXTENSIONES_COMPRIMIBLES = {'.css', '.js', '.svg', '.json', '.txt'}
+EXTENSIONES_IMAGEN = {'.png', '.jpg', '.jpeg'}
+
+
+# ============================================
+# MINIFICACIÓN
+# ============================================
+
+def minificar_css(texto):
+    """Minificación conservadora de CSS (comentarios y espacios)"""
+    texto = re.sub(r'/\*.*?\*/', '', texto, flags=re.DOTALL)
+    texto = re.sub(r'\s+', ' ', texto)
+    texto = re.sub(r'\s*([{};,])\s*', r'\1', texto)
+    texto = re.sub(r':\s+', ':', texto)
+    texto = texto.replace(';}', '}')
+    return texto.strip()
+
+
+def minificar_js(texto):
+    """Minificación conservadora de JS: solo líneas vacías y comentarios de línea completa"""
+    lineas = []
+    for linea in texto.splitlines():
+        limpia = linea.strip()
+        if not limpia or limpia.startswith('//'):
+            continue
+        lineas.append(limpia)
+    return '\n'.join(lineas)
+
+
+# La URL puede llevar ';' (Google Fonts: wght@300;400;600): la regla termina en el ';' que sigue a la URL
+_IMPORT_CSS = re.compile(r"""@import\s+(?:url\([^)]*\)|"[^"]*"|'[^']*')[^;]*;""")
+
+
+def _agrupar_css(contenidos):
+    """Concatena CSS subiendo los @import al inicio (deben ir primero)"""
+    imports, cuerpo = [], []
+    for contenido in contenidos:
+        for regla in _IMPORT_CSS.findall(contenido):
+            if regla not in imports:
+                imports.append(regla)
+        cuerpo.append(_IMPORT_CSS.sub('', contenido))
+    return ''.join(imports) + '\n'.join(cuerpo)
+
+
+# ============================================
+# ESCRITURA CON HUELLA
+# ============================================
+
+def _huella(datos):
+    return hashlib.md5(datos).hexdigest()[:8]
+
+
+def _ruta_con_huella(ruta_logica, datos):
+    base, ext = os.path.splitext(ruta_logica)
+    return f'{DIST_DIR}/{base}.{_huella(datos)}{ext}'
+
+
+def _escribir(static_folder, ruta_relativa, datos):
+    destino = os.path.join(static_folder, *ruta_relativa.split('/'))
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, 'wb') as f:
+        f.write(datos)
+
+    ext = os.path.splitext(ruta_relativa)[1].lower()
+    if ext in EXTENSIONES_COMPRIMIBLES:
+        with open(destino + '.gz', 'wb') as f:
+            f.write(gzip.compress(datos, compresslevel=9))
+        if brotli is not None:
+            with open(destino + '.br', 'wb') as f:
+                f.write(brotli.compress(datos, quality=11))
+
+
+def _leer(static_folder, ruta_logica):
+    with open(os.path.join(static_folder, *ruta_logica.split('/')), 'rb') as f:
+        return f.read()
+
+
+def _procesar_imagen(static_folder, ruta_logica, manifest):
+    """Recomprime la imagen original y genera variantes WebP redimensionadas"""
+    from io import BytesIO
+    from PIL import Image
+
+    origen = os.path.join(static_folder, *ruta_logica.split('/'))
+    base, ext = os.path.splitext(ruta_logica)
+
+    with Image.open(origen) as img:
+        img.load()
+        formato = 'PNG' if ext.lower() == '.png' else 'JPEG'
+
+        buffer = BytesIO()
+        if formato == 'PNG':
+            img.save(buffer, format='PNG', optimize=True)
+        else:
+            img.convert('RGB').save(buffer, format='JPEG', quality=82, optimize=True, progressive=True)
+        datos = buffer.getvalue()
+
+        # Si la recompresión no gana nada se conserva el original
+        original = _leer(static_folder, ruta_logica)
+        if len(datos) >= len(original):
+            datos = original
+
+        destino = _ruta_con_huella(ruta_logica, datos)
+        _escribir(static_folder, destino, datos)
+        manifest[ruta_logica] = destino
+
+        for ancho in ANCHOS_IMAGEN:
+            if img.width <= ancho:
+                continue
+            alto = round(img.height * ancho / img.width)
+            variante = img.resize((ancho, alto), Image.LANCZOS)
+            buffer = BytesIO()
+            variante.save(buffer, format='WEBP', quality=80, method=6)
+            datos = buffer.getvalue()
+            ruta_variante = f'{base}-{ancho}w.webp'
+            destino = _ruta_con_huella(ruta_variante, datos)
+            _escribir(static_folder, destino, datos)
+            manifest[ruta_variante] = destino
+
+
+def construir_assets(static_folder):
+    """
+    Genera static/dist/ y su manifest.json
+
+    Returns:
+        dict: Manifest con las rutas lógicas y sus versiones con huella
+    """
+    manifest = {}
+
+    for raiz, _, archivos in os.walk(static_folder):
+        relativa = os.path.relpath(raiz, static_folder).replace(os.sep, '/')
+        if relativa == DIST_DIR or relativa.startswith(DIST_DIR + '/'):
+            continue
+
+        for nombre in sorted(archivos):
+            ruta_logica = nombre if relativa == '.' else f'{relativa}/{nombre}'
+            ext = os.path.splitext(nombre)[1].lower()
+
+            if ext in EXTENSIONES_IMAGEN:
+                try:
+                    _procesar_imagen(static_folder, ruta_logica, manifest)
+                    continue
+                except Exception as e:
+                    print(f"[WARN] No se pudo optimizar {ruta_logica}: {e}")
+
+            datos = _leer(static_folder, ruta_logica)
+            if ext == '.css':
+                datos = minificar_css(datos.decode('utf-8')).encode('utf-8')
+            elif ext == '.js':
+                datos = minificar_js(datos.decode('utf-8')).encode('utf-8')
+
+            destino = _ruta_con_huella(ruta_logica, datos)
+            _escribir(static_folder, destino, datos)
+            manifest[ruta_logica] = destino
+
+    # Bundles por layout
+    for layout, tipos in BUNDLES.items():
+        for tipo, archivos in tipos.items():
+            if not archivos:
+                continue
+            contenidos = [_leer(static_folder, a).decode('utf-8') for a in archivos]
+            if tipo == 'css':
+                texto = minificar_css(_agrupar_css(contenidos))
+            else:
+                texto = ';\n'.join(minificar_js(c) for c in contenidos)
+            datos = texto.encode('utf-8')
+            ruta_logica = f'bundles/{layout}.{tipo}'
+            destino = _ruta_con_huella(ruta_logica, datos)
+            _escribir(static_folder, destino, datos)
+            manifest[ruta_logica] = destino
+
+    _escribir(static_folder, f'{DIST_DIR}/manifest.json',
+              json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def cargar_manifest(static_folder):
+    """Lee el manifest generado; vacío si aún no se construyeron los assets"""
+    ruta = os.path.join(static_folder, DIST_DIR, 'manifest.json')
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# ============================================
+# INTEGRACIÓN CON FLASK
+# ============================================
+
+def _elegir_codificacion(static_folder, filename):
+    """Devuelve (sufijo, Content-Encoding) de la mejor versión precomprimida disponible"""
+    aceptadas = request.accept_encodings
+    for sufijo, codificacion in (('.br', 'br'), ('.gz', 'gzip')):
+        if aceptadas[codificacion] and os.path.exists(
+                os.path.join(static_folder, *(filename + sufijo).split('/'))):
+            return sufijo, codificacion
+    return None, None
+
+
+def register_assets(app):
+    """Registra fingerprinting en url_for, el servidor de estáticos y el comando build-assets"""
+    manifest = cargar_manifest(app.static_folder)
+    max_age = app.config.get('ASSETS_MAX_AGE', 31536000)
+
+    @app.url_defaults
+    def aplicar_huella(endpoint, values):
+        if endpoint == 'static' and app.config.get('ASSETS_FINGERPRINT', True):
+            filename = values.get('filename')
+            if filename in manifest:
+                values['filename'] = manifest[filename]
+
+    def servir_estatico(filename):
+        if not filename.startswith(DIST_DIR + '/'):
+            return app.send_static_file(filename)
+
+        sufijo, codificacion = _elegir_codificacion(app.static_folder, filename)
+        if sufijo:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            respuesta = send_from_directory(app.static_folder, filename + sufijo, mimetype=mimetype)
+            respuesta.headers['Content-Encoding'] = codificacion
+        else:
+            respuesta = send_from_directory(app.static_folder, filename)
+
+        # El nombre cambia con el contenido: puede cachearse indefinidamente
+        respuesta.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+        respuesta.vary.add('Accept-Encoding')
+        return respuesta
+
+    if 'static' in app.view_functions:
+        app.view_functions['static'] = servir_estatico
+
+    @app.context_processor
+    def inject_assets():
+        from flask import url_for
+
+        def asset_urls(layout, tipo):
+            """URLs de CSS/JS de un layout: el bundle si existe, si no los archivos sueltos"""
+            bundle = f'bundles/{layout}.{tipo}'
+            if bundle in manifest and app.config.get('ASSETS_FINGERPRINT', True):
+                return [url_for('static', filename=bundle)]
+            return [url_for('static', filename=a) for a in BUNDLES[layout][tipo]]
+
+        return {'asset_urls': asset_urls}
+
+    @app.cli.command('build-assets')
+    def build_assets():
+        """Minifica, agrupa y agrega huellas a los assets estáticos"""
+        nuevo = construir_assets(app.static_folder)
+        manifest.clear()
+        manifest.update(nuevo)
+        print(f"[OK] {len(nuevo)} assets generados en {os.path.join(app.static_folder, DIST_DIR)}")
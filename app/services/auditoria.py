@@ -0,0 +1,233 @@
+"""
+Pipeline de auditoría
+Las filas de auditoría ya no se insertan dentro de la transacción de cada acción:
+se retienen en la sesión hasta que ésta confirma (si la acción falla se descartan)
+y pasan al buffer de escritura diferida, que las inserta en lote.
+
+Además:
+- Los user-agents se normalizan en la tabla `user_agents` (una fila por cadena distinta).
+- `archivar_auditoria` mueve los registros antiguos a `auditoria_acciones_archivo`
+  para mantener pequeña la tabla activa (comando `flask archivar-auditoria`).
+- `consultar_auditoria` consulta por (entidad, entidad_id, fecha) usando el índice compuesto.
+"""
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session as SesionFlask
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import AuditoriaAccion, AuditoriaAccionArchivo, UserAgent
+
+CLAVE_PENDIENTES = 'auditoria_pendiente'
+
+# Caché por proceso huella -> id de user_agents
+_cache_user_agents = {}
+_lock = threading.Lock()
+MAX_CACHE_USER_AGENTS = 1000
+
+COLUMNAS_AUDITORIA = (
+    'id', 'usuario_id', 'accion', 'entidad', 'entidad_id', 'descripcion',
+    'datos_anteriores', 'datos_nuevos', 'ip_address', 'user_agent', 'user_agent_id', 'fecha',
+)
+
+
+# ============================================
+# ENCOLADO LIGADO A LA TRANSACCIÓN
+# ============================================
+
+def encolar_auditoria(datos):
+    """Retiene la fila hasta que la transacción actual confirme"""
+    db.session.info.setdefault(CLAVE_PENDIENTES, []).append(datos)
+
+
+@event.listens_for(SesionFlask, 'after_commit')
+def _publicar_pendientes(sesion):
+    pendientes = sesion.info.pop(CLAVE_PENDIENTES, None)
+    if pendientes and has_app_context():
+        current_app.extensions['write_behind'].registrar_auditorias(pendientes)
+
+
+@event.listens_for(SesionFlask, 'after_rollback')
+def _descartar_pendientes(sesion):
+    sesion.info.pop(CLAVE_PENDIENTES, None)
+
+
+# ============================================
+# USER-AGENTS
+# ============================================
+
+def _huella_user_agent(valor):
+    return hashlib.sha1(valor.encode('utf-8', 'replace')).hexdigest()
+
+
+def resolver_user_agents(filas):
+    """
+    Reemplaza el texto `user_agent` de cada fila por `user_agent_id`
+
+    Debe llamarse dentro de una transacción abierta (la del vaciado del buffer).
+    Las cadenas nuevas se insertan en lote; las conocidas salen de la caché del proceso.
+    """
+    valores = {}
+    for fila in filas:
+        valor = fila.get('user_agent')
+        if valor:
+            valores.setdefault(_huella_user_agent(valor), valor)
+
+    with _lock:
+        ids = {h: _cache_user_agents[h] for h in valores if h in _cache_user_agents}
+
+    faltantes = [h for h in valores if h not in ids]
+    if faltantes:
+        existentes = db.session.execute(
+            select(UserAgent.huella, UserAgent.id).where(UserAgent.huella.in_(faltantes))
+        ).all()
+        ids.update({huella: id_ for huella, id_ in existentes})
+
+        nuevas = [h for h in faltantes if h not in ids]
+        if nuevas:
+            # Otro proceso pudo insertar la misma cadena: savepoint y nueva lectura
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(UserAgent), [
+                        {'huella': h, 'valor': valores[h]} for h in nuevas
+                    ])
+            except IntegrityError as e:
+                print(f"[WARN] User-agents insertados por otro proceso, se releen: {e.orig}")
+            ids.update({huella: id_ for huella, id_ in db.session.execute(
+                select(UserAgent.huella, UserAgent.id).where(UserAgent.huella.in_(nuevas))
+            ).all()})
+
+        with _lock:
+            if len(_cache_user_agents) > MAX_CACHE_USER_AGENTS:
+                _cache_user_agents.clear()
+            _cache_user_agents.update(ids)
+
+    resultado = []
+    for fila in filas:
+        fila = dict(fila)
+        valor = fila.pop('user_agent', None)
+        fila['user_agent_id'] = ids.get(_huella_user_agent(valor)) if valor else None
+        resultado.append(fila)
+    return resultado
+
+
+# ============================================
+# ARCHIVO
+# ============================================
+
+def archivar_auditoria(dias=90, lote=1000):
+    """
+    Mueve a `auditoria_acciones_archivo` los registros con más de `dias` de antigüedad
+
+    Se procesa por lotes (INSERT ... SELECT + DELETE) para no bloquear la tabla activa.
+
+    Returns:
+        int: Registros archivados
+    """
+    corte = datetime.utcnow() - timedelta(days=dias)
+    columnas = [getattr(AuditoriaAccion, c) for c in COLUMNAS_AUDITORIA]
+    total = 0
+
+    while True:
+        ids = db.session.execute(
+            select(AuditoriaAccion.id)
+            .where(AuditoriaAccion.fecha < corte)
+            .order_by(AuditoriaAccion.id)
+            .limit(lote)
+        ).scalars().all()
+        if not ids:
+            break
+
+        try:
+            db.session.execute(
+                insert(AuditoriaAccionArchivo).from_select(
+                    list(COLUMNAS_AUDITORIA),
+                    select(*columnas).where(AuditoriaAccion.id.in_(ids))
+                )
+            )
+            db.session.execute(delete(AuditoriaAccion).where(AuditoriaAccion.id.in_(ids)))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error al archivar auditoría: {e}")
+            break
+        total += len(ids)
+
+    return total
+
+
+# ============================================
+# CONSULTA
+# ============================================
+
+def consultar_auditoria(entidad=None, entidad_id=None, desde=None, hasta=None,
+                        usuario_id=None, accion=None, limite=50, incluir_archivo=False):
+    """
+    Registros de auditoría más recientes primero
+
+    Filtrar por entidad (y entidad_id) aprovecha el índice (entidad, entidad_id, fecha).
+    Con `incluir_archivo` también se consulta la tabla de archivo.
+
+    Returns:
+        list[dict]: Registros con el texto del user-agent resuelto
+    """
+    tablas = [AuditoriaAccion]
+    if incluir_archivo:
+        tablas.append(AuditoriaAccionArchivo)
+
+    registros = []
+    for modelo in tablas:
+        consulta = select(
+            *[getattr(modelo, c) for c in COLUMNAS_AUDITORIA],
+            UserAgent.valor.label('user_agent_texto'),
+        ).outerjoin(UserAgent, UserAgent.id == modelo.user_agent_id)
+
+        if entidad is not None:
+            consulta = consulta.where(modelo.entidad == entidad)
+        if entidad_id is not None:
+            consulta = consulta.where(modelo.entidad_id == entidad_id)
+        if desde is not None:
+            consulta = consulta.where(modelo.fecha >= desde)
+        if hasta is not None:
+            consulta = consulta.where(modelo.fecha < hasta)
+        if usuario_id is not None:
+            consulta = consulta.where(modelo.usuario_id == usuario_id)
+        if accion is not None:
+            consulta = consulta.where(modelo.accion == accion)
+
+        consulta = consulta.order_by(modelo.fecha.desc(), modelo.id.desc()).limit(limite)
+        registros.extend(db.session.execute(consulta).mappings().all())
+
+    registros.sort(key=lambda r: (r['fecha'] or datetime.min, r['id']), reverse=True)
+    return [{
+        'id': r['id'],
+        'usuario_id': r['usuario_id'],
+        'accion': r['accion'],
+        'entidad': r['entidad'],
+        'entidad_id': r['entidad_id'],
+        'descripcion': r['descripcion'],
+        'datos_anteriores': r['datos_anteriores'],
+        'datos_nuevos': r['datos_nuevos'],
+        'ip_address': r['ip_address'],
+        'user_agent': r['user_agent_texto'] or r['user_agent'],
+        'fecha': r['fecha'].isoformat() if r['fecha'] else None,
+    } for r in registros[:limite]]
+
+
+def register_auditoria(app):
+    """Registra el comando de archivo de auditoría"""
+
+    @app.cli.command('archivar-auditoria')
+    @click.option('--dias', default=None, type=int, help='Antigüedad mínima en días')
+    @click.option('--lote', default=1000, type=int, help='Registros por transacción')
+    def archivar_auditoria_command(dias, lote):
+        """Mueve los registros de auditoría antiguos a la tabla de archivo"""
+        if dias is None:
+            dias = app.config.get('AUDITORIA_DIAS_ACTIVOS', 90)
+        total = archivar_auditoria(dias=dias, lote=lote)
+        print(f"[OK] {total} registros de auditoría archivados (más de {dias} días)")
@@ -0,0 +1,413 @@
+"""
+Índice de búsqueda por prefijo
+`LIKE '%juan%'` no puede usar índices: recorre toda la tabla en cada tecla del
+autocompletado. Aquí cada registro indexado se descompone en términos normalizados
+(minúsculas, sin acentos, solo letras y dígitos) guardados en `terminos_busqueda`;
+buscar "juan pe" es un rango sobre el índice (entidad, termino) por cada palabra:
+
+    termino >= 'juan' AND termino < 'juan\\x7f'
+
+Las palabras de la consulta se intersectan en SQL (mismo registro) y el resultado se
+ordena por relevancia: coincidencia exacta antes que prefijo, peso del campo (nombre
+antes que email) y término más corto.
+
+Se indexan usuarios (nombre, cédula, teléfono...), mascotas (nombre, chip, registro) y
+pagos (código, factura); lo usan los autocompletados y la búsqueda global /admin/buscar.
+
+El índice se mantiene solo en cada flush del ORM (alta, cambio en un campo indexado,
+baja). Las cargas masivas por Core (generar-datos, importaciones) deben ejecutar
+`flask reindexar-busqueda` al terminar. Si cambian los campos de una entidad, `flask
+init-db` la reindexa (la definición indexada se guarda en configuracion_sistema).
+
+Los campos "compactos" (teléfonos, códigos) se indexan además sin separadores, para
+que "70012345" encuentre "700-12345".
+"""
+import json
+import re
+import time
+import unicodedata
+
+import click
+from sqlalchemy import and_, delete, event, func, insert, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import TerminoBusqueda
+
+LARGO_MAX = 64  # largo de la columna termino
+MAX_PALABRAS = 4  # palabras de la consulta que se usan (el resto se ignora)
+CANDIDATOS = 50  # filas del índice que se ordenan por relevancia
+MUESTRA_SELECTIVIDAD = 200  # términos contados por palabra para elegir la que guía la consulta
+LOTE_REINDEXAR = 5000
+CLAVE_FIRMAS = 'indice_busqueda'  # configuracion_sistema: campos indexados por entidad
+
+_PALABRA = re.compile(r'[a-z0-9]+')
+
+
+# ============================================
+# NORMALIZACIÓN
+# ============================================
+
+def normalizar(texto):
+    """'José Pérez-Núñez' -> ['jose', 'perez', 'nunez']"""
+    if not texto:
+        return []
+    plano = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode().lower()
+    return [palabra[:LARGO_MAX] for palabra in _PALABRA.findall(plano)]
+
+
+# ============================================
+# ENTIDADES INDEXADAS
+# ============================================
+
+class EntidadIndexada:
+    """
+    Qué campos de un modelo se indexan
+
+    Args:
+        nombre: Valor de la columna `entidad` ('usuario', 'mascota'...)
+        modelo: Clase del modelo
+        campos: {atributo: peso}; a mayor peso, más relevante la coincidencia
+        compactos: Atributos que también se indexan sin separadores
+    """
+
+    def __init__(self, nombre, modelo, campos, compactos=()):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.campos = dict(campos)
+        self.compactos = set(compactos)
+
+    def terminos(self, valores):
+        """{termino: peso} a partir de un objeto o fila con los atributos indexados"""
+        terminos = {}
+        for campo, peso in self.campos.items():
+            palabras = normalizar(getattr(valores, campo, None))
+            if campo in self.compactos and len(palabras) > 1:
+                palabras.append(''.join(palabras)[:LARGO_MAX])
+            for palabra in palabras:
+                if peso > terminos.get(palabra, 0):
+                    terminos[palabra] = peso
+        return terminos
+
+    @property
+    def firma(self):
+        """Describe los campos indexados; si cambia, hay que reindexar la entidad"""
+        return ','.join(
+            f"{campo}:{peso}{'*' if campo in self.compactos else ''}"
+            for campo, peso in sorted(self.campos.items())
+        )
+
+    def filas(self, entidad_id, valores):
+        return [
+            {'entidad': self.nombre, 'entidad_id': entidad_id, 'termino': termino, 'peso': peso}
+            for termino, peso in self.terminos(valores).items()
+        ]
+
+
+_entidades = {}
+_por_modelo = {}
+
+
+def indexar(nombre, modelo, campos, compactos=()):
+    """Registra un modelo en el índice de búsqueda"""
+    entidad = EntidadIndexada(nombre, modelo, campos, compactos)
+    _entidades[nombre] = entidad
+    _por_modelo[modelo] = entidad
+    return entidad
+
+
+def _registrar_entidades():
+    from app.models import Mascota, Pago, Usuario
+
+    indexar('usuario', Usuario,
+            {'nombre': 3, 'apellido': 3, 'cedula': 3, 'username': 2, 'telefono': 2, 'email': 1},
+            compactos=('cedula', 'telefono'))
+    indexar('mascota', Mascota,
+            {'nombre': 3, 'chip_identificacion': 3, 'numero_registro': 2, 'raza': 1},
+            compactos=('chip_identificacion', 'numero_registro'))
+    indexar('pago', Pago, {'codigo_pago': 3, 'numero_factura': 3},
+            compactos=('codigo_pago', 'numero_factura'))
+
+
+# ============================================
+# MANTENIMIENTO
+# ============================================
+
+def _campos_modificados(objeto, entidad):
+    estado = inspect(objeto)
+    return any(estado.attrs[campo].history.has_changes() for campo in entidad.campos)
+
+
+@event.listens_for(Session, 'after_flush')
+def _actualizar_indice(session, flush_context):
+    """Reemplaza los términos de los registros indexados creados, modificados o borrados"""
+    if not _por_modelo:
+        return
+    cambios = []  # (entidad, id, objeto o None si se borró)
+    for objeto in session.new:
+        entidad = _por_modelo.get(type(objeto))
+        if entidad is not None:
+            cambios.append((entidad, objeto.id, objeto))
+    for objeto in session.dirty:
+        entidad = _por_modelo.get(type(objeto))
+        if entidad is not None and _campos_modificados(objeto, entidad):
+            cambios.append((entidad, objeto.id, objeto))
+    for objeto in session.deleted:
+        entidad = _por_modelo.get(type(objeto))
+        if entidad is not None:
+            cambios.append((entidad, objeto.id, None))
+    if not cambios:
+        return
+
+    tabla = TerminoBusqueda.__table__
+    conexion = session.connection()
+    por_entidad = {}
+    filas = []
+    for entidad, entidad_id, objeto in cambios:
+        por_entidad.setdefault(entidad.nombre, []).append(entidad_id)
+        if objeto is not None:
+            filas.extend(entidad.filas(entidad_id, objeto))
+    for nombre, ids in por_entidad.items():
+        conexion.execute(delete(tabla).where(tabla.c.entidad == nombre, tabla.c.entidad_id.in_(ids)))
+    if filas:
+        conexion.execute(insert(tabla), filas)
+
+
+def quitar_del_indice(nombre, ids):
+    """
+    Quita los términos de registros borrados sin el ORM (DELETE por Core)
+    `ids` puede ser una lista o una subconsulta de ids.
+    """
+    tabla = TerminoBusqueda.__table__
+    db.session.execute(delete(tabla).where(tabla.c.entidad == nombre, tabla.c.entidad_id.in_(ids)))
+
+
+def reindexar(nombres=None, log=print):
+    """Reconstruye el índice de las entidades indicadas (todas por defecto)"""
+    tabla = TerminoBusqueda.__table__
+    for nombre in nombres or list(_entidades):
+        entidad = _entidades[nombre]
+        inicio = time.perf_counter()
+        columnas = [entidad.modelo.id] + [getattr(entidad.modelo, c) for c in entidad.campos]
+        db.session.execute(delete(tabla).where(tabla.c.entidad == nombre))
+
+        registros, ultimo = 0, 0
+        while True:
+            # Por llave y no con un cursor abierto: SQLite no admite escribir mientras se lee
+            lote = db.session.execute(
+                select(*columnas).where(entidad.modelo.id > ultimo)
+                .order_by(entidad.modelo.id).limit(LOTE_REINDEXAR)
+            ).all()
+            if not lote:
+                break
+            filas = [f for registro in lote for f in entidad.filas(registro.id, registro)]
+            if filas:
+                db.session.execute(insert(tabla), filas)
+            registros += len(lote)
+            ultimo = lote[-1].id
+        db.session.commit()
+        log(f"[OK] Índice de búsqueda '{nombre}': {registros} registros en "
+            f"{time.perf_counter() - inicio:.1f}s")
+        _actualizar_estadisticas(entidad.modelo.__tablename__)
+    _actualizar_estadisticas(tabla.name)
+
+
+def _actualizar_estadisticas(nombre_tabla):
+    """
+    ANALYZE tras una carga masiva (solo SQLite; los demás motores lo hacen solos)
+
+    Sin estadísticas, SQLite filtra `id IN (...candidatos) AND rol = 'tutor'` recorriendo
+    el índice de rol (todos los tutores) en lugar de buscar los candidatos por llave.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text(f'ANALYZE {nombre_tabla}'))
+        db.session.commit()
+
+
+def indexar_faltantes():
+    """
+    Reindexa las entidades cuyo índice no corresponde a su definición actual
+    (BD anterior al índice, o campos indexados agregados o cambiados)
+    """
+    from app.models import ConfiguracionSistema
+    from app.services.carga_masiva import upsert_por_clave
+
+    guardadas = db.session.execute(
+        select(ConfiguracionSistema.valor).where(ConfiguracionSistema.clave == CLAVE_FIRMAS)
+    ).scalar()
+    try:
+        firmas = json.loads(guardadas) if guardadas else {}
+    except ValueError:
+        firmas = {}
+
+    pendientes = [nombre for nombre, entidad in _entidades.items() if firmas.get(nombre) != entidad.firma]
+    if not pendientes:
+        return
+    reindexar(pendientes)
+    firmas.update({nombre: _entidades[nombre].firma for nombre in pendientes})
+    upsert_por_clave(ConfiguracionSistema, 'clave', [{
+        'clave': CLAVE_FIRMAS,
+        'valor': json.dumps(firmas, sort_keys=True),
+        'tipo': 'json',
+        'descripcion': 'Campos indexados por entidad en terminos_busqueda',
+    }], actualizar=('valor',))
+    db.session.commit()
+
+
+# ============================================
+# CONSULTA
+# ============================================
+
+def _prefijo(columna, palabra):
+    if db.engine.dialect.name == 'sqlite':
+        # LIKE en SQLite no distingue mayúsculas y por eso no usa el índice; el rango sí
+        return and_(columna >= palabra, columna < palabra + '\x7f')
+    return columna.like(palabra + '%')
+
+
+def _puntaje(palabra, termino, peso):
+    if termino == palabra:
+        return peso * 2.0
+    return peso * len(palabra) / len(termino)
+
+
+def _palabras_consulta(texto):
+    palabras = sorted(set(normalizar(texto)), key=len, reverse=True)
+    return palabras[:MAX_PALABRAS]
+
+
+def _por_selectividad(nombre, palabras):
+    """
+    Ordena las palabras de la más a la menos selectiva
+
+    La primera guía la consulta: si fuera una palabra común ("tutor" en todos los
+    usernames), la intersección recorrería casi todo el índice. Se cuentan a lo sumo
+    MUESTRA_SELECTIVIDAD términos por palabra, lo que cuesta un rango corto del índice.
+    """
+    if len(palabras) < 2:
+        return palabras
+    tabla = TerminoBusqueda.__table__
+    conteos = {}
+    for palabra in palabras:
+        muestra = (select(tabla.c.entidad_id)
+                   .where(tabla.c.entidad == nombre, _prefijo(tabla.c.termino, palabra))
+                   .limit(MUESTRA_SELECTIVIDAD).subquery())
+        conteos[palabra] = db.session.execute(select(func.count()).select_from(muestra)).scalar()
+    # A igual cantidad, la más larga (menos ambigua)
+    return sorted(palabras, key=lambda palabra: (conteos[palabra], -len(palabra)))
+
+
+def buscar(nombre, texto, limite=10, candidatos=CANDIDATOS):
+    """
+    Registros cuyo contenido tiene palabras que empiezan con las de `texto`
+
+    Args:
+        nombre: Entidad indexada ('usuario', 'mascota')
+        texto: Lo que escribió el usuario
+        limite: Cantidad de resultados
+        candidatos: Filas del índice que se ordenan por relevancia
+
+    Returns:
+        list: ids ordenados por relevancia
+    """
+    palabras = _por_selectividad(nombre, _palabras_consulta(texto))
+    if not palabras:
+        return []
+
+    tabla = TerminoBusqueda.__table__
+    alias = [tabla.alias(f't{i}') for i in range(len(palabras))]
+    guia = alias[0]
+    columnas = [guia.c.entidad_id]
+    for a in alias:
+        columnas += [a.c.termino, a.c.peso]
+
+    consulta = select(*columnas).select_from(guia)
+    for a, palabra in zip(alias[1:], palabras[1:]):
+        consulta = consulta.join(a, and_(
+            a.c.entidad == nombre,
+            a.c.entidad_id == guia.c.entidad_id,
+            _prefijo(a.c.termino, palabra),
+        ))
+    consulta = (consulta.where(guia.c.entidad == nombre, _prefijo(guia.c.termino, palabras[0]))
+                .order_by(guia.c.termino).limit(candidatos))
+
+    puntajes = {}
+    for fila in db.session.execute(consulta):
+        puntaje = sum(
+            _puntaje(palabra, fila[1 + 2 * i], fila[2 + 2 * i]) for i, palabra in enumerate(palabras)
+        )
+        if puntaje > puntajes.get(fila[0], 0):
+            puntajes[fila[0]] = puntaje
+    ordenados = sorted(puntajes.items(), key=lambda par: (-par[1], par[0]))
+    return [entidad_id for entidad_id, _ in ordenados[:limite]]
+
+
+def buscar_pagina(nombre, texto, pagina=1, por_pagina=10):
+    """
+    Una página de buscar()
+
+    Returns:
+        tuple: (ids de la página, hay más resultados)
+    """
+    hasta = pagina * por_pagina
+    ids = buscar(nombre, texto, limite=hasta + 1, candidatos=max(CANDIDATOS, hasta + 1))
+    return ids[hasta - por_pagina:hasta], len(ids) > hasta
+
+
+def buscar_modelos(nombre, texto, limite=10, filtros=(), candidatos=CANDIDATOS):
+    """
+    Como buscar(), pero retorna los objetos del modelo en orden de relevancia
+
+    `filtros` se aplican al cargar los objetos (p. ej. Usuario.rol == 'tutor'), así
+    que pueden quedar menos de `limite` resultados.
+    """
+    ids = buscar(nombre, texto, limite=candidatos, candidatos=candidatos)
+    if not ids:
+        return []
+    modelo = _entidades[nombre].modelo
+    if filtros:
+        # Primero solo los ids que pasan los filtros; se cargan únicamente los que se muestran
+        validos = set(db.session.execute(select(modelo.id).where(modelo.id.in_(ids), *filtros)).scalars())
+        ids = [entidad_id for entidad_id in ids if entidad_id in validos]
+    ids = ids[:limite]
+    if not ids:
+        return []
+    posicion = {entidad_id: i for i, entidad_id in enumerate(ids)}
+    objetos = modelo.query.filter(modelo.id.in_(ids)).all()
+    objetos.sort(key=lambda objeto: posicion[objeto.id])
+    return objetos
+
+
+def ids_coincidentes(nombre, texto):
+    """
+    Subconsulta con los ids que coinciden con todas las palabras, sin límite ni orden
+
+    Para filtrar listados: Usuario.id.in_(ids_coincidentes('usuario', busqueda)).
+    """
+    palabras = _palabras_consulta(texto)
+    tabla = TerminoBusqueda.__table__
+    if not palabras:
+        return select(tabla.c.entidad_id).where(False)
+    consulta = None
+    for palabra in palabras:
+        parte = select(tabla.c.entidad_id).where(
+            tabla.c.entidad == nombre, _prefijo(tabla.c.termino, palabra)
+        )
+        consulta = parte if consulta is None else consulta.intersect(parte)
+    return consulta
+
+
+# ============================================
+# REGISTRO Y COMANDOS
+# ============================================
+
+def register_busqueda(app):
+    """Registra las entidades indexadas y el comando reindexar-busqueda"""
+    _registrar_entidades()
+
+    @app.cli.command('reindexar-busqueda')
+    @click.option('--entidad', type=click.Choice(sorted(_entidades)), multiple=True,
+                  help='Entidad a reindexar (por defecto todas)')
+    def reindexar_busqueda(entidad):
+        """Reconstruye el índice de búsqueda (tras cargas masivas por Core)"""
+        reindexar(list(entidad) or None, log=click.echo)
@@ -0,0 +1,80 @@
+"""
+Carga diferida de dependencias pesadas
+pandas, plotly, openpyxl, reportlab y qrcode/PIL suman cientos de milisegundos y
+decenas de MB por worker. Los controladores y modelos no deben importarlas a nivel
+de módulo: usan estas fachadas, que las importan en el primer uso. Los generadores
+de PDF (factura del tutor, receta del veterinario) importan reportlab dentro de la
+función que arma el documento.
+
+`python benchmarks/importacion.py` verifica que ninguna se cargue al crear la app.
+"""
+import base64
+from io import BytesIO
+
+# Módulos que no deben estar cargados después de create_app()
+MODULOS_PESADOS = ('pandas', 'numpy', 'plotly', 'openpyxl', 'reportlab', 'qrcode', 'PIL')
+
+
+# ============================================
+# GRÁFICOS
+# ============================================
+
+def plotly_express():
+    """Módulo plotly.express (carga pandas y plotly la primera vez)"""
+    import plotly.express as px
+    return px
+
+
+def grafico_html(figura):
+    """Fragmento HTML embebible de una figura de plotly"""
+    import plotly.io as pio
+    return pio.to_html(figura, full_html=False, config={'displayModeBar': False})
+
+
+def dataframe(*args, **kwargs):
+    """pandas.DataFrame(...) importando pandas en el primer uso"""
+    import pandas as pd
+    return pd.DataFrame(*args, **kwargs)
+
+
+# ============================================
+# EXCEL
+# ============================================
+
+def excel_en_memoria(filas, hoja):
+    """
+    Genera un .xlsx con una hoja a partir de una lista de dicts
+
+    Returns:
+        BytesIO: Archivo posicionado al inicio, listo para send_file
+    """
+    import pandas as pd
+
+    salida = BytesIO()
+    with pd.ExcelWriter(salida, engine='openpyxl') as writer:
+        pd.DataFrame(filas).to_excel(writer, sheet_name=hoja, index=False)
+    salida.seek(0)
+    return salida
+
+
+# ============================================
+# QR
+# ============================================
+
+def qr_png_base64(datos, box_size=10, border=4):
+    """Imagen PNG de un código QR codificada en base64"""
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(datos)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode()
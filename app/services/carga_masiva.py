@@ -0,0 +1,63 @@
+"""
+Carga masiva con semántica de upsert
+Reemplaza el patrón `filter_by(...).first()` + `db.session.add()` fila por fila:
+una consulta por lote para conocer las claves existentes, un INSERT masivo para
+las nuevas y, opcionalmente, un UPDATE masivo para las que cambiaron.
+"""
+from sqlalchemy import insert, select, update
+
+from app import db
+
+
+def upsert_por_clave(modelo, clave, filas, actualizar=(), lote=1000):
+    """
+    Inserta las filas cuya `clave` no existe y actualiza las columnas `actualizar` de las existentes
+
+    Args:
+        modelo: Modelo SQLAlchemy con llave primaria `id`
+        clave: Nombre de la columna con valores únicos (username, codigo, clave...)
+        filas: Lista de dicts con las columnas a escribir
+        actualizar: Columnas que se sobrescriben si la fila ya existe y su valor difiere
+        lote: Filas por consulta/INSERT (SQL Server admite ~2100 parámetros por sentencia)
+
+    Returns:
+        tuple: (insertadas, actualizadas)
+
+    No hace commit: se confirma junto con el resto de la transacción del llamador.
+    """
+    columna = getattr(modelo, clave)
+    columnas_actualizar = [getattr(modelo, c) for c in actualizar]
+    insertadas = actualizadas = 0
+
+    for inicio in range(0, len(filas), lote):
+        bloque = filas[inicio:inicio + lote]
+        existentes = {
+            fila[0]: fila[1:]
+            for fila in db.session.execute(
+                select(columna, modelo.id, *columnas_actualizar)
+                .where(columna.in_([f[clave] for f in bloque]))
+            ).all()
+        }
+
+        nuevas, cambios, vistas = [], [], set()
+        for fila in bloque:
+            valor = fila[clave]
+            if valor in vistas:
+                continue
+            vistas.add(valor)
+            if valor not in existentes:
+                nuevas.append(fila)
+                continue
+            actual = existentes[valor]
+            if actualizar and any(actual[i + 1] != fila[c] for i, c in enumerate(actualizar) if c in fila):
+                cambios.append({'id': actual[0], **{c: fila[c] for c in actualizar if c in fila}})
+
+        if nuevas:
+            # INSERT de Core: un solo executemany (el de ORM puede partirlo por filas)
+            db.session.execute(insert(modelo.__table__), nuevas)
+            insertadas += len(nuevas)
+        if cambios:
+            db.session.execute(update(modelo), cambios)
+            actualizadas += len(cambios)
+
+    return insertadas, actualizadas
@@ -0,0 +1,112 @@
+"""
+Middleware de compresión y GET condicional
+Comprime respuestas HTML/JSON grandes (gzip o brotli), agrega ETags débiles
+a las respuestas GET y responde 304 cuando el cliente ya tiene la versión vigente.
+"""
+import gzip
+import hashlib
+import threading
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli se usa solo gzip
+    brotli = None
+
+
+class MetricasCompresion:
+    """Acumula por endpoint los bytes originales/comprimidos y las respuestas 304"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = {}
+
+    def registrar(self, endpoint, original=0, comprimido=0, no_modificado=False):
+        with self._lock:
+            item = self._datos.setdefault(endpoint or 'desconocido', {
+                'respuestas': 0,
+                'comprimidas': 0,
+                'no_modificadas': 0,
+                'bytes_originales': 0,
+                'bytes_comprimidos': 0,
+            })
+            item['respuestas'] += 1
+            if no_modificado:
+                item['no_modificadas'] += 1
+            if comprimido:
+                item['comprimidas'] += 1
+                item['bytes_originales'] += original
+                item['bytes_comprimidos'] += comprimido
+
+    def resumen(self):
+        """Retorna las métricas con el ratio de compresión de cada endpoint"""
+        with self._lock:
+            resultado = {}
+            for endpoint, item in self._datos.items():
+                datos = dict(item)
+                datos['ratio'] = round(
+                    item['bytes_comprimidos'] / item['bytes_originales'], 3
+                ) if item['bytes_originales'] else None
+                resultado[endpoint] = datos
+            return resultado
+
+    def reiniciar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+metricas_compresion = MetricasCompresion()
+
+
+def _comprimir(datos, codificacion, nivel):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=min(nivel, 11))
+    return gzip.compress(datos, compresslevel=nivel)
+
+
+def _elegir_codificacion():
+    aceptadas = request.accept_encodings
+    if brotli is not None and aceptadas['br']:
+        return 'br'
+    if aceptadas['gzip']:
+        return 'gzip'
+    return None
+
+
+def register_compresion(app):
+    """Registra el middleware de compresión/ETag en la aplicación"""
+    tamano_minimo = app.config.get('COMPRESS_MIN_SIZE', 1024)
+    nivel = app.config.get('COMPRESS_LEVEL', 6)
+    mimetypes = set(app.config.get('COMPRESS_MIMETYPES', ('text/html', 'application/json')))
+
+    @app.after_request
+    def comprimir_respuesta(response):
+        # Archivos servidos con send_file/streams y respuestas ya codificadas se dejan intactos
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in mimetypes):
+            return response
+
+        datos = response.get_data()
+
+        # ETag débil: equivalente semánticamente sin importar la codificación
+        if request.method in ('GET', 'HEAD') and not response.headers.get('ETag'):
+            response.set_etag(hashlib.md5(datos).hexdigest(), weak=True)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                metricas_compresion.registrar(request.endpoint, no_modificado=True)
+                return response
+
+        response.vary.add('Accept-Encoding')
+        codificacion = _elegir_codificacion()
+        if codificacion is None or len(datos) < tamano_minimo:
+            metricas_compresion.registrar(request.endpoint)
+            return response
+
+        comprimido = _comprimir(datos, codificacion, nivel)
+        response.set_data(comprimido)
+        response.headers['Content-Encoding'] = codificacion
+        metricas_compresion.registrar(request.endpoint, len(datos), len(comprimido))
+        return response
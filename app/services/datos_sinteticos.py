@@ -0,0 +1,446 @@
+"""
+Generador de datos sintéticos
+Crea volúmenes realistas (tutores, veterinarios, mascotas, citas, pagos, historiales,
+medicamentos y lotes) para benchmarks y pruebas de carga.
+
+- Determinista: cada bloque de 1000 registros usa su propio generador aleatorio derivado
+  de (semilla, entidad, bloque), así que el resultado no depende del orden ni de reanudar.
+- Idempotente: tutores, veterinarios, mascotas, medicamentos y lotes tienen una clave natural
+  (username, chip, código) y se insertan con upsert; las citas de una mascota (con sus pagos
+  e historiales) solo se generan si la mascota aún no tiene citas. Repetir el comando
+  completa lo que falte sin duplicar.
+- Rápido: INSERT masivos (executemany de Core, sin pasar por el ORM) y un commit por bloque.
+
+Uso:
+    flask generar-datos --perfil grande --semilla 42
+    flask generar-datos --tutores 5000 --mascotas 15000 --citas 200000
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy import func, insert, select, update
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import (Cita, HistorialClinico, Lote, Mascota, Medicamento, Pago,
+                        Usuario)
+from app.services.alertas_inventario import escanear as escanear_inventario
+from app.services.busqueda import reindexar
+from app.services.carga_masiva import upsert_por_clave
+
+BLOQUE = 1000
+
+PREFIJO_TUTOR = 'sint.tutor.'
+PREFIJO_VETERINARIO = 'sint.vet.'
+PREFIJO_CHIP = 'SINT-'
+PREFIJO_MEDICAMENTO = 'SINT-MED-'
+PREFIJO_LOTE = 'SINT-L-'
+
+PASSWORD_DEMO = 'demo123'
+
+PERFILES = {
+    'pequeno': {'tutores': 1000, 'veterinarios': 20, 'mascotas': 3000, 'citas': 50000,
+                'medicamentos': 100, 'lotes': 500},
+    'mediano': {'tutores': 10000, 'veterinarios': 60, 'mascotas': 30000, 'citas': 500000,
+                'medicamentos': 300, 'lotes': 2000},
+    'grande': {'tutores': 100000, 'veterinarios': 200, 'mascotas': 300000, 'citas': 5000000,
+               'medicamentos': 500, 'lotes': 5000},
+}
+
+NOMBRES = ['Juan', 'María', 'Carlos', 'Ana', 'Luis', 'Sofía', 'Pedro', 'Lucía', 'Jorge', 'Valeria',
+           'Diego', 'Camila', 'Miguel', 'Daniela', 'José', 'Gabriela', 'Andrés', 'Paola', 'Fernando', 'Carla']
+APELLIDOS = ['Pérez', 'Gómez', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'Sánchez', 'Romero',
+             'Torres', 'Flores', 'Vargas', 'Rojas', 'Mamani', 'Quispe', 'Gutiérrez', 'Castro']
+CIUDADES = ['La Paz', 'El Alto', 'Cochabamba', 'Santa Cruz', 'Sucre', 'Oruro', 'Tarija', 'Potosí']
+NOMBRES_MASCOTA = ['Max', 'Luna', 'Rocky', 'Bella', 'Toby', 'Lola', 'Simba', 'Nala', 'Coco', 'Kira',
+                   'Bruno', 'Mia', 'Thor', 'Canela', 'Zeus', 'Frida', 'Oreo', 'Pelusa', 'Chispa', 'Manchas']
+ESPECIES = [('Perro', 55), ('Gato', 35), ('Ave', 4), ('Conejo', 3), ('Hámster', 3)]
+RAZAS = {
+    'Perro': ['Mestizo', 'Labrador', 'Pastor Alemán', 'Poodle', 'Bulldog', 'Chihuahua', 'Golden Retriever'],
+    'Gato': ['Mestizo', 'Siamés', 'Persa', 'Angora', 'Bengalí'],
+    'Ave': ['Periquito', 'Canario', 'Loro'],
+    'Conejo': ['Holandés', 'Cabeza de León'],
+    'Hámster': ['Sirio', 'Ruso'],
+}
+COLORES = ['Negro', 'Blanco', 'Café', 'Gris', 'Atigrado', 'Dorado', 'Manchado']
+TIPOS_CITA = [('Consulta', 60), ('Control', 15), ('Vacunación', 15), ('Emergencia', 5), ('Cirugía', 5)]
+MOTIVOS = ['Control anual', 'Vómitos', 'Diarrea', 'Vacuna anual', 'Cojera', 'Pérdida de apetito',
+           'Revisión post-operatoria', 'Problemas de piel', 'Tos', 'Desparasitación']
+DIAGNOSTICOS = ['Gastroenteritis leve', 'Dermatitis alérgica', 'Otitis externa', 'Sano',
+                'Parásitos intestinales', 'Esguince leve', 'Infección respiratoria']
+METODOS_PAGO = ['efectivo', 'tarjeta_debito', 'tarjeta_credito', 'transferencia_bancaria', 'qr_simple']
+CATEGORIAS_MEDICAMENTO = ['antibiotico', 'analgesico', 'antiparasitario', 'vacuna', 'antiinflamatorio']
+
+
+def _rng(semilla, entidad, bloque):
+    """Generador independiente por (semilla, entidad, bloque)"""
+    return random.Random(f'{semilla}:{entidad}:{bloque}')
+
+
+def _ponderado(rng, opciones):
+    return rng.choices([o for o, _ in opciones], weights=[p for _, p in opciones])[0]
+
+
+def _bloques(total):
+    for inicio in range(0, total, BLOQUE):
+        yield inicio // BLOQUE, range(inicio, min(inicio + BLOQUE, total))
+
+
+class GeneradorDatos:
+    """Genera y escribe un conjunto de datos sintético reproducible"""
+
+    def __init__(self, semilla=42, fecha_base=None, log=print, **volumenes):
+        self.semilla = semilla
+        self.fecha_base = fecha_base or date.today()
+        self.log = log
+        self.volumenes = dict(PERFILES['pequeno'])
+        self.volumenes.update({k: v for k, v in volumenes.items() if v is not None})
+        self._password_hash = generate_password_hash(PASSWORD_DEMO)
+
+    def _fecha_hora(self, rng, dias_atras, dias_adelante=0):
+        dia = self.fecha_base + timedelta(days=rng.randint(-dias_atras, dias_adelante))
+        return datetime(dia.year, dia.month, dia.day, rng.randint(8, 19), rng.choice((0, 15, 30, 45)))
+
+    def _progreso(self, entidad, hechos, total, inicio):
+        self.log(f"  {entidad}: {hechos}/{total} ({time.perf_counter() - inicio:.1f}s)")
+
+    # --------------------------------------------
+    # Usuarios
+    # --------------------------------------------
+
+    def _usuario(self, rng, prefijo, n, rol):
+        nombre, apellido = rng.choice(NOMBRES), rng.choice(APELLIDOS)
+        username = f'{prefijo}{n:06d}'
+        return {
+            'username': username,
+            'email': f'{username}@demo.vet',
+            'password_hash': self._password_hash,
+            'nombre': nombre,
+            'apellido': apellido,
+            'telefono': f'7{rng.randint(0, 9999999):07d}',
+            'ciudad': rng.choice(CIUDADES),
+            'direccion': f'Calle {rng.randint(1, 300)} #{rng.randint(1, 2000)}',
+            'rol': rol,
+            'activo': True,
+            'verificado': True,
+            'fecha_registro': self._fecha_hora(rng, 1095),
+        }
+
+    def generar_veterinarios(self):
+        from app.controllers.admin.utils import LISTA_ESPECIALIDADES
+
+        filas = []
+        for n in range(self.volumenes['veterinarios']):
+            rng = _rng(self.semilla, 'veterinario', n)
+            fila = self._usuario(rng, PREFIJO_VETERINARIO, n, 'veterinario')
+            fila.update({
+                'especialidad': rng.choice(LISTA_ESPECIALIDADES),
+                'licencia_profesional': f'SINT-VET-{n:05d}',
+                'anos_experiencia': rng.randint(1, 25),
+            })
+            filas.append(fila)
+        insertadas, _ = upsert_por_clave(Usuario, 'username', filas)
+        db.session.commit()
+        self.log(f"  veterinarios: {insertadas} nuevos de {len(filas)}")
+
+    def generar_tutores(self):
+        total, inicio, insertadas = self.volumenes['tutores'], time.perf_counter(), 0
+        for bloque, indices in _bloques(total):
+            rng = _rng(self.semilla, 'tutor', bloque)
+            filas = [self._usuario(rng, PREFIJO_TUTOR, n, 'tutor') for n in indices]
+            insertadas += upsert_por_clave(Usuario, 'username', filas)[0]
+            db.session.commit()
+            if bloque % 20 == 19:
+                self._progreso('tutores', indices[-1] + 1, total, inicio)
+        self.log(f"  tutores: {insertadas} nuevos de {total}")
+
+    def _ids_por_indice(self, prefijo):
+        """{n: id} de los usuarios sintéticos con ese prefijo"""
+        filas = db.session.execute(
+            select(Usuario.username, Usuario.id).where(Usuario.username.like(f'{prefijo}%'))
+        ).all()
+        return {int(username[len(prefijo):]): id_ for username, id_ in filas}
+
+    # --------------------------------------------
+    # Mascotas
+    # --------------------------------------------
+
+    def generar_mascotas(self, tutores):
+        total, inicio, insertadas = self.volumenes['mascotas'], time.perf_counter(), 0
+        cantidad_tutores = len(tutores)
+        for bloque, indices in _bloques(total):
+            rng = _rng(self.semilla, 'mascota', bloque)
+            filas = []
+            for n in indices:
+                especie = _ponderado(rng, ESPECIES)
+                # Los primeros N mascotas cubren a todos los tutores; el resto se reparte al azar
+                tutor = n if n < cantidad_tutores else rng.randrange(cantidad_tutores)
+                filas.append({
+                    'chip_identificacion': f'{PREFIJO_CHIP}{n:09d}',
+                    'nombre': rng.choice(NOMBRES_MASCOTA),
+                    'especie': especie,
+                    'raza': rng.choice(RAZAS[especie]),
+                    'sexo': rng.choice(('Macho', 'Hembra')),
+                    'fecha_nacimiento': self.fecha_base - timedelta(days=rng.randint(60, 5000)),
+                    'peso': round(rng.uniform(0.1, 5) if especie in ('Ave', 'Hámster') else rng.uniform(1.5, 45), 1),
+                    'color': rng.choice(COLORES),
+                    'esterilizado': rng.random() < 0.4,
+                    'activo': True,
+                    'fecha_registro': self._fecha_hora(rng, 1095),
+                    'tutor_id': tutores[tutor],
+                })
+            insertadas += upsert_por_clave(Mascota, 'chip_identificacion', filas)[0]
+            db.session.commit()
+            if bloque % 20 == 19:
+                self._progreso('mascotas', indices[-1] + 1, total, inicio)
+        self.log(f"  mascotas: {insertadas} nuevas de {total}")
+
+    def _mascotas_por_indice(self):
+        """{n: (id, tutor_id)} de las mascotas sintéticas"""
+        filas = db.session.execute(
+            select(Mascota.chip_identificacion, Mascota.id, Mascota.tutor_id)
+            .where(Mascota.chip_identificacion.like(f'{PREFIJO_CHIP}%'))
+        ).all()
+        return {int(chip[len(PREFIJO_CHIP):]): (id_, tutor_id) for chip, id_, tutor_id in filas}
+
+    # --------------------------------------------
+    # Citas, pagos e historiales
+    # --------------------------------------------
+
+    def _cita(self, rng, mascota_id, tutor_id, veterinarios):
+        futura = rng.random() < 0.08
+        fecha = self._fecha_hora(rng, 0 if futura else 1095, 30 if futura else -1)
+        if futura:
+            estado = _ponderado(rng, [('pendiente', 60), ('confirmada', 40)])
+        else:
+            estado = _ponderado(rng, [('completada', 82), ('cancelada', 12), ('no_asistio', 6)])
+        tipo = _ponderado(rng, TIPOS_CITA)
+        return {
+            'fecha': fecha,
+            'duracion': 60 if tipo == 'Cirugía' else 30,
+            'tipo': tipo,
+            'motivo': rng.choice(MOTIVOS),
+            'urgencia': 'alta' if tipo == 'Emergencia' else 'normal',
+            'estado': estado,
+            'diagnostico': rng.choice(DIAGNOSTICOS) if estado == 'completada' else None,
+            'costo': float(rng.choice((50, 80, 100, 120, 150, 250))),
+            'pagado': estado == 'completada',
+            'metodo_pago': rng.choice(METODOS_PAGO) if estado == 'completada' else None,
+            'fecha_creacion': fecha - timedelta(days=rng.randint(1, 10)),
+            'fecha_fin_atencion': fecha + timedelta(minutes=30) if estado == 'completada' else None,
+            'fecha_cancelacion': fecha - timedelta(days=1) if estado == 'cancelada' else None,
+            'calificacion': rng.randint(3, 5) if estado == 'completada' and rng.random() < 0.3 else None,
+            'mascota_id': mascota_id,
+            'tutor_id': tutor_id,
+            'veterinario_id': rng.choice(veterinarios),
+        }
+
+    def _pago(self, rng, codigo, cita_id, cita):
+        porcentaje_empresa = 57.14
+        monto = cita['costo']
+        return {
+            'codigo_pago': codigo,
+            'monto': monto,
+            'monto_pagado': monto,
+            'porcentaje_empresa': porcentaje_empresa,
+            'porcentaje_veterinario': round(100 - porcentaje_empresa, 2),
+            'monto_empresa': round(monto * porcentaje_empresa / 100, 2),
+            'monto_veterinario': round(monto * (100 - porcentaje_empresa) / 100, 2),
+            'metodo_pago': cita['metodo_pago'],
+            'estado': 'completado',
+            'descripcion': f"Pago de cita: {cita['motivo']}",
+            'fecha_creacion': cita['fecha'],
+            'fecha_pago': cita['fecha'],
+            'cita_id': cita_id,
+            'usuario_id': cita['tutor_id'],
+            'veterinario_id': cita['veterinario_id'],
+        }
+
+    def _historial(self, rng, cita_id, cita):
+        return {
+            'mascota_id': cita['mascota_id'],
+            'cita_id': cita_id,
+            'fecha': cita['fecha'],
+            'tipo_registro': cita['tipo'].lower(),
+            'motivo_consulta': cita['motivo'],
+            'peso': round(rng.uniform(1.5, 45), 1),
+            'temperatura': round(rng.uniform(37.5, 39.5), 1),
+            'frecuencia_cardiaca': rng.randint(60, 180),
+            'diagnostico_definitivo': cita['diagnostico'],
+            'tratamiento_aplicado': 'Tratamiento sintomático',
+            'creado_por_id': cita['veterinario_id'],
+        }
+
+    def generar_citas(self, mascotas, veterinarios):
+        """
+        Reparte exactamente `citas` entre las mascotas. Las mascotas que ya tienen citas
+        se omiten, así que repetir el comando no duplica.
+        """
+        total_citas = self.volumenes['citas']
+        cantidad_mascotas = self.volumenes['mascotas']
+        base, resto = divmod(total_citas, cantidad_mascotas) if cantidad_mascotas else (0, 0)
+        lista_veterinarios = [veterinarios[n] for n in sorted(veterinarios)]
+        inicio = time.perf_counter()
+        contador = {'citas': 0, 'pagos': 0, 'historiales': 0}
+
+        for bloque, indices in _bloques(cantidad_mascotas):
+            ids = [mascotas[n][0] for n in indices if n in mascotas]
+            con_citas = set(db.session.execute(
+                select(Cita.mascota_id).where(Cita.mascota_id.in_(ids)).distinct()
+            ).scalars())
+
+            rng = _rng(self.semilla, 'cita', bloque)
+            citas, claves, nuevas = [], [], []
+            for n in indices:
+                cantidad = base + (1 if n < resto else 0)
+                # Se consume el generador aunque se omita la mascota, para que el resto no cambie
+                generadas = [self._cita(rng, *mascotas[n], lista_veterinarios) for _ in range(cantidad)] \
+                    if n in mascotas else []
+                if n not in mascotas or mascotas[n][0] in con_citas:
+                    continue
+                nuevas.append(mascotas[n][0])
+                citas.extend(generadas)
+                claves.extend(f'{PREFIJO_CHIP}{n:09d}-{k:04d}' for k in range(cantidad))
+
+            if citas:
+                db.session.execute(insert(Cita.__table__), citas)
+                # Los ids se asignan en orden de inserción: se leen en lugar de usar RETURNING,
+                # que en lotes grandes reordena los resultados con un costo cuadrático
+                ids_citas = db.session.execute(
+                    select(Cita.id).where(Cita.mascota_id.in_(nuevas)).order_by(Cita.id)
+                ).scalars().all()
+
+                rng_detalle = _rng(self.semilla, 'detalle', bloque)
+                pagos, historiales = [], []
+                for cita_id, cita, clave in zip(ids_citas, citas, claves):
+                    if cita['estado'] != 'completada':
+                        continue
+                    pagos.append(self._pago(rng_detalle, f'P-{clave}', cita_id, cita))
+                    if rng_detalle.random() < 0.6:
+                        historiales.append(self._historial(rng_detalle, cita_id, cita))
+                if pagos:
+                    db.session.execute(insert(Pago.__table__), pagos)
+                if historiales:
+                    db.session.execute(insert(HistorialClinico.__table__), historiales)
+
+                contador['citas'] += len(citas)
+                contador['pagos'] += len(pagos)
+                contador['historiales'] += len(historiales)
+
+            # Citas, pagos e historiales del bloque se confirman juntos
+            db.session.commit()
+            if bloque % 10 == 9:
+                self._progreso('citas', contador['citas'], total_citas, inicio)
+
+        self.log(f"  citas: {contador['citas']} nuevas, pagos: {contador['pagos']}, "
+                 f"historiales: {contador['historiales']}")
+
+    # --------------------------------------------
+    # Inventario
+    # --------------------------------------------
+
+    def generar_inventario(self):
+        filas = []
+        for n in range(self.volumenes['medicamentos']):
+            rng = _rng(self.semilla, 'medicamento', n)
+            categoria = rng.choice(CATEGORIAS_MEDICAMENTO)
+            precio = round(rng.uniform(5, 300), 2)
+            filas.append({
+                'codigo': f'{PREFIJO_MEDICAMENTO}{n:05d}',
+                'nombre': f'{categoria.capitalize()} {n}',
+                'categoria': categoria,
+                'presentacion': rng.choice(('Tabletas', 'Jarabe', 'Inyectable', 'Crema')),
+                'unidad_medida': 'unidad',
+                'stock_actual': 0,
+                'stock_minimo': rng.randint(5, 30),
+                'precio_compra': precio,
+                'precio_venta': round(precio * 1.4, 2),
+                'activo': True,
+            })
+        insertados, _ = upsert_por_clave(Medicamento, 'codigo', filas)
+        db.session.commit()
+
+        medicamentos = dict(db.session.execute(
+            select(Medicamento.codigo, Medicamento.id)
+            .where(Medicamento.codigo.like(f'{PREFIJO_MEDICAMENTO}%'))
+        ).all())
+        codigos = [f'{PREFIJO_MEDICAMENTO}{n:05d}' for n in range(self.volumenes['medicamentos'])]
+        if not codigos:
+            return
+
+        insertados_lotes = 0
+        for bloque, indices in _bloques(self.volumenes['lotes']):
+            rng = _rng(self.semilla, 'lote', bloque)
+            lotes = [{
+                'lote': f'{PREFIJO_LOTE}{n:07d}',
+                'medicamento_id': medicamentos[codigos[n % len(codigos)]],
+                'cantidad': rng.randint(0, 200),
+                # Algunos lotes vencidos o por vencer para ejercitar las alertas
+                'fecha_vencimiento': self.fecha_base + timedelta(days=rng.randint(-60, 720)),
+                'fecha_ingreso': self._fecha_hora(rng, 365),
+            } for n in indices]
+            insertados_lotes += upsert_por_clave(Lote, 'lote', lotes)[0]
+            db.session.commit()
+
+        # Stock y vencimiento informativo = agregados de sus lotes
+        ids = list(medicamentos.values())
+        stock = select(func.coalesce(func.sum(Lote.cantidad), 0)).where(
+            Lote.medicamento_id == Medicamento.id).scalar_subquery()
+        vencimiento = select(func.min(Lote.fecha_vencimiento)).where(
+            Lote.medicamento_id == Medicamento.id, Lote.cantidad > 0).scalar_subquery()
+        db.session.execute(
+            update(Medicamento).where(Medicamento.id.in_(ids))
+            .values(stock_actual=stock, fecha_vencimiento=vencimiento)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        self.log(f"  medicamentos: {insertados} nuevos, lotes: {insertados_lotes} nuevos")
+
+    def ejecutar(self):
+        """Genera todo el conjunto de datos en orden de dependencias"""
+        inicio = time.perf_counter()
+        self.log(f"Generando datos (semilla={self.semilla}, fecha base={self.fecha_base.isoformat()})")
+        self.generar_veterinarios()
+        self.generar_tutores()
+        tutores = self._ids_por_indice(PREFIJO_TUTOR)
+        veterinarios = self._ids_por_indice(PREFIJO_VETERINARIO)
+        if tutores:
+            self.generar_mascotas(tutores)
+        if veterinarios:
+            self.generar_citas(self._mascotas_por_indice(), veterinarios)
+        self.generar_inventario()
+        # Los INSERT masivos no pasan por el ORM: el índice de búsqueda y las alertas de
+        # inventario se recalculan al final
+        reindexar(log=self.log)
+        conteos = escanear_inventario()
+        self.log(f"[OK] Alertas de inventario: {conteos['vencido']} vencidos, "
+                 f"{conteos['por_vencer']} por vencer, {conteos['bajo_stock']} con bajo stock")
+        self.log(f"[OK] Datos sintéticos generados en {time.perf_counter() - inicio:.1f}s")
+
+
+def register_datos_sinteticos(app):
+    """Registra el comando generar-datos"""
+
+    @app.cli.command('generar-datos')
+    @click.option('--perfil', type=click.Choice(list(PERFILES)), default='pequeno',
+                  help='Volúmenes predefinidos (grande: 100k tutores, 300k mascotas, 5M citas)')
+    @click.option('--semilla', default=42, type=int, help='Semilla para datos reproducibles')
+    @click.option('--fecha-base', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='Fecha de referencia (por defecto hoy); fijarla para repetir exactamente')
+    @click.option('--tutores', type=int)
+    @click.option('--veterinarios', type=int)
+    @click.option('--mascotas', type=int)
+    @click.option('--citas', type=int)
+    @click.option('--medicamentos', type=int)
+    @click.option('--lotes', type=int)
+    def generar_datos(perfil, semilla, fecha_base, **volumenes):
+        """Genera datos sintéticos masivos (idempotente y determinista)"""
+        valores = dict(PERFILES[perfil])
+        valores.update({k: v for k, v in volumenes.items() if v is not None})
+        GeneradorDatos(
+            semilla=semilla,
+            fecha_base=fecha_base.date() if fecha_base else None,
+            **valores
+        ).ejecutar()
@@ -0,0 +1,202 @@
+"""
+Eliminación por conjuntos de tutores y veterinarios
+Antes se borraba con el ORM: cargar cada mascota y cada cita (con sus archivos,
+servicios, vacunas...) y emitir un DELETE por fila, cientos de consultas para un tutor
+con historia. Aquí cada tabla dependiente se limpia con una sola sentencia
+DELETE/UPDATE ... WHERE ... IN (subconsulta), en orden de dependencias y dentro de la
+transacción de la sesión: quien llama confirma (o revierte) y registra la auditoría
+con las filas afectadas.
+
+Reglas de conservación:
+- Los pagos son registros contables y no se borran nunca. Un tutor con pagos no se
+  elimina: se anonimiza (datos personales borrados, cuenta inactiva), se desactivan
+  sus mascotas y se cancelan sus citas abiertas.
+- Un veterinario que atendió (citas completadas o en curso, historiales clínicos
+  firmados o pagos recibidos) también se anonimiza, para que la historia clínica de
+  los pacientes conserve su autor. Sus citas abiertas vuelven a la cola de pendientes.
+- En los demás casos se elimina la cuenta; las referencias opcionales a ella en otras
+  tablas (recepcionista, subido por, auditoría...) quedan en NULL.
+
+Las sentencias por Core no pasan por los eventos del ORM, así que los términos del
+índice de búsqueda se quitan aquí mismo.
+"""
+import secrets
+from datetime import datetime
+
+from sqlalchemy import delete, exists, or_, select, update
+
+from app import db
+from app.models import (
+    ArchivoCita, AuditoriaAccion, Cita, DocumentoMascota, HistorialClinico, HistorialPago,
+    Mascota, Notificacion, Pago, Receta, ServicioCita, Usuario, Vacuna
+)
+from app.services.busqueda import quitar_del_indice
+from app.services.notificaciones import recontar
+from app.services.principal import invalidar_principales
+
+ESTADOS_ABIERTOS = ('pendiente', 'confirmada')
+ESTADOS_ATENDIDA = ('en_progreso', 'completada')
+
+# Referencias opcionales a usuarios que quedan en NULL al eliminar la cuenta
+REFERENCIAS_OPCIONALES = (
+    (Cita, 'recepcionista_id'),
+    (Cita, 'veterinario_id'),
+    (Vacuna, 'veterinario_id'),
+    (DocumentoMascota, 'subido_por_id'),
+    (ArchivoCita, 'subido_por_id'),
+    (Pago, 'veterinario_id'),
+    (Pago, 'procesado_por_id'),
+    (HistorialPago, 'usuario_id'),
+    (AuditoriaAccion, 'usuario_id'),
+)
+
+
+class ResultadoEliminacion:
+    """Modo aplicado ('eliminado' o 'anonimizado') y filas afectadas por tabla"""
+
+    def __init__(self, modo):
+        self.modo = modo
+        self.eliminadas = {}
+        self.actualizadas = {}
+
+    def como_dict(self):
+        """Para datos_nuevos de la auditoría"""
+        return {'modo': self.modo, 'eliminadas': self.eliminadas, 'actualizadas': self.actualizadas}
+
+    def resumen(self):
+        """Texto corto para la descripción de la auditoría y los mensajes"""
+        partes = [f'{n} {tabla}' for tabla, n in self.eliminadas.items() if tabla != 'usuarios']
+        return ', '.join(partes) if partes else 'sin registros asociados'
+
+
+def _borrar(resultado, modelo, condicion):
+    filas = db.session.execute(delete(modelo.__table__).where(condicion)).rowcount
+    if filas:
+        tabla = modelo.__tablename__
+        resultado.eliminadas[tabla] = resultado.eliminadas.get(tabla, 0) + filas
+
+
+def _actualizar(resultado, modelo, condicion, valores, clave=None):
+    filas = db.session.execute(update(modelo.__table__).where(condicion).values(**valores)).rowcount
+    if filas:
+        clave = clave or f"{modelo.__tablename__}.{','.join(valores)}"
+        resultado.actualizadas[clave] = resultado.actualizadas.get(clave, 0) + filas
+
+
+def _tiene(*condiciones):
+    return db.session.execute(select(or_(*(exists().where(c) for c in condiciones)))).scalar()
+
+
+def _abiertas(condicion):
+    """Citas de la condición que todavía no se atendieron ni cancelaron"""
+    return condicion & Cita.estado.in_(ESTADOS_ABIERTOS)
+
+
+def _desvincular_usuario(resultado, usuario_id):
+    for modelo, columna in REFERENCIAS_OPCIONALES:
+        columna = getattr(modelo, columna)
+        _actualizar(resultado, modelo, columna == usuario_id, {columna.key: None})
+
+
+def _borrar_cuenta(resultado, usuario):
+    """Notificaciones, referencias opcionales, índice y la fila del usuario"""
+    usuario_id = usuario.id
+    _borrar(resultado, Notificacion, Notificacion.usuario_id == usuario_id)
+    recontar([usuario_id])
+    _desvincular_usuario(resultado, usuario_id)
+    quitar_del_indice('usuario', [usuario_id])
+    _borrar(resultado, Usuario, Usuario.id == usuario_id)
+    db.session.expunge(usuario)
+    invalidar_principales()
+
+
+def _anonimizar(resultado, usuario):
+    """Borra los datos personales y desactiva la cuenta (por el ORM: actualiza índice y sesión)"""
+    _borrar(resultado, Notificacion, Notificacion.usuario_id == usuario.id)
+    recontar([usuario.id])
+    usuario.username = f'eliminado.{usuario.id}'
+    usuario.email = f'eliminado.{usuario.id}@anonimo.invalid'
+    usuario.set_password(secrets.token_urlsafe(32))
+    usuario.nombre = 'Usuario'
+    usuario.apellido = 'eliminado'
+    for campo in ('cedula', 'telefono', 'telefono_emergencia', 'direccion', 'ciudad',
+                  'fecha_nacimiento', 'licencia_profesional', 'foto_perfil'):
+        setattr(usuario, campo, None)
+    usuario.activo = False
+    usuario.verificado = False
+    usuario.notificaciones_email = False
+    usuario.notificaciones_sms = False
+    db.session.flush()
+    resultado.actualizadas['usuarios.anonimizado'] = 1
+
+
+def eliminar_tutor(tutor):
+    """
+    Elimina (o anonimiza, si tiene pagos) a un tutor con sus mascotas y citas.
+    No confirma: la transacción es de quien llama.
+    """
+    tutor_id = tutor.id
+    mascotas = select(Mascota.id).where(Mascota.tutor_id == tutor_id)
+    condicion_citas = or_(Cita.tutor_id == tutor_id, Cita.mascota_id.in_(mascotas))
+
+    if _tiene(Pago.usuario_id == tutor_id):
+        resultado = ResultadoEliminacion('anonimizado')
+        _actualizar(resultado, Cita,
+                    _abiertas(Cita.tutor_id == tutor_id),
+                    {'estado': 'cancelada', 'fecha_cancelacion': datetime.utcnow(),
+                     'razon_cancelacion': 'Cuenta del tutor eliminada'},
+                    clave='citas.canceladas')
+        _actualizar(resultado, Mascota, (Mascota.tutor_id == tutor_id) & (Mascota.activo == True),
+                    {'activo': False})
+        _anonimizar(resultado, tutor)
+        return resultado
+
+    resultado = ResultadoEliminacion('eliminado')
+    citas = select(Cita.id).where(condicion_citas)
+
+    # Lo que sobrevive a las citas y mascotas pierde la referencia (pagos de terceros,
+    # notificaciones de otros usuarios)
+    _actualizar(resultado, Pago, Pago.cita_id.in_(citas), {'cita_id': None})
+    _borrar(resultado, Notificacion, Notificacion.usuario_id == tutor_id)
+    _actualizar(resultado, Notificacion, Notificacion.cita_id.in_(citas), {'cita_id': None})
+    _actualizar(resultado, Notificacion, Notificacion.mascota_id.in_(mascotas), {'mascota_id': None})
+
+    # Dependientes de las citas
+    _borrar(resultado, Receta, Receta.cita_id.in_(citas))
+    _borrar(resultado, ServicioCita, ServicioCita.cita_id.in_(citas))
+    _borrar(resultado, ArchivoCita, ArchivoCita.cita_id.in_(citas))
+
+    # Dependientes de las mascotas
+    _borrar(resultado, HistorialClinico, HistorialClinico.mascota_id.in_(mascotas))
+    _actualizar(resultado, HistorialClinico, HistorialClinico.cita_id.in_(citas), {'cita_id': None})
+    _borrar(resultado, Vacuna, Vacuna.mascota_id.in_(mascotas))
+    _borrar(resultado, DocumentoMascota, DocumentoMascota.mascota_id.in_(mascotas))
+
+    _borrar(resultado, Cita, condicion_citas)
+    quitar_del_indice('mascota', mascotas)
+    _borrar(resultado, Mascota, Mascota.tutor_id == tutor_id)
+    _borrar_cuenta(resultado, tutor)
+    return resultado
+
+
+def eliminar_veterinario(veterinario):
+    """
+    Elimina (o anonimiza, si atendió) a un veterinario. Sus citas abiertas quedan sin
+    asignar y pendientes. No confirma: la transacción es de quien llama.
+    """
+    vet_id = veterinario.id
+    atendio = _tiene(
+        HistorialClinico.creado_por_id == vet_id,
+        Pago.veterinario_id == vet_id,
+        (Cita.veterinario_id == vet_id) & Cita.estado.in_(ESTADOS_ATENDIDA),
+    )
+    resultado = ResultadoEliminacion('anonimizado' if atendio else 'eliminado')
+
+    _actualizar(resultado, Cita, _abiertas(Cita.veterinario_id == vet_id),
+                {'veterinario_id': None, 'estado': 'pendiente', 'fecha_confirmacion': None},
+                clave='citas.reasignadas')
+    if atendio:
+        _anonimizar(resultado, veterinario)
+    else:
+        _borrar_cuenta(resultado, veterinario)
+    return resultado
@@ -0,0 +1,394 @@
+"""
+Canales de eventos en vivo (Server-Sent Events, con sondeo como respaldo)
+
+Los veterinarios se enteraban de las citas nuevas recargando el dashboard o la lista
+de pendientes. Ahora:
+
+- Publicar: `publicar(canal, tipo, datos)` agrega una fila a `eventos` en la
+  transacción actual, así que el evento existe si y solo si el cambio se confirmó.
+- Difundir: en cada proceso web, un hilo (`Difusor`) lee los eventos nuevos por llave
+  (`id > último`) cada EVENTOS_INTERVALO segundos, solo mientras haya navegadores
+  suscritos, y los reparte a sus colas en memoria. Es el bus compartido: sirve con
+  varios workers y servidores sin otro servicio. Al confirmar un evento en el propio
+  proceso, el hilo se despierta en el momento.
+- Ids fuera de orden: con varios workers (SQL Server) un INSERT puede obtener el id 10,
+  confirmar después que el 11 y quedar por debajo del último leído. El difusor anota
+  los huecos de ids que ve y los vuelve a consultar durante EVENTOS_ESPERA_HUECOS
+  segundos; el reenvío incluye los ids algo menores que `desde` creados poco antes que
+  él. Los eventos pueden llegar desordenados y repetidos: el cliente descarta por id.
+- Entregar: `respuesta_sse` mantiene abierta la respuesta `text/event-stream`; cada
+  evento lleva su id, y al reconectar el navegador envía Last-Event-ID y se reenvían
+  los que faltan desde la tabla. La conexión se cierra cada EVENTOS_SSE_DURACION
+  segundos para liberar el hilo; el navegador reconecta solo.
+
+Cada stream ocupa un hilo del worker, así que se admiten como máximo
+EVENTOS_MAX_STREAMS por proceso (por defecto la mitad de los hilos). Sin lugar, se
+responde 503 y el navegador pasa a `respuesta_sondeo` (una consulta por llave cada
+pocos segundos) hasta volver a intentarlo.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from flask import Response, current_app, has_app_context, jsonify, url_for
+from sqlalchemy import and_, event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Evento
+
+CANAL_CITAS = 'citas'  # altas y cambios de estado de citas pendientes (todos los veterinarios)
+MAX_REENVIO = 200  # eventos reenviados al reconectar; si faltan más, el cliente recarga
+LATIDO = 15  # segundos entre comentarios de keep-alive en el stream
+LOTE = 500  # eventos leídos por vuelta del difusor
+HUECO_MAXIMO = 50  # huecos de ids más anchos son saltos de IDENTITY (reinicio de SQL Server), no transacciones en curso
+
+
+# ============================================
+# PUBLICACIÓN
+# ============================================
+
+def publicar(canal, tipo, datos):
+    """Publica un evento en la transacción actual (se difunde al confirmarla)"""
+    db.session.add(Evento(canal=canal, tipo=tipo, datos=json.dumps(datos, default=str)))
+    db.session.info['eventos_publicados'] = True
+
+
+def publicar_cita(cita, tipo, antes=None):
+    """
+    Publica el estado de una cita para las vistas de los veterinarios
+
+    `pendiente` indica si la cita queda en la cola de pendientes; `antes` trae el estado
+    y el veterinario previos al cambio (aún sin confirmar) para que el cliente ajuste
+    sus contadores. Si el cambio se hizo con un UPDATE directo (sin historial en la
+    sesión), se pasa `antes` explícito. La cita debe tener id (llamar después de flush).
+    """
+    if antes is None:
+        estado_antes = _valor_previo(cita, 'estado')
+        veterinario_antes = _valor_previo(cita, 'veterinario_id')
+        antes = {
+            'pendiente': estado_antes == 'pendiente' if tipo != 'cita_nueva' else False,
+            'veterinario_id': int(veterinario_antes) if veterinario_antes else None,
+        }
+    publicar(CANAL_CITAS, tipo, {
+        'id': cita.id,
+        'estado': cita.estado,
+        'pendiente': cita.estado == 'pendiente',
+        'veterinario_id': int(cita.veterinario_id) if cita.veterinario_id else None,
+        'especialidad': cita.veterinario.especialidad if cita.veterinario else None,
+        'antes': antes,
+        'fecha': cita.fecha.strftime('%Y-%m-%d'),
+        'fecha_texto': cita.fecha.strftime('%d/%m/%Y'),
+        'hora': cita.fecha.strftime('%H:%M'),
+        'mascota': cita.mascota.nombre if cita.mascota else '',
+        'tutor': cita.tutor.nombre_completo if cita.tutor else '',
+        'tipo': cita.tipo,
+        'motivo': cita.motivo,
+        'urgencia': cita.urgencia,
+        'url_aceptar': url_for('veterinario.aceptar_cita', id=cita.id),
+        'url_atender': url_for('veterinario.atender_cita', id=cita.id),
+        'url_ver': url_for('veterinario.ver_cita', id=cita.id),
+    })
+
+
+def _valor_previo(objeto, atributo):
+    """Valor del atributo antes de los cambios pendientes de la sesión"""
+    historia = inspect(objeto).attrs[atributo].history
+    if historia.deleted:
+        return historia.deleted[0]
+    return getattr(objeto, atributo)
+
+
+@event.listens_for(Session, 'after_commit')
+def _despertar_difusor(session):
+    if session.info.pop('eventos_publicados', False) and has_app_context():
+        difusor = current_app.extensions.get('eventos')
+        if difusor is not None:
+            difusor.despertar()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar(session):
+    session.info.pop('eventos_publicados', None)
+
+
+def _como_dict(fila):
+    return {'id': fila.id, 'canal': fila.canal, 'tipo': fila.tipo, 'datos': json.loads(fila.datos or '{}')}
+
+
+def eventos_desde(canales, desde, limite=MAX_REENVIO):
+    """
+    Eventos de los canales posteriores al id `desde`, en orden
+
+    Incluye también los de ids hasta HUECO_MAXIMO menores creados como mucho
+    EVENTOS_ESPERA_HUECOS segundos antes que el evento `desde`: pudieron confirmarse
+    después de él. Los que el cliente ya tenía los descarta él.
+    """
+    condicion = Evento.id > desde
+    fecha_desde = db.session.execute(select(Evento.fecha).where(Evento.id == desde)).scalar() if desde else None
+    if fecha_desde is not None:
+        condicion = or_(condicion, and_(
+            Evento.id > desde - HUECO_MAXIMO,
+            Evento.fecha >= fecha_desde - timedelta(seconds=current_app.config.get('EVENTOS_ESPERA_HUECOS', 10)),
+        ))
+    filas = db.session.execute(
+        select(Evento.id, Evento.canal, Evento.tipo, Evento.datos)
+        .where(condicion, Evento.canal.in_(list(canales)))
+        .order_by(Evento.id).limit(limite)
+    ).all()
+    return [_como_dict(f) for f in filas]
+
+
+def eventos_vistos():
+    """
+    Ids de los últimos eventos ya confirmados, para la página que se está generando
+
+    La página ya refleja esos cambios: el cliente los marca como vistos para no
+    aplicarlos otra vez cuando el reenvío desde el último id los incluya.
+    """
+    maximo = select(func.max(Evento.id)).scalar_subquery()
+    return db.session.execute(
+        select(Evento.id).where(Evento.id > maximo - HUECO_MAXIMO).order_by(Evento.id)
+    ).scalars().all()
+
+
+# ============================================
+# DIFUSIÓN EN EL PROCESO
+# ============================================
+
+class Suscripcion:
+    """Cola de eventos de un navegador conectado"""
+
+    def __init__(self, canales):
+        self.canales = set(canales)
+        self.cola = queue.Queue(maxsize=MAX_REENVIO)
+        self.desbordada = False  # el cliente no consume: se cierra y reconecta con Last-Event-ID
+
+    def entregar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except queue.Full:
+            self.desbordada = True
+
+
+class Difusor:
+    """Lee los eventos nuevos de la tabla y los reparte a las suscripciones del proceso"""
+
+    def __init__(self, app):
+        from config import capacidad_web
+
+        self.app = app
+        self.intervalo = app.config.get('EVENTOS_INTERVALO', 1.0)
+        self.espera_huecos = app.config.get('EVENTOS_ESPERA_HUECOS', 10)
+        self.max_streams = app.config.get('EVENTOS_MAX_STREAMS') or max(1, capacidad_web()[1] // 2)
+        self._suscripciones = set()
+        self._streams = 0
+        self._ultimo = None  # último id leído mientras hay suscripciones
+        self._huecos = {}  # id sin confirmar (todavía) por debajo de _ultimo -> hasta cuándo se reconsulta
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pid = None
+
+    def despertar(self):
+        self._despertar.set()
+
+    def ultimo_id(self):
+        """Id del último evento publicado (para que una página nueva se suscriba desde ahí)"""
+        if self._ultimo is not None and self._pid == os.getpid():
+            return self._ultimo
+        return _maximo_id()
+
+    def suscribir(self, canales):
+        suscripcion = Suscripcion(canales)
+        self._asegurar_hilo()
+        with self._lock:
+            if self._ultimo is None:
+                self._iniciar()
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def tomar_stream(self):
+        """Reserva un lugar para un stream; False si ya hay EVENTOS_MAX_STREAMS abiertos"""
+        with self._lock:
+            if self._streams >= self.max_streams:
+                return False
+            self._streams += 1
+            return True
+
+    def liberar_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    def _asegurar_hilo(self):
+        # Tras un fork (gunicorn con preload) el hilo del padre no existe en el hijo
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._bucle, name='difusor-eventos', daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            with self._lock:
+                suscripciones = list(self._suscripciones)
+                if not suscripciones:
+                    self._ultimo = None  # sin suscriptores no se consulta la BD
+                    self._huecos = {}
+                    continue
+            with self.app.app_context():
+                try:
+                    self._leer(suscripciones)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[WARN] Difusor de eventos: {e}")
+                finally:
+                    db.session.remove()
+
+    def _iniciar(self):
+        """Parte del último id, con los huecos recientes por debajo de él pendientes"""
+        ids = eventos_vistos()
+        self._ultimo = max(0, ids[-1] - HUECO_MAXIMO) if ids else 0
+        self._huecos = {}
+        for id_ in ids:
+            self._avanzar(id_)
+
+    def _avanzar(self, id_):
+        """Mueve _ultimo hasta `id_` anotando los ids saltados como huecos"""
+        if 0 < id_ - self._ultimo - 1 <= HUECO_MAXIMO:
+            limite = time.monotonic() + self.espera_huecos
+            for hueco in range(self._ultimo + 1, id_):
+                self._huecos[hueco] = limite
+        self._ultimo = id_
+
+    def _leer(self, suscripciones):
+        ahora = time.monotonic()
+        self._huecos = {id_: limite for id_, limite in self._huecos.items() if limite > ahora}
+        condicion = Evento.id > self._ultimo
+        if self._huecos:
+            condicion = or_(condicion, Evento.id.in_(list(self._huecos)))
+        filas = db.session.execute(
+            select(Evento.id, Evento.canal, Evento.tipo, Evento.datos)
+            .where(condicion).order_by(Evento.id).limit(LOTE)
+        ).all()
+        for fila in filas:
+            if fila.id in self._huecos:
+                del self._huecos[fila.id]  # se confirmó tarde: se entrega fuera de orden
+            elif fila.id > self._ultimo:
+                self._avanzar(fila.id)
+            else:
+                continue
+            evento = _como_dict(fila)
+            for suscripcion in suscripciones:
+                if evento['canal'] in suscripcion.canales:
+                    suscripcion.entregar(evento)
+        if len(filas) == LOTE:
+            self.despertar()
+
+
+def _maximo_id():
+    return db.session.execute(select(func.max(Evento.id))).scalar() or 0
+
+
+def _difusor():
+    return current_app.extensions['eventos']
+
+
+# ============================================
+# RESPUESTAS
+# ============================================
+
+def _desde(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _formato_sse(evento):
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento['datos'])}\n\n"
+
+
+def respuesta_sse(canales, desde=None):
+    """
+    Stream `text/event-stream` con los eventos de los canales
+
+    `desde` (Last-Event-ID o ?desde=): reenvía primero los eventos posteriores a ese id.
+    """
+    difusor = _difusor()
+    if not difusor.tomar_stream():
+        return Response('Sin lugar para más conexiones en vivo', status=503,
+                        headers={'Retry-After': '30'}, mimetype='text/plain')
+    try:
+        suscripcion = difusor.suscribir(canales)
+        desde = _desde(desde)
+        # Después de suscribirse, para no perder los que lleguen mientras tanto
+        pendientes = eventos_desde(canales, desde) if desde is not None else []
+    except Exception:
+        difusor.liberar_stream()
+        raise
+    duracion = current_app.config.get('EVENTOS_SSE_DURACION', 120)
+
+    def generar():
+        # No usa el contexto del request: la sesión de BD ya se liberó al empezar el stream
+        enviados = {evento['id'] for evento in pendientes}
+        fin = time.monotonic() + duracion
+        try:
+            yield "retry: 3000\n\n"
+            if len(pendientes) == MAX_REENVIO:
+                yield "event: recargar\ndata: {}\n\n"  # demasiados perdidos: mejor recargar la vista
+                return
+            for evento in pendientes:
+                yield _formato_sse(evento)
+            while time.monotonic() < fin and not suscripcion.desbordada:
+                try:
+                    evento = suscripcion.cola.get(timeout=min(LATIDO, max(0.1, fin - time.monotonic())))
+                except queue.Empty:
+                    yield ": latido\n\n"
+                    continue
+                if evento['id'] not in enviados:
+                    enviados.add(evento['id'])
+                    yield _formato_sse(evento)
+        finally:
+            difusor.cancelar(suscripcion)
+            difusor.liberar_stream()
+
+    return Response(generar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # nginx: no acumular el stream
+    })
+
+
+def respuesta_sondeo(canales, desde):
+    """JSON con los eventos posteriores a `desde` (respaldo cuando no hay lugar para SSE)"""
+    desde = _desde(desde)
+    if desde is None:
+        return jsonify({'eventos': [], 'ultimo': _difusor().ultimo_id()})
+    eventos = eventos_desde(canales, desde)
+    return jsonify({
+        'eventos': eventos,
+        'ultimo': max([desde] + [e['id'] for e in eventos]),
+        'recargar': len(eventos) == MAX_REENVIO,
+    })
+
+
+# ============================================
+# REGISTRO
+# ============================================
+
+def register_eventos(app):
+    """Crea el difusor del proceso y expone `eventos_vistos()` a las plantillas"""
+    app.extensions['eventos'] = Difusor(app)
+    app.jinja_env.globals['eventos_vistos'] = eventos_vistos
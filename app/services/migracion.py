@@ -0,0 +1,459 @@
+"""
+Motor de migración SQLite → SQL Server (o SQLite → SQLite para pruebas)
+
+- Lee cada tabla en streaming (cursor con fetchmany, paginado por rowid), sin cargarla en memoria.
+- Inserta por lotes configurables con `fast_executemany` cuando el driver lo soporta (pyodbc).
+- Migra en paralelo las tablas independientes, nivel por nivel según sus llaves foráneas.
+- Guarda un checkpoint por tabla en la propia BD destino, en la misma transacción que cada lote,
+  por lo que una ejecución interrumpida se reanuda desde el último lote confirmado.
+- Al final compara conteos y un checksum por tabla entre origen y destino.
+- Conserva los ids originales (IDENTITY_INSERT en SQL Server) para no romper las relaciones.
+
+Uso desde código:
+    motor = MotorMigracion('instance/veterinaria.db', conectar_destino, dialecto='mssql')
+    motor.ejecutar()
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time
+from decimal import Decimal
+
+TABLA_CHECKPOINTS = 'migracion_checkpoints'
+
+_PATRON_FECHA = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}')
+
+
+# ============================================
+# ESQUEMA
+# ============================================
+
+def leer_esquema(conexion):
+    """
+    Lee tablas, columnas, llaves foráneas e índices de una BD SQLite
+
+    Returns:
+        dict: {tabla: {'columns': [...], 'fks': [...], 'sql': str, 'indices': [str]}}
+    """
+    cursor = conexion.cursor()
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='table' "
+        "AND name NOT LIKE 'sqlite_%' AND name != ? ORDER BY name", (TABLA_CHECKPOINTS,)
+    )
+    tablas = cursor.fetchall()
+
+    esquema = {}
+    for tabla, sql in tablas:
+        cursor.execute(f"PRAGMA table_info([{tabla}])")
+        columnas = [{'name': r[1], 'type': r[2] or '', 'notnull': r[3], 'pk': r[5]}
+                    for r in cursor.fetchall()]
+        cursor.execute(f"PRAGMA foreign_key_list([{tabla}])")
+        fks = [{'col': r[3], 'ref_table': r[2], 'ref_col': r[4]} for r in cursor.fetchall()]
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+            (tabla,)
+        )
+        indices = [r[0] for r in cursor.fetchall()]
+        esquema[tabla] = {'columns': columnas, 'fks': fks, 'sql': sql, 'indices': indices}
+    return esquema
+
+
+def niveles_dependencia(esquema):
+    """
+    Agrupa las tablas en niveles: cada nivel solo depende de niveles anteriores,
+    así que las tablas de un mismo nivel pueden migrarse en paralelo.
+    Las tablas con dependencias cíclicas quedan juntas en un último nivel.
+    """
+    pendientes = set(esquema)
+    listas = set()
+    niveles = []
+
+    while pendientes:
+        nivel = sorted(
+            t for t in pendientes
+            if all(fk['ref_table'] in listas or fk['ref_table'] == t
+                   or fk['ref_table'] not in esquema
+                   for fk in esquema[t]['fks'])
+        )
+        if not nivel:
+            nivel = sorted(pendientes)
+        niveles.append(nivel)
+        listas.update(nivel)
+        pendientes.difference_update(nivel)
+
+    return niveles
+
+
+def convertir_tipo(tipo):
+    """Tipo de columna SQLite → SQL Server"""
+    t = tipo.upper()
+    if 'BOOL' in t:
+        return 'BIT'
+    if 'BIGINT' in t:
+        return 'BIGINT'
+    if 'INT' in t:
+        return 'INT'
+    if 'CHAR' in t:
+        longitud = re.search(r'\((\d+)\)', t)
+        return f'NVARCHAR({longitud.group(1)})' if longitud else 'NVARCHAR(MAX)'
+    if 'NUMERIC' in t or 'DECIMAL' in t:
+        precision = re.search(r'\((\d+)\s*,\s*(\d+)\)', t)
+        return f'DECIMAL({precision.group(1)},{precision.group(2)})' if precision else 'DECIMAL(18,4)'
+    if 'REAL' in t or 'FLOAT' in t or 'DOUBLE' in t:
+        return 'FLOAT'
+    if 'DATETIME' in t or 'TIMESTAMP' in t:
+        return 'DATETIME2'
+    if 'DATE' in t:
+        return 'DATE'
+    if 'TIME' in t:
+        return 'TIME'
+    if 'BLOB' in t:
+        return 'VARBINARY(MAX)'
+    return 'NVARCHAR(MAX)'
+
+
+def _pk_identidad(info):
+    """Columna INTEGER PRIMARY KEY única (se crea como IDENTITY en SQL Server)"""
+    pks = [c for c in info['columns'] if c['pk']]
+    if len(pks) == 1 and pks[0]['type'].upper() == 'INTEGER':
+        return pks[0]['name']
+    return None
+
+
+# ============================================
+# CHECKSUM
+# ============================================
+
+def _normalizar(valor):
+    """Representación comparable entre motores (fechas como texto ISO, números como float)"""
+    if valor is None:
+        return ''
+    if isinstance(valor, (bool, int, float, Decimal)):
+        return f'{float(valor):.6f}'
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=' ', timespec='microseconds')
+    if isinstance(valor, (date, time)):
+        return valor.isoformat()
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return bytes(valor).hex()
+    if isinstance(valor, str) and _PATRON_FECHA.match(valor):
+        try:
+            return datetime.fromisoformat(valor).isoformat(sep=' ', timespec='microseconds')
+        except ValueError:
+            return valor
+    return str(valor)
+
+
+def checksum_tabla(conexion, tabla, columnas, lote=1000):
+    """
+    Conteo y checksum independiente del orden (suma de hashes por fila módulo 2^64)
+
+    Returns:
+        tuple: (filas, checksum)
+    """
+    cursor = conexion.cursor()
+    cursor.execute(f"SELECT {', '.join(f'[{c}]' for c in columnas)} FROM [{tabla}]")
+    filas, total = 0, 0
+    while True:
+        bloque = cursor.fetchmany(lote)
+        if not bloque:
+            break
+        for fila in bloque:
+            texto = '\x1f'.join(_normalizar(v) for v in fila)
+            total = (total + int.from_bytes(hashlib.sha1(texto.encode('utf-8')).digest()[:8], 'big')) % (1 << 64)
+        filas += len(bloque)
+    return filas, f'{total:016x}'
+
+
+# ============================================
+# MOTOR
+# ============================================
+
+class MotorMigracion:
+    """Migra una BD SQLite a otra conexión DB-API tabla por tabla con checkpoints"""
+
+    def __init__(self, ruta_origen, conectar_destino, dialecto='mssql', lote=1000, hilos=4, log=print):
+        """
+        Args:
+            ruta_origen: Ruta del archivo SQLite de origen
+            conectar_destino: Función sin argumentos que abre una conexión nueva al destino
+            dialecto: 'mssql' o 'sqlite'
+            lote: Filas por executemany/commit
+            hilos: Tablas migradas en paralelo dentro de un mismo nivel
+            log: Función para mensajes de progreso
+        """
+        if dialecto not in ('mssql', 'sqlite'):
+            raise ValueError(f'Dialecto no soportado: {dialecto}')
+        self.ruta_origen = ruta_origen
+        self.conectar_destino = conectar_destino
+        self.dialecto = dialecto
+        self.lote = lote
+        self.hilos = max(1, hilos)
+        self.log = log
+        self._lock_log = threading.Lock()
+
+    def _mensaje(self, texto):
+        with self._lock_log:
+            self.log(texto)
+
+    def conectar_origen(self):
+        return sqlite3.connect(self.ruta_origen, check_same_thread=False)
+
+    # --------------------------------------------
+    # Esquema destino
+    # --------------------------------------------
+
+    def _ddl_tabla(self, tabla, info):
+        if self.dialecto == 'sqlite':
+            return re.sub(r'^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?', 'CREATE TABLE IF NOT EXISTS ',
+                          info['sql'], count=1, flags=re.IGNORECASE)
+
+        identidad = _pk_identidad(info)
+        columnas, pks = [], []
+        for col in info['columns']:
+            if col['name'] == identidad:
+                columnas.append(f"[{col['name']}] INT IDENTITY(1,1) NOT NULL")
+            else:
+                nulo = 'NOT NULL' if col['notnull'] else 'NULL'
+                columnas.append(f"[{col['name']}] {convertir_tipo(col['type'])} {nulo}")
+            if col['pk']:
+                pks.append(col)
+        if pks:
+            pks.sort(key=lambda c: c['pk'])
+            lista_pk = ', '.join(f"[{c['name']}]" for c in pks)
+            columnas.append(f"CONSTRAINT [PK_{tabla}] PRIMARY KEY ({lista_pk})")
+        return (f"IF OBJECT_ID(N'[{tabla}]', N'U') IS NULL "
+                f"CREATE TABLE [{tabla}] ({', '.join(columnas)})")
+
+    def _ddl_checkpoints(self):
+        columnas = ('tabla VARCHAR(128) NOT NULL PRIMARY KEY, ultimo_rowid BIGINT NOT NULL, '
+                    'filas BIGINT NOT NULL, completa INT NOT NULL')
+        if self.dialecto == 'sqlite':
+            return f'CREATE TABLE IF NOT EXISTS {TABLA_CHECKPOINTS} ({columnas})'
+        return (f"IF OBJECT_ID(N'{TABLA_CHECKPOINTS}', N'U') IS NULL "
+                f"CREATE TABLE {TABLA_CHECKPOINTS} ({columnas})")
+
+    def preparar_destino(self, esquema):
+        """Crea (si no existen) las tablas y la tabla de checkpoints"""
+        conexion = self.conectar_destino()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(self._ddl_checkpoints())
+            for tabla, info in esquema.items():
+                cursor.execute(self._ddl_tabla(tabla, info))
+            conexion.commit()
+        finally:
+            conexion.close()
+
+    def crear_relaciones_e_indices(self, esquema):
+        """
+        Llaves foráneas (SQL Server) e índices se crean al final: cargar sin ellos es más rápido.
+        En SQLite las llaves foráneas ya vienen en el CREATE TABLE original.
+        """
+        conexion = self.conectar_destino()
+        advertencias = []
+        try:
+            cursor = conexion.cursor()
+            for tabla, info in esquema.items():
+                if self.dialecto == 'mssql':
+                    for fk in info['fks']:
+                        nombre = f"FK_{tabla}_{fk['col']}"
+                        try:
+                            cursor.execute(
+                                f"IF OBJECT_ID(N'[{nombre}]', N'F') IS NULL "
+                                f"ALTER TABLE [{tabla}] ADD CONSTRAINT [{nombre}] FOREIGN KEY ([{fk['col']}]) "
+                                f"REFERENCES [{fk['ref_table']}] ([{fk['ref_col']}])"
+                            )
+                            conexion.commit()
+                        except Exception as e:
+                            conexion.rollback()
+                            advertencias.append(f'{nombre}: {str(e)[:80]}')
+
+                for sql in info['indices']:
+                    coincidencia = re.match(r'\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(IF\s+NOT\s+EXISTS\s+)?"?\[?(\w+)',
+                                            sql, flags=re.IGNORECASE)
+                    if not coincidencia:
+                        continue
+                    nombre = coincidencia.group(3)
+                    if self.dialecto == 'sqlite':
+                        sentencia = re.sub(r'INDEX\s+(IF\s+NOT\s+EXISTS\s+)?', 'INDEX IF NOT EXISTS ',
+                                           sql, count=1, flags=re.IGNORECASE)
+                    else:
+                        sentencia = (f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{nombre}') "
+                                     f"{sql.replace(chr(34), '')}")
+                    try:
+                        cursor.execute(sentencia)
+                        conexion.commit()
+                    except Exception as e:
+                        conexion.rollback()
+                        advertencias.append(f'{nombre}: {str(e)[:80]}')
+        finally:
+            conexion.close()
+        return advertencias
+
+    # --------------------------------------------
+    # Checkpoints
+    # --------------------------------------------
+
+    def leer_checkpoints(self):
+        conexion = self.conectar_destino()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(f'SELECT tabla, ultimo_rowid, filas, completa FROM {TABLA_CHECKPOINTS}')
+            return {r[0]: {'ultimo_rowid': r[1], 'filas': r[2], 'completa': bool(r[3])}
+                    for r in cursor.fetchall()}
+        finally:
+            conexion.close()
+
+    # --------------------------------------------
+    # Datos
+    # --------------------------------------------
+
+    def migrar_tabla(self, tabla, info, checkpoint=None):
+        """
+        Copia una tabla en lotes; cada lote y su checkpoint se confirman juntos
+
+        Returns:
+            int: Filas copiadas en esta ejecución
+        """
+        checkpoint = checkpoint or {'ultimo_rowid': 0, 'filas': 0, 'completa': False}
+        if checkpoint['completa']:
+            return 0
+
+        columnas = [c['name'] for c in info['columns']]
+        lista = ', '.join(f'[{c}]' for c in columnas)
+        insertar = f"INSERT INTO [{tabla}] ({lista}) VALUES ({', '.join('?' for _ in columnas)})"
+        identidad = self.dialecto == 'mssql' and _pk_identidad(info) is not None
+
+        origen = self.conectar_origen()
+        destino = self.conectar_destino()
+        copiadas = 0
+        try:
+            lectura = origen.cursor()
+            escritura = destino.cursor()
+            if hasattr(escritura, 'fast_executemany'):
+                escritura.fast_executemany = True
+
+            escritura.execute(
+                f'UPDATE {TABLA_CHECKPOINTS} SET completa = 0 WHERE tabla = ?', (tabla,)
+            )
+            if escritura.rowcount == 0:
+                escritura.execute(
+                    f'INSERT INTO {TABLA_CHECKPOINTS} (tabla, ultimo_rowid, filas, completa) VALUES (?, 0, 0, 0)',
+                    (tabla,)
+                )
+            if identidad:
+                escritura.execute(f'SET IDENTITY_INSERT [{tabla}] ON')
+            destino.commit()
+
+            ultimo_rowid = checkpoint['ultimo_rowid']
+            filas = checkpoint['filas']
+            lectura.execute(
+                f'SELECT rowid, {lista} FROM [{tabla}] WHERE rowid > ? ORDER BY rowid',
+                (ultimo_rowid,)
+            )
+            while True:
+                bloque = lectura.fetchmany(self.lote)
+                if not bloque:
+                    break
+                escritura.executemany(insertar, [fila[1:] for fila in bloque])
+                ultimo_rowid = bloque[-1][0]
+                filas += len(bloque)
+                escritura.execute(
+                    f'UPDATE {TABLA_CHECKPOINTS} SET ultimo_rowid = ?, filas = ? WHERE tabla = ?',
+                    (ultimo_rowid, filas, tabla)
+                )
+                destino.commit()
+                copiadas += len(bloque)
+
+            if identidad:
+                escritura.execute(f'SET IDENTITY_INSERT [{tabla}] OFF')
+            escritura.execute(f'UPDATE {TABLA_CHECKPOINTS} SET completa = 1 WHERE tabla = ?', (tabla,))
+            destino.commit()
+            self._mensaje(f'  ✓ {tabla}: {filas} filas ({copiadas} en esta ejecución)')
+            return copiadas
+        except Exception:
+            destino.rollback()
+            raise
+        finally:
+            origen.close()
+            destino.close()
+
+    def migrar(self, esquema):
+        """
+        Migra todas las tablas nivel por nivel; dentro de cada nivel en paralelo
+
+        Returns:
+            dict: {tabla: filas copiadas en esta ejecución}
+        """
+        checkpoints = self.leer_checkpoints()
+        resultado = {}
+
+        for numero, nivel in enumerate(niveles_dependencia(esquema), 1):
+            self._mensaje(f'  Nivel {numero}: {", ".join(nivel)}')
+            with ThreadPoolExecutor(max_workers=self.hilos) as ejecutor:
+                futuros = {
+                    tabla: ejecutor.submit(self.migrar_tabla, tabla, esquema[tabla], checkpoints.get(tabla))
+                    for tabla in nivel
+                }
+            errores = []
+            for tabla, futuro in futuros.items():
+                try:
+                    resultado[tabla] = futuro.result()
+                except Exception as e:
+                    errores.append(f'{tabla}: {e}')
+            if errores:
+                # Las tablas de niveles siguientes dependen de éstas: se detiene aquí
+                raise RuntimeError('Error migrando ' + '; '.join(errores))
+
+        return resultado
+
+    # --------------------------------------------
+    # Verificación
+    # --------------------------------------------
+
+    def _verificar_tabla(self, tabla, info):
+        columnas = [c['name'] for c in info['columns']]
+        origen = self.conectar_origen()
+        destino = self.conectar_destino()
+        try:
+            filas_origen, suma_origen = checksum_tabla(origen, tabla, columnas, self.lote)
+            filas_destino, suma_destino = checksum_tabla(destino, tabla, columnas, self.lote)
+        finally:
+            origen.close()
+            destino.close()
+        return {
+            'origen': filas_origen,
+            'destino': filas_destino,
+            'checksum_origen': suma_origen,
+            'checksum_destino': suma_destino,
+            'ok': filas_origen == filas_destino and suma_origen == suma_destino,
+        }
+
+    def verificar(self, esquema):
+        """Compara conteos y checksums de todas las tablas (en paralelo)"""
+        with ThreadPoolExecutor(max_workers=self.hilos) as ejecutor:
+            futuros = {tabla: ejecutor.submit(self._verificar_tabla, tabla, info)
+                       for tabla, info in esquema.items()}
+        return {tabla: futuro.result() for tabla, futuro in futuros.items()}
+
+    def ejecutar(self, verificar=True):
+        """
+        Migración completa: esquema, datos, relaciones/índices y verificación
+
+        Returns:
+            dict: {'filas': {...}, 'advertencias': [...], 'verificacion': {...} o None}
+        """
+        origen = self.conectar_origen()
+        try:
+            esquema = leer_esquema(origen)
+        finally:
+            origen.close()
+
+        self.preparar_destino(esquema)
+        filas = self.migrar(esquema)
+        advertencias = self.crear_relaciones_e_indices(esquema)
+        verificacion = self.verificar(esquema) if verificar else None
+        return {'filas': filas, 'advertencias': advertencias, 'verificacion': verificacion}
@@ -0,0 +1,402 @@
+"""
+Motor de notificaciones
+
+- Creación masiva por cohortes: `notificar_cohorte` inserta una notificación por
+  usuario de la cohorte con INSERT ... SELECT, por bloques de usuarios, sin cargar
+  nada en Python. Las cohortes son consultas de ids de usuario (COHORTES).
+- Entrega por canales: email (SMTP con la configuración MAIL_*) y SMS (POST JSON a
+  SMS_API_URL). Cada canal envía las notificaciones recientes que aún no salieron por
+  él, a usuarios que lo tienen activado, por lotes, a un máximo de envíos por segundo
+  y con reintentos con espera creciente. Lo que no sale en una corrida se reintenta
+  en la siguiente mientras esté dentro de NOTIFICACIONES_VENTANA_HORAS.
+- Contador de no leídas: `contadores_notificaciones` guarda una fila por usuario, así
+  que el badge es una lectura por llave. Se recalcula solo para los usuarios
+  afectados: en cada flush del ORM que toca notificaciones y, en las escrituras por
+  Core, llamando a `recontar(usuario_ids)`.
+
+Los canales se prueban localmente apuntando MAIL_SERVER/MAIL_PORT y SMS_API_URL a los
+servidores de prueba de benchmarks/notificaciones.py.
+"""
+import json
+import smtplib
+import time
+import urllib.error
+import urllib.request
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+
+import click
+from flask import current_app, g
+from sqlalchemy import delete, event, exists, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import ContadorNotificaciones, Mascota, Notificacion, Usuario, Vacuna
+from app.services.planificador import en_lotes
+
+LOTE_ENVIO = 100  # notificaciones por consulta de entrega (una conexión SMTP por lote)
+REINTENTOS = 3
+ESPERA_REINTENTO = 0.5  # segundos; se duplica en cada reintento
+
+
+# ============================================
+# CONTADOR DE NO LEÍDAS
+# ============================================
+
+def recontar(usuario_ids=None, conexion=None):
+    """Recalcula el contador de los usuarios indicados (o de todos) en la transacción actual"""
+    conexion = conexion or db.session
+    tabla = ContadorNotificaciones.__table__
+    borrar = delete(tabla)
+    conteo = (select(Notificacion.usuario_id, func.count())
+              .where(Notificacion.leida == False).group_by(Notificacion.usuario_id))
+    if usuario_ids is not None:
+        usuario_ids = list(usuario_ids)
+        if not usuario_ids:
+            return
+        borrar = borrar.where(tabla.c.usuario_id.in_(usuario_ids))
+        conteo = conteo.where(Notificacion.usuario_id.in_(usuario_ids))
+    conexion.execute(borrar)
+    conexion.execute(insert(tabla).from_select(['usuario_id', 'no_leidas'], conteo))
+    g.pop('notificaciones_no_leidas', None)
+
+
+def no_leidas(usuario_id):
+    """Notificaciones no leídas de un usuario (una lectura por llave, cacheada por request)"""
+    cache = g.setdefault('notificaciones_no_leidas', {})
+    if usuario_id not in cache:
+        cache[usuario_id] = db.session.execute(
+            select(ContadorNotificaciones.no_leidas).where(ContadorNotificaciones.usuario_id == usuario_id)
+        ).scalar() or 0
+    return cache[usuario_id]
+
+
+def marcar_leidas(usuario_id, ids=None):
+    """Marca como leídas las notificaciones indicadas (o todas) de un usuario; no confirma"""
+    tabla = Notificacion.__table__
+    condiciones = [tabla.c.usuario_id == usuario_id, tabla.c.leida == False]
+    if ids is not None:
+        condiciones.append(tabla.c.id.in_(list(ids)))
+    marcadas = db.session.execute(
+        update(tabla).where(*condiciones).values(leida=True, fecha_lectura=datetime.utcnow())
+    ).rowcount
+    recontar([usuario_id])
+    return marcadas
+
+
+@event.listens_for(Session, 'after_flush')
+def _recontar_cambios(session, flush_context):
+    """Recalcula el contador de los usuarios cuyas notificaciones cambiaron en este flush"""
+    usuarios = set()
+    for objeto in list(session.new) + list(session.deleted):
+        if isinstance(objeto, Notificacion):
+            usuarios.add(objeto.usuario_id)
+    for objeto in session.dirty:
+        if isinstance(objeto, Notificacion):
+            estado = db.inspect(objeto)
+            if estado.attrs.leida.history.has_changes() or estado.attrs.usuario_id.history.has_changes():
+                usuarios.add(objeto.usuario_id)
+                usuarios.update(estado.attrs.usuario_id.history.deleted or ())
+    usuarios.discard(None)
+    if usuarios:
+        recontar(sorted(usuarios), session.connection())
+
+
+# ============================================
+# COHORTES Y CREACIÓN MASIVA
+# ============================================
+
+def _usuarios_activos(rol):
+    return select(Usuario.id).where(Usuario.rol == rol, Usuario.activo == True)
+
+
+def _tutores_con_vacunas(dias):
+    hoy = date.today()
+    return (
+        select(Mascota.tutor_id)
+        .join(Vacuna, Vacuna.mascota_id == Mascota.id)
+        .where(Mascota.activo == True, Vacuna.aplicada == False,
+               Vacuna.fecha_proxima >= hoy, Vacuna.fecha_proxima <= hoy + timedelta(days=dias))
+    )
+
+
+# Nombre -> función(dias) que devuelve un SELECT de ids de usuario (puede repetir ids)
+COHORTES = {
+    'tutores': lambda dias: _usuarios_activos('tutor'),
+    'veterinarios': lambda dias: _usuarios_activos('veterinario'),
+    'vacunas_proximas': _tutores_con_vacunas,  # tutores con vacunas en los próximos `dias` días
+}
+
+
+def notificar_cohorte(cohorte, tipo, titulo, mensaje, url_accion=None, prioridad='normal',
+                      dias=7, dias_vigencia=30):
+    """
+    Crea una notificación por usuario de la cohorte (una sola vez: se omiten los que ya
+    tienen una con el mismo tipo y título sin expirar)
+
+    Args:
+        cohorte: Nombre en COHORTES o un SELECT de ids de usuario
+        dias: Horizonte de las cohortes que lo usan (vacunas_proximas)
+        dias_vigencia: Días hasta que la notificación expira y se purga
+
+    Returns:
+        int: Notificaciones creadas (confirmadas por bloques)
+    """
+    usuarios = COHORTES[cohorte](dias) if isinstance(cohorte, str) else cohorte
+    ahora = datetime.utcnow()
+    expiracion = ahora + timedelta(days=dias_vigencia)
+    condiciones = (
+        Usuario.id.in_(usuarios),
+        Usuario.activo == True,
+        ~exists().where(
+            Notificacion.usuario_id == Usuario.id, Notificacion.tipo == tipo, Notificacion.titulo == titulo,
+            or_(Notificacion.fecha_expiracion.is_(None), Notificacion.fecha_expiracion > ahora),
+        ),
+    )
+    columnas = ['usuario_id', 'tipo', 'titulo', 'mensaje', 'url_accion', 'prioridad', 'leida',
+                'enviada_email', 'enviada_sms', 'fecha_creacion', 'fecha_expiracion']
+
+    def crear(ids):
+        # Los valores por defecto de Python no se aplican en INSERT ... SELECT
+        creadas = db.session.execute(insert(Notificacion.__table__).from_select(columnas, select(
+            Usuario.id, literal(tipo), literal(titulo), literal(mensaje), literal(url_accion, db.String),
+            literal(prioridad), literal(False), literal(False), literal(False),
+            literal(ahora, db.DateTime), literal(expiracion, db.DateTime),
+        ).where(Usuario.id.in_(ids)))).rowcount
+        recontar(ids)
+        return creadas
+
+    return en_lotes(Usuario.id, condiciones, crear)
+
+
+# ============================================
+# CANALES DE ENTREGA
+# ============================================
+
+class Limitador:
+    """Espacia las llamadas para no superar `por_segundo` envíos por segundo"""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0
+        self._siguiente = 0.0
+
+    def esperar(self):
+        ahora = time.monotonic()
+        if ahora < self._siguiente:
+            time.sleep(self._siguiente - ahora)
+            ahora = self._siguiente
+        self._siguiente = ahora + self.intervalo
+
+
+class Canal:
+    """
+    Canal de entrega
+
+    Las subclases definen la columna de enviada, la preferencia y el destino en
+    `usuarios`, y `conectar`/`enviar`/`cerrar`. `enviar` lanza ErrorPermanente cuando
+    reintentar no sirve (destinatario rechazado).
+    """
+
+    nombre = None
+    columna_enviada = None  # en notificaciones
+    preferencia = None  # en usuarios
+    destino = None  # en usuarios
+
+    def __init__(self, config, por_segundo):
+        self.config = config
+        self.limitador = Limitador(por_segundo)
+
+    def conectar(self):
+        return None
+
+    def enviar(self, conexion, fila):
+        raise NotImplementedError
+
+    def cerrar(self, conexion):
+        pass
+
+    def enviar_lote(self, filas, log=print):
+        """
+        Envía las filas y retorna (ids entregados, error)
+
+        `error` es la falla temporal que agotó los reintentos: el lote se corta ahí y el
+        resto se reintenta en la próxima corrida.
+        """
+        entregadas, conexion = [], None
+        try:
+            for fila in filas:
+                for intento in range(REINTENTOS):
+                    try:
+                        if conexion is None:
+                            conexion = self.conectar()
+                        self.limitador.esperar()
+                        self.enviar(conexion, fila)
+                        entregadas.append(fila.id)
+                        break
+                    except ErrorPermanente as e:
+                        log(f"[WARN] {self.nombre}: notificación {fila.id} rechazada: {e}")
+                        break
+                    except (OSError, smtplib.SMTPException) as e:
+                        # Conexión caída o error temporal del servidor: reconectar y reintentar
+                        self._cerrar_silencioso(conexion)
+                        conexion = None
+                        if intento == REINTENTOS - 1:
+                            return entregadas, e
+                        time.sleep(ESPERA_REINTENTO * 2 ** intento)
+        finally:
+            self._cerrar_silencioso(conexion)
+        return entregadas, None
+
+    def _cerrar_silencioso(self, conexion):
+        if conexion is not None:
+            try:
+                self.cerrar(conexion)
+            except (OSError, smtplib.SMTPException):
+                pass
+
+
+class ErrorPermanente(Exception):
+    """El destino rechazó el mensaje; no se reintenta"""
+
+
+def _url_completa(config, url_accion):
+    base = config.get('NOTIFICACIONES_URL_BASE')
+    return f"{base.rstrip('/')}{url_accion}" if base and url_accion else None
+
+
+class CanalEmail(Canal):
+    nombre = 'email'
+    columna_enviada = 'enviada_email'
+    preferencia = 'notificaciones_email'
+    destino = 'email'
+
+    def conectar(self):
+        conexion = smtplib.SMTP(self.config['MAIL_SERVER'], self.config['MAIL_PORT'], timeout=10)
+        if self.config.get('MAIL_USE_TLS'):
+            conexion.starttls()
+        if self.config.get('MAIL_USERNAME'):
+            conexion.login(self.config['MAIL_USERNAME'], self.config['MAIL_PASSWORD'])
+        return conexion
+
+    def enviar(self, conexion, fila):
+        mensaje = EmailMessage()
+        mensaje['Subject'] = fila.titulo or 'Notificación'
+        mensaje['From'] = self.config['MAIL_DEFAULT_SENDER']
+        mensaje['To'] = fila.destino
+        url = _url_completa(self.config, fila.url_accion)
+        mensaje.set_content(f"Hola {fila.nombre},\n\n{fila.mensaje or ''}" + (f"\n\n{url}" if url else ''))
+        try:
+            conexion.send_message(mensaje)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise ErrorPermanente(e) from e
+
+    def cerrar(self, conexion):
+        conexion.quit()
+
+
+class CanalSMS(Canal):
+    """POST JSON {telefono, mensaje} a SMS_API_URL (con SMS_API_TOKEN como Bearer)"""
+
+    nombre = 'sms'
+    columna_enviada = 'enviada_sms'
+    preferencia = 'notificaciones_sms'
+    destino = 'telefono'
+
+    def enviar(self, conexion, fila):
+        texto = f"{fila.titulo}: {fila.mensaje or ''}"[:300]
+        solicitud = urllib.request.Request(
+            self.config['SMS_API_URL'], method='POST',
+            data=json.dumps({'telefono': fila.destino, 'mensaje': texto}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+        )
+        if self.config.get('SMS_API_TOKEN'):
+            solicitud.add_header('Authorization', f"Bearer {self.config['SMS_API_TOKEN']}")
+        try:
+            with urllib.request.urlopen(solicitud, timeout=10) as respuesta:
+                respuesta.read()
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code != 429:
+                raise ErrorPermanente(f'HTTP {e.code}') from e
+            raise
+
+
+def canales_activos(config=None):
+    """Canales configurados: email con NOTIFICACIONES_EMAIL, SMS con SMS_API_URL"""
+    config = config or current_app.config
+    canales = []
+    if config.get('NOTIFICACIONES_EMAIL'):
+        canales.append(CanalEmail(config, config.get('NOTIFICACIONES_EMAIL_POR_SEGUNDO', 10)))
+    if config.get('SMS_API_URL'):
+        canales.append(CanalSMS(config, config.get('NOTIFICACIONES_SMS_POR_SEGUNDO', 5)))
+    return canales
+
+
+def entregar(canal, lote=LOTE_ENVIO, log=print):
+    """Envía por un canal las notificaciones pendientes; retorna cuántas se entregaron"""
+    ahora = datetime.utcnow()
+    ventana = current_app.config.get('NOTIFICACIONES_VENTANA_HORAS', 24)
+    enviada = getattr(Notificacion, canal.columna_enviada)
+    destino = getattr(Usuario, canal.destino)
+    condiciones = (
+        enviada == False,
+        Notificacion.fecha_creacion >= ahora - timedelta(hours=ventana),
+        or_(Notificacion.fecha_expiracion.is_(None), Notificacion.fecha_expiracion > ahora),
+        exists().where(Usuario.id == Notificacion.usuario_id, Usuario.activo == True,
+                       getattr(Usuario, canal.preferencia) == True, destino.isnot(None), destino != ''),
+    )
+    tabla = Notificacion.__table__
+
+    def enviar(ids):
+        filas = db.session.execute(
+            select(Notificacion.id, Notificacion.titulo, Notificacion.mensaje, Notificacion.url_accion,
+                   Usuario.nombre, destino.label('destino'))
+            .join(Usuario, Usuario.id == Notificacion.usuario_id)
+            .where(Notificacion.id.in_(ids))
+            .order_by(Notificacion.id)
+        ).all()
+        db.session.commit()  # no retener la transacción mientras se envía
+        entregadas, error = canal.enviar_lote(filas, log=log)
+        if entregadas:
+            db.session.execute(update(tabla).where(tabla.c.id.in_(entregadas))
+                               .values(**{canal.columna_enviada: True}))
+        if error is not None:
+            db.session.commit()  # conservar lo entregado antes de cortar la corrida
+            raise error
+        return len(entregadas)
+
+    return en_lotes(Notificacion.id, condiciones, enviar, lote)
+
+
+def entregar_pendientes(log=print):
+    """Entrega por todos los canales activos; retorna {canal: entregadas}"""
+    return {canal.nombre: entregar(canal, log=log) for canal in canales_activos()}
+
+
+# ============================================
+# REGISTRO
+# ============================================
+
+def register_notificaciones(app):
+    """Registra los comandos de creación masiva y entrega de notificaciones"""
+
+    @app.cli.command('notificar')
+    @click.option('--cohorte', type=click.Choice(list(COHORTES)), required=True)
+    @click.option('--titulo', required=True)
+    @click.option('--mensaje', required=True)
+    @click.option('--tipo', default='aviso', help='Tipo de notificación')
+    @click.option('--url', 'url_accion', help='Ruta de la acción (ej. /tutor/mascotas)')
+    @click.option('--prioridad', type=click.Choice(['baja', 'normal', 'alta', 'urgente']), default='normal')
+    @click.option('--dias', type=int, default=7, help='Horizonte de la cohorte (vacunas_proximas)')
+    def notificar_command(cohorte, titulo, mensaje, tipo, url_accion, prioridad, dias):
+        """Crea una notificación para cada usuario de una cohorte"""
+        creadas = notificar_cohorte(cohorte, tipo, titulo, mensaje, url_accion, prioridad, dias=dias)
+        print(f"[OK] {creadas} notificaciones creadas para la cohorte '{cohorte}'")
+
+    @app.cli.command('enviar-notificaciones')
+    def enviar_notificaciones_command():
+        """Entrega las notificaciones pendientes por los canales configurados"""
+        if not canales_activos():
+            print("[WARN] No hay canales configurados (NOTIFICACIONES_EMAIL=1 o SMS_API_URL)")
+            return
+        for canal, entregadas in entregar_pendientes().items():
+            print(f"[OK] {canal}: {entregadas} notificaciones entregadas")
@@ -0,0 +1,172 @@
+"""
+Paginación por llave (keyset / seek)
+`.paginate()` hace un COUNT(*) y un OFFSET que recorre todas las filas anteriores:
+la página 500 lee 500 páginas. Aquí cada página continúa desde la última fila de la
+anterior (WHERE (nombre, id) > (:nombre, :id) ORDER BY nombre, id LIMIT n), que con
+un índice sobre las columnas de orden cuesta lo mismo en cualquier posición.
+
+Los cursores son opacos (base64 de los valores de la llave) y solo se usan como
+parámetros de la consulta. Las columnas de orden deben ser NOT NULL y terminar en
+una columna única (id) para que el orden sea total.
+
+El total es opcional: 'exacto' (COUNT en cada request), 'aproximado' (COUNT
+cacheado TTL_CONTEO segundos por consulta) o None (no se cuenta).
+"""
+import base64
+import json
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_
+
+TTL_CONTEO = 60  # segundos que se reutiliza un total aproximado
+MAX_CONTEOS = 512  # consultas distintas cuyo total se recuerda
+
+_conteos = {}
+_lock_conteos = threading.Lock()
+
+
+# ============================================
+# CURSORES
+# ============================================
+
+def _codificar(valores, direccion):
+    datos = {
+        'd': direccion,
+        'v': None if valores is None else [
+            v.isoformat() if isinstance(v, (datetime, date)) else v for v in valores
+        ],
+    }
+    crudo = json.dumps(datos, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def _decodificar(cursor, columnas):
+    """(valores o None, dirección) o None si el cursor no es válido"""
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        direccion, valores = datos['d'], datos['v']
+        if direccion not in ('sig', 'ant'):
+            return None
+        if valores is None:
+            return (None, direccion) if direccion == 'ant' else None
+        if len(valores) != len(columnas):
+            return None
+        convertidos = []
+        for (columna, _), valor in zip(columnas, valores):
+            tipo = columna.type.python_type
+            if valor is not None and tipo in (datetime, date):
+                valor = tipo.fromisoformat(valor)
+            convertidos.append(valor)
+        return convertidos, direccion
+    except (ValueError, TypeError, KeyError, NotImplementedError):
+        return None
+
+
+# ============================================
+# CONSULTA
+# ============================================
+
+def _condicion_seek(columnas, valores, hacia_atras):
+    """(c1 > v1) OR (c1 = v1 AND c2 > v2) ... respetando la dirección de cada columna"""
+    condiciones = []
+    for i, (columna, descendente) in enumerate(columnas):
+        mayor = descendente == hacia_atras
+        comparacion = columna > valores[i] if mayor else columna < valores[i]
+        iguales = [columnas[j][0] == valores[j] for j in range(i)]
+        condiciones.append(and_(*iguales, comparacion))
+    return or_(*condiciones)
+
+
+def contar_aproximado(query):
+    """COUNT de la consulta, reutilizado durante TTL_CONTEO segundos"""
+    # La llave es la entidad y el WHERE: compilar la consulta completa cuesta más que el propio acierto
+    filtro = query.whereclause
+    compilado = filtro.compile() if filtro is not None else None
+    clave = (
+        tuple(d['name'] for d in query.column_descriptions),
+        str(compilado) if compilado is not None else '',
+        repr(sorted(compilado.params.items())) if compilado is not None else '',
+    )
+    ahora = time.monotonic()
+    with _lock_conteos:
+        en_cache = _conteos.get(clave)
+    if en_cache and en_cache[0] > ahora:
+        return en_cache[1]
+
+    total = query.order_by(None).count()
+    with _lock_conteos:
+        if len(_conteos) >= MAX_CONTEOS:
+            _conteos.clear()
+        _conteos[clave] = (ahora + TTL_CONTEO, total)
+    return total
+
+
+class PaginaKeyset:
+    """Resultado de paginar_keyset(), con la misma interfaz básica que Pagination"""
+
+    def __init__(self, items, per_page, siguiente, anterior, total, total_aproximado):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = siguiente
+        self.prev_cursor = anterior
+        self.total = total
+        self.total_aproximado = total_aproximado
+        self.last_cursor = _codificar(None, 'ant')
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def paginar_keyset(query, columnas, cursor=None, per_page=20, total='aproximado'):
+    """
+    Pagina una consulta por llave
+
+    Args:
+        query: Query de Flask-SQLAlchemy con los filtros aplicados y sin ORDER BY
+        columnas: Lista de (columna, descendente), p. ej. [(Pago.fecha_creacion, True), (Pago.id, True)]
+        cursor: Cursor recibido en el request (None para la primera página)
+        per_page: Filas por página
+        total: 'exacto', 'aproximado' o None
+
+    Returns:
+        PaginaKeyset
+    """
+    posicion = _decodificar(cursor, columnas) if cursor else None
+    valores, direccion = posicion if posicion else (None, 'sig')
+    hacia_atras = direccion == 'ant'
+
+    consulta = query
+    if valores is not None:
+        consulta = consulta.filter(_condicion_seek(columnas, valores, hacia_atras))
+    orden = [c.desc() if descendente != hacia_atras else c.asc() for c, descendente in columnas]
+    filas = consulta.order_by(*orden).limit(per_page + 1).all()
+
+    hay_mas = len(filas) > per_page
+    filas = filas[:per_page]
+    if hacia_atras:
+        filas.reverse()
+        tiene_anterior, tiene_siguiente = hay_mas, valores is not None
+    else:
+        tiene_anterior, tiene_siguiente = valores is not None, hay_mas
+
+    def llave(item):
+        return [getattr(item, columna.key) for columna, _ in columnas]
+
+    siguiente = _codificar(llave(filas[-1]), 'sig') if filas and tiene_siguiente else None
+    anterior = _codificar(llave(filas[0]), 'ant') if filas and tiene_anterior else None
+
+    if total == 'exacto':
+        cantidad = query.order_by(None).count()
+    elif total == 'aproximado':
+        cantidad = contar_aproximado(query)
+    else:
+        cantidad = None
+
+    return PaginaKeyset(filas, per_page, siguiente, anterior, cantidad, total == 'aproximado')
@@ -0,0 +1,47 @@
+"""
+Perfilado de consultas por request
+Cuenta las sentencias SQL ejecutadas y su tiempo acumulado durante cada request
+y los expone en las cabeceras `X-Consultas-BD` y `X-Tiempo-BD-ms`.
+
+Solo se activa con PERFIL_CONSULTAS=1 (lo usa la prueba de carga, ver
+`benchmarks/carga.py`); en producción no agrega listeners.
+"""
+import time
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('perfil_inicio', []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    inicios = conn.info.get('perfil_inicio')
+    if not inicios:
+        return
+    duracion = time.perf_counter() - inicios.pop()
+    g.consultas_bd = g.get('consultas_bd', 0) + 1
+    g.tiempo_bd = g.get('tiempo_bd', 0.0) + duracion
+
+
+def register_perfil_consultas(app):
+    """Registra el conteo de consultas por request si PERFIL_CONSULTAS está activo"""
+    if not app.config.get('PERFIL_CONSULTAS'):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _antes_de_ejecutar):
+        event.listen(Engine, 'before_cursor_execute', _antes_de_ejecutar)
+        event.listen(Engine, 'after_cursor_execute', _despues_de_ejecutar)
+
+    @app.after_request
+    def cabeceras_perfil(response):
+        response.headers['X-Consultas-BD'] = str(g.get('consultas_bd', 0))
+        response.headers['X-Tiempo-BD-ms'] = f"{g.get('tiempo_bd', 0.0) * 1000:.2f}"
+        return response
+
+    print("[OK] Perfilado de consultas por request activo")
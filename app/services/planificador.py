@@ -0,0 +1,362 @@
+"""
+Planificador de tareas periódicas
+Tareas con horario tipo cron (recordatorios, vencimientos, limpieza) que corre un hilo
+de fondo en cada worker. Cada tarea tiene una fila en `tareas_programadas`; antes de
+ejecutarla, el worker la toma con un UPDATE condicional:
+
+    UPDATE tareas_programadas SET bloqueada_por = :nodo, bloqueada_hasta = :ahora + bloqueo
+    WHERE nombre = :tarea AND proxima_ejecucion <= :ahora
+      AND (bloqueada_hasta IS NULL OR bloqueada_hasta < :ahora)
+
+Solo un nodo obtiene la fila (rowcount 1), así que cada ejecución ocurre una sola vez
+aunque haya varios workers o servidores. Si el nodo muere, el bloqueo vence solo.
+
+Los horarios son en hora local del servidor (todos los nodos deben compartir zona).
+Sin hilo (PLANIFICADOR_ENABLED = False) las tareas pueden ejecutarse desde cron con
+`flask ejecutar-tareas`.
+
+Para escribir tareas: `en_lotes`, `actualizar_en_lotes` y `borrar_en_lotes` procesan
+los registros por bloques de ids ordenados por llave, una transacción por bloque.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, time as hora_del_dia, timedelta
+
+import click
+from sqlalchemy import delete, or_, select, update
+
+from app import db
+from app.models import TareaProgramada
+
+LOTE = 1000  # filas por transacción (SQL Server admite ~2100 parámetros por sentencia)
+
+
+# ============================================
+# HORARIOS CRON
+# ============================================
+
+class Cron:
+    """
+    Expresión de 5 campos: minuto hora día mes día_semana (0 o 7 = domingo)
+
+    Admite `*`, valores, rangos `a-b`, pasos `*/n` o `a-b/n` y listas separadas por coma.
+    Como en cron, si se restringen día del mes y día de la semana basta con uno.
+    """
+
+    CAMPOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expresion):
+        partes = expresion.split()
+        if len(partes) != 5:
+            raise ValueError(f'Expresión cron inválida (se esperan 5 campos): {expresion!r}')
+        self.expresion = expresion
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = (
+            self._campo(parte, *rango) for parte, rango in zip(partes, self.CAMPOS)
+        )
+        self.dias_semana = {d % 7 for d in dias_semana}
+        self._dia_libre = partes[2] == '*'
+        self._semana_libre = partes[4] == '*'
+
+    @staticmethod
+    def _campo(texto, minimo, maximo):
+        valores = set()
+        for parte in texto.split(','):
+            rango, _, paso = parte.partition('/')
+            paso = int(paso) if paso else 1
+            if rango == '*':
+                inicio, fin = minimo, maximo
+            elif '-' in rango:
+                inicio, fin = (int(v) for v in rango.split('-', 1))
+            else:
+                inicio = int(rango)
+                fin = maximo if paso > 1 else inicio
+            if inicio < minimo or fin > maximo or inicio > fin or paso < 1:
+                raise ValueError(f'Campo cron fuera de rango: {texto!r}')
+            valores.update(range(inicio, fin + 1, paso))
+        return valores
+
+    def _dia_valido(self, dia):
+        en_mes = dia.day in self.dias
+        en_semana = dia.isoweekday() % 7 in self.dias_semana
+        if self._dia_libre:
+            return en_semana
+        if self._semana_libre:
+            return en_mes
+        return en_mes or en_semana
+
+    def siguiente(self, desde):
+        """Primer minuto que cumple la expresión, posterior a `desde`"""
+        inicio = desde.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        dia = inicio.date()
+        for _ in range(366 * 5):
+            if dia.month in self.meses and self._dia_valido(dia):
+                for hora in sorted(self.horas):
+                    for minuto in sorted(self.minutos):
+                        momento = datetime.combine(dia, hora_del_dia(hora, minuto))
+                        if momento >= inicio:
+                            return momento
+            dia += timedelta(days=1)
+        raise ValueError(f'La expresión cron {self.expresion!r} nunca ocurre')
+
+
+# ============================================
+# REGISTRO DE TAREAS
+# ============================================
+
+class Tarea:
+    """Función periódica con su horario y la duración máxima de su bloqueo"""
+
+    def __init__(self, nombre, cron, funcion, bloqueo):
+        self.nombre = nombre
+        self.cron = Cron(cron)
+        self.funcion = funcion
+        self.bloqueo = bloqueo
+
+
+_tareas = {}
+
+
+def tarea(nombre, cron, bloqueo=600):
+    """
+    Registra una tarea periódica
+
+        @tarea('purgar_notificaciones', '30 3 * * *')
+        def purgar_notificaciones():
+            return {'eliminadas': borrar_en_lotes(...)}
+
+    La función se ejecuta en un contexto de aplicación y devuelve un dict con lo que
+    procesó (se guarda como resultado de la corrida). `bloqueo` son los segundos tras
+    los que otro nodo puede retomarla si este no terminó.
+    """
+    def decorador(funcion):
+        _tareas[nombre] = Tarea(nombre, cron, funcion, bloqueo)
+        return funcion
+    return decorador
+
+
+def tareas_registradas():
+    return dict(_tareas)
+
+
+# ============================================
+# PROCESAMIENTO POR LOTES
+# ============================================
+
+def en_lotes(columna_id, condiciones, accion, lote=LOTE):
+    """
+    Aplica `accion(ids)` a los registros que cumplen `condiciones`, por bloques de `lote`
+    ids en orden de llave, confirmando cada bloque. Retorna la suma de lo que devuelve
+    `accion` (filas afectadas).
+
+    Paginar por llave mantiene cada consulta como un rango sobre la PK aunque la acción
+    haga que los registros ya procesados dejen de cumplir las condiciones.
+    """
+    total, ultimo = 0, None
+    while True:
+        consulta = select(columna_id).where(*condiciones)
+        if ultimo is not None:
+            consulta = consulta.where(columna_id > ultimo)
+        ids = db.session.execute(consulta.order_by(columna_id).limit(lote)).scalars().all()
+        if not ids:
+            break
+        total += accion(ids) or 0
+        db.session.commit()
+        ultimo = ids[-1]
+        if len(ids) < lote:
+            break
+    return total
+
+
+def actualizar_en_lotes(modelo, condiciones, valores, lote=LOTE):
+    """UPDATE por bloques; las condiciones se repiten en el UPDATE por si la fila cambió"""
+    tabla = modelo.__table__
+
+    def accion(ids):
+        return db.session.execute(
+            update(tabla).where(tabla.c.id.in_(ids), *condiciones).values(**valores)
+        ).rowcount
+
+    return en_lotes(modelo.id, condiciones, accion, lote)
+
+
+def borrar_en_lotes(modelo, condiciones, lote=LOTE):
+    """DELETE por bloques"""
+    tabla = modelo.__table__
+
+    def accion(ids):
+        return db.session.execute(delete(tabla).where(tabla.c.id.in_(ids), *condiciones)).rowcount
+
+    return en_lotes(modelo.id, condiciones, accion, lote)
+
+
+# ============================================
+# EJECUCIÓN
+# ============================================
+
+def _nodo():
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+def registrar_filas():
+    """Crea la fila de las tareas nuevas y actualiza el horario de las existentes"""
+    from app.services.carga_masiva import upsert_por_clave
+
+    ahora = datetime.now()
+    upsert_por_clave(TareaProgramada, 'nombre', [
+        {'nombre': t.nombre, 'cron': t.cron.expresion, 'proxima_ejecucion': t.cron.siguiente(ahora)}
+        for t in _tareas.values()
+    ], actualizar=('cron',))
+    db.session.commit()
+
+
+def _tomar(t, ahora, forzar):
+    """True si este nodo obtuvo el bloqueo de la tarea"""
+    tabla = TareaProgramada.__table__
+    condiciones = [tabla.c.nombre == t.nombre,
+                   or_(tabla.c.bloqueada_hasta.is_(None), tabla.c.bloqueada_hasta < ahora)]
+    if not forzar:
+        condiciones.append(tabla.c.proxima_ejecucion <= ahora)
+    tomada = db.session.execute(
+        update(tabla).where(*condiciones).values(
+            bloqueada_por=_nodo(), bloqueada_hasta=ahora + timedelta(seconds=t.bloqueo),
+            ultimo_inicio=ahora,
+        )
+    ).rowcount == 1
+    db.session.commit()
+    return tomada
+
+
+def _liberar(t, resultado=None, error=None):
+    tabla = TareaProgramada.__table__
+    fin = datetime.now()
+    db.session.execute(
+        update(tabla).where(tabla.c.nombre == t.nombre, tabla.c.bloqueada_por == _nodo()).values(
+            bloqueada_por=None, bloqueada_hasta=None, ultimo_fin=fin,
+            proxima_ejecucion=t.cron.siguiente(fin),
+            ultimo_resultado=json.dumps(resultado, default=str) if resultado is not None else None,
+            ultimo_error=error, ejecuciones=tabla.c.ejecuciones + 1,
+        )
+    )
+    db.session.commit()
+
+
+def ejecutar(t, forzar=False, log=print):
+    """
+    Ejecuta una tarea si le toca y ningún otro nodo la tiene tomada
+
+    Returns:
+        dict | None: Resultado de la tarea, o None si no se ejecutó
+    """
+    if not _tomar(t, datetime.now(), forzar):
+        return None
+    inicio = time.perf_counter()
+    try:
+        resultado = t.funcion() or {}
+    except Exception as e:
+        db.session.rollback()
+        log(f"[ERROR] Tarea '{t.nombre}': {e}")
+        _liberar(t, error=f'{e.__class__.__name__}: {e}'[:2000])
+        return None
+    _liberar(t, resultado=resultado)
+    log(f"[OK] Tarea '{t.nombre}' en {time.perf_counter() - inicio:.1f}s: {resultado}")
+    return resultado
+
+
+def ejecutar_pendientes(log=print):
+    """Ejecuta las tareas vencidas; retorna {nombre: resultado} de las que corrió este nodo"""
+    ahora = datetime.now()
+    tabla = TareaProgramada.__table__
+    vencidas = db.session.execute(
+        select(tabla.c.nombre).where(
+            tabla.c.proxima_ejecucion <= ahora,
+            or_(tabla.c.bloqueada_hasta.is_(None), tabla.c.bloqueada_hasta < ahora),
+        )
+    ).scalars().all()
+    db.session.commit()
+    resultados = {}
+    for nombre in vencidas:
+        t = _tareas.get(nombre)
+        if t is not None:
+            resultado = ejecutar(t, log=log)
+            if resultado is not None:
+                resultados[nombre] = resultado
+    return resultados
+
+
+class Planificador:
+    """Hilo de fondo que revisa cada PLANIFICADOR_INTERVALO segundos las tareas vencidas"""
+
+    def __init__(self, app):
+        self.app = app
+        self.habilitado = app.config.get('PLANIFICADOR_ENABLED', True)
+        self.intervalo = app.config.get('PLANIFICADOR_INTERVALO', 30)
+        self._hilo = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def asegurar_hilo(self):
+        # Tras un fork (gunicorn con preload) el hilo del padre no existe en el hijo
+        if not self.habilitado or (self._hilo is not None and self._hilo.is_alive()
+                                   and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._bucle, name='planificador', daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        filas_registradas = False
+        while True:
+            with self.app.app_context():
+                try:
+                    if not filas_registradas:
+                        registrar_filas()
+                        filas_registradas = True
+                    ejecutar_pendientes()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[WARN] Planificador: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(self.intervalo)
+
+
+def register_planificador(app):
+    """Registra las tareas, el hilo del planificador (se inicia con el primer request) y sus comandos"""
+    from app.services import tareas  # noqa: F401  (registra las tareas con @tarea)
+
+    planificador = Planificador(app)
+    app.extensions['planificador'] = planificador
+    app.before_request(planificador.asegurar_hilo)
+
+    @app.cli.command('ejecutar-tareas')
+    @click.option('--tarea', 'nombre', help='Solo esta tarea')
+    @click.option('--forzar', is_flag=True, help='Ejecutar aunque no le toque según su horario')
+    def ejecutar_tareas(nombre, forzar):
+        """Ejecuta las tareas programadas pendientes (para cron si el hilo está deshabilitado)"""
+        registrar_filas()
+        if nombre:
+            if nombre not in _tareas:
+                raise click.BadParameter(f"Tarea desconocida; disponibles: {', '.join(sorted(_tareas))}")
+            if ejecutar(_tareas[nombre], forzar=forzar) is None:
+                print(f"[WARN] '{nombre}' no se ejecutó (no le toca o la tiene otro nodo; use --forzar)")
+            return
+        if forzar:
+            for t in _tareas.values():
+                ejecutar(t, forzar=True)
+        elif not ejecutar_pendientes():
+            print("[OK] No hay tareas pendientes")
+
+    @app.cli.command('estado-tareas')
+    def estado_tareas():
+        """Próxima ejecución, bloqueo y último resultado de cada tarea"""
+        registrar_filas()
+        for fila in TareaProgramada.query.order_by(TareaProgramada.nombre):
+            estado = f'en curso en {fila.bloqueada_por}' if fila.bloqueada_por else 'libre'
+            print(f"{fila.nombre:<26} {fila.cron:<16} próxima {fila.proxima_ejecucion:%Y-%m-%d %H:%M}  "
+                  f"{estado}  última: {fila.ultimo_error or fila.ultimo_resultado or '-'}")
@@ -0,0 +1,186 @@
+"""
+Métricas del pool de conexiones a la BD
+Reemplaza el QueuePool del engine por una subclase que mide cuánto tarda cada
+checkout (incluye abrir la conexión si hace falta) y registra por worker:
+- Latencia de checkout (p50/p95/máx) y cuántos checkouts superaron POOL_UMBRAL_ESPERA_MS
+- Uso del overflow y máximo de conexiones en uso a la vez
+- Rotación: conexiones abiertas, cerradas (recycle, overflow devuelto) e invalidadas (pre-ping)
+
+Cuando hay esperas se emite un [WARN] (a lo sumo uno cada AVISO_CADA segundos) y cada
+POOL_METRICAS_INTERVALO segundos un resumen [POOL] en el log. Gunicorn imprime además el
+resumen al terminar cada worker (ver gunicorn.conf.py).
+
+Los contadores son por proceso: tras el fork de un worker se reinician solos.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+AVISO_CADA = 10  # segundos entre avisos de espera por conexión
+
+_ajustes = {'umbral_ms': 50, 'intervalo': 300}
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class MetricasPool:
+    """Contadores del pool de conexiones del proceso actual"""
+
+    def __init__(self):
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._lock = threading.Lock()
+        self.pid = os.getpid()
+        self.desde = time.monotonic()
+        self.checkouts = 0
+        self.esperas = 0
+        self.latencias = deque(maxlen=2000)  # ms de los últimos checkouts
+        self.latencia_max = 0.0
+        self.en_uso_max = 0
+        self.overflow_max = 0
+        self.abiertas = 0
+        self.cerradas = 0
+        self.invalidadas = 0
+        self.capacidad = (0, 0)
+        self._esperas_sin_avisar = 0
+        self._ultimo_aviso = 0.0
+        self._ultimo_resumen = time.monotonic()
+
+    def _proceso_actual(self):
+        # Un worker recién creado con fork hereda los contadores del maestro
+        if self.pid != os.getpid():
+            self._reiniciar()
+
+    # --------------------------------------------
+    # Registro (llamado desde el pool)
+    # --------------------------------------------
+
+    def registrar_checkout(self, segundos, pool):
+        self._proceso_actual()
+        ms = segundos * 1000
+        en_uso = pool.checkedout()
+        aviso = None
+        with self._lock:
+            self.checkouts += 1
+            self.latencias.append(ms)
+            self.latencia_max = max(self.latencia_max, ms)
+            self.en_uso_max = max(self.en_uso_max, en_uso)
+            self.overflow_max = max(self.overflow_max, pool.overflow())
+            self.capacidad = (pool.size(), pool._max_overflow)
+            if ms >= _ajustes['umbral_ms']:
+                self.esperas += 1
+                self._esperas_sin_avisar += 1
+                ahora = time.monotonic()
+                if ahora - self._ultimo_aviso >= AVISO_CADA:
+                    aviso = (self._esperas_sin_avisar, ahora - self._ultimo_aviso if self._ultimo_aviso else 0)
+                    self._esperas_sin_avisar = 0
+                    self._ultimo_aviso = ahora
+        if aviso:
+            esperas, ventana = aviso
+            periodo = f" en los últimos {ventana:.0f}s" if ventana else ""
+            print(f"[WARN] Pool BD (pid {self.pid}): {esperas} checkout(s) esperaron más de "
+                  f"{_ajustes['umbral_ms']} ms{periodo} (último {ms:.0f} ms, en uso {en_uso} de "
+                  f"{pool.size()}+{pool._max_overflow}). Revise WEB_THREADS / DB_POOL_SIZE / DB_POOL_OVERFLOW")
+
+    def registrar(self, contador):
+        self._proceso_actual()
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    # --------------------------------------------
+    # Reporte
+    # --------------------------------------------
+
+    def resumen(self):
+        """Diccionario con las métricas acumuladas del worker"""
+        self._proceso_actual()
+        with self._lock:
+            latencias = list(self.latencias)
+            return {
+                'pid': self.pid,
+                'segundos': round(time.monotonic() - self.desde, 1),
+                'pool': f'{self.capacidad[0]}+{self.capacidad[1]}',
+                'checkouts': self.checkouts,
+                'esperas': self.esperas,
+                'checkout_p50_ms': round(_percentil(latencias, 0.50), 2),
+                'checkout_p95_ms': round(_percentil(latencias, 0.95), 2),
+                'checkout_max_ms': round(self.latencia_max, 2),
+                'en_uso_max': self.en_uso_max,
+                'overflow_max': max(0, self.overflow_max),
+                'abiertas': self.abiertas,
+                'cerradas': self.cerradas,
+                'invalidadas': self.invalidadas,
+            }
+
+    def resumen_texto(self):
+        datos = self.resumen()
+        return ' '.join(f'{clave}={valor}' for clave, valor in datos.items())
+
+    def resumen_periodico(self):
+        """Imprime el resumen si pasó POOL_METRICAS_INTERVALO desde el anterior"""
+        ahora = time.monotonic()
+        if ahora - self._ultimo_resumen < _ajustes['intervalo']:
+            return
+        self._ultimo_resumen = ahora
+        if self.checkouts:
+            print(f"[POOL] {self.resumen_texto()}")
+
+
+metricas = MetricasPool()
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide la latencia de cada checkout"""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        conexion = super()._do_get()
+        metricas.registrar_checkout(time.perf_counter() - inicio, self)
+        return conexion
+
+
+@event.listens_for(PoolMedido, 'connect')
+def _al_conectar(dbapi_connection, connection_record):
+    metricas.registrar('abiertas')
+
+
+@event.listens_for(PoolMedido, 'close')
+def _al_cerrar(dbapi_connection, connection_record):
+    metricas.registrar('cerradas')
+
+
+@event.listens_for(PoolMedido, 'invalidate')
+def _al_invalidar(dbapi_connection, connection_record, exception):
+    metricas.registrar('invalidadas')
+
+
+def register_pool_bd(app):
+    """
+    Instala el pool medido en SQLALCHEMY_ENGINE_OPTIONS.
+    Debe llamarse antes de db.init_app(app), que es cuando se crea el engine.
+    SQLite en memoria conserva su StaticPool y no se mide.
+    """
+    if not app.config.get('POOL_METRICAS'):
+        return
+
+    _ajustes['umbral_ms'] = app.config.get('POOL_UMBRAL_ESPERA_MS', 50)
+    _ajustes['intervalo'] = app.config.get('POOL_METRICAS_INTERVALO', 300)
+
+    opciones = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    opciones.setdefault('poolclass', PoolMedido)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones
+
+    @app.after_request
+    def resumen_pool(response):
+        metricas.resumen_periodico()
+        return response
@@ -0,0 +1,192 @@
+"""
+Principal en sesión para Flask-Login
+Evita cargar la fila completa de `usuarios` en cada request: la sesión guarda una
+identidad compacta (id, rol, activo, nombre, apellido y la generación con que se cargó)
+y el `Usuario` completo solo se carga cuando una vista accede a otro atributo.
+
+Invalidación entre workers: cambiar el rol, el estado activo o el nombre de cualquier
+usuario (o borrarlo) escribe una generación nueva en `configuracion_sistema`, en la
+misma transacción. Cada proceso relee ese valor como máximo cada
+PRINCIPAL_SINCRONIZACION segundos (una consulta por proceso, no por request) y los
+principales con otra generación se recargan. Un usuario desactivado pierde el acceso
+en todos los workers en ese plazo; PRINCIPAL_CACHE_TTL queda como cota para cambios
+hechos fuera del ORM.
+"""
+import threading
+import time
+import uuid
+
+from flask import current_app, session
+from flask_login import UserMixin
+from sqlalchemy import event, select, update
+
+from app import db
+from app.models.configuracion_sistema import ConfiguracionSistema
+from app.models.user import Usuario
+
+CLAVE_SESION = '_principal'
+CLAVE_GENERACION = 'principal_generacion'  # fila de configuracion_sistema
+
+# Campos de la identidad compacta
+CAMPOS_PRINCIPAL = ('id', 'rol', 'activo', 'nombre', 'apellido')
+
+# Cambios en estos campos invalidan el principal cacheado
+CAMPOS_INVALIDANTES = ('rol', 'activo', 'nombre', 'apellido')
+
+# Última generación leída por este proceso: (valor, monotonic de la lectura)
+_generacion = [None, 0.0]
+_lock = threading.Lock()
+
+
+def generacion_actual():
+    """Generación vigente de los principales (releída cada PRINCIPAL_SINCRONIZACION segundos)"""
+    intervalo = current_app.config.get('PRINCIPAL_SINCRONIZACION', 5)
+    with _lock:
+        valor, leida_en = _generacion
+    if valor is not None and time.monotonic() - leida_en < intervalo:
+        return valor
+    valor = db.session.execute(
+        select(ConfiguracionSistema.valor).where(ConfiguracionSistema.clave == CLAVE_GENERACION)
+    ).scalar() or '0'
+    with _lock:
+        _generacion[:] = [valor, time.monotonic()]
+    return valor
+
+
+def invalidar_principales(conexion=None):
+    """
+    Fuerza la recarga de los principales cacheados en todos los procesos
+
+    Se escribe en la transacción actual (o en `conexion`, desde eventos de flush): si
+    se revierte, los principales solo se recargan una vez de más.
+    """
+    nueva = uuid.uuid4().hex[:12]
+    tabla = ConfiguracionSistema.__table__
+    (conexion or db.session).execute(
+        update(tabla).where(tabla.c.clave == CLAVE_GENERACION).values(valor=nueva)
+    )
+    with _lock:
+        _generacion[:] = [nueva, time.monotonic()]  # este proceso lo ve de inmediato
+
+
+class PrincipalSesion(UserMixin):
+    """Identidad compacta del usuario autenticado con carga diferida del Usuario completo"""
+
+    def __init__(self, id, rol, activo, nombre, apellido):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'rol', rol)
+        object.__setattr__(self, 'activo', activo)
+        object.__setattr__(self, 'nombre', nombre)
+        object.__setattr__(self, 'apellido', apellido)
+        object.__setattr__(self, '_usuario', None)
+
+    @property
+    def nombre_completo(self):
+        return f"{self.nombre} {self.apellido}"
+
+    @property
+    def is_active(self):
+        return bool(self.activo)
+
+    def is_admin(self):
+        return self.rol == 'admin'
+
+    def is_veterinario(self):
+        return self.rol == 'veterinario'
+
+    def is_tutor(self):
+        return self.rol == 'tutor'
+
+    def is_recepcionista(self):
+        return self.rol == 'recepcionista'
+
+    def get_notificaciones_no_leidas(self):
+        # Lee el contador sin cargar el Usuario completo
+        from app.services.notificaciones import no_leidas
+        return no_leidas(self.id)
+
+    def usuario(self):
+        """Retorna el `Usuario` completo (una consulta por request, solo si se necesita)"""
+        if self._usuario is None:
+            object.__setattr__(self, '_usuario', db.session.get(Usuario, self.id))
+        return self._usuario
+
+    def __getattr__(self, nombre):
+        # Solo se invoca para atributos que no están en la identidad compacta
+        if nombre.startswith('__'):
+            raise AttributeError(nombre)
+        return getattr(self.usuario(), nombre)
+
+    def __setattr__(self, nombre, valor):
+        # Las vistas de perfil asignan directamente sobre current_user
+        setattr(self.usuario(), nombre, valor)
+        if nombre in CAMPOS_PRINCIPAL:
+            object.__setattr__(self, nombre, valor)
+
+    def __eq__(self, otro):
+        return getattr(otro, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<PrincipalSesion {self.id} - {self.rol}>'
+
+
+def guardar_principal(usuario, generacion=None):
+    """Guarda la identidad compacta del usuario en la sesión"""
+    session[CLAVE_SESION] = {
+        'id': usuario.id,
+        'rol': usuario.rol,
+        'activo': bool(usuario.activo),
+        'nombre': usuario.nombre,
+        'apellido': usuario.apellido,
+        'generacion': generacion or generacion_actual(),
+        'cargado_en': time.time(),
+    }
+
+
+def limpiar_principal():
+    session.pop(CLAVE_SESION, None)
+
+
+def cargar_principal(user_id):
+    """
+    Callback de Flask-Login
+
+    Usa la identidad guardada en sesión mientras no haya expirado el TTL y su
+    generación sea la vigente; en otro caso la recarga con una consulta de columnas mínimas.
+    """
+    user_id = int(user_id)
+    datos = session.get(CLAVE_SESION)
+    ttl = current_app.config.get('PRINCIPAL_CACHE_TTL', 60)
+    # Antes de leer la fila: una invalidación posterior deja el sello viejo y se recarga
+    generacion = generacion_actual()
+
+    if (datos and datos.get('id') == user_id
+            and time.time() - datos.get('cargado_en', 0) < ttl
+            and datos.get('generacion') == generacion):
+        return PrincipalSesion(*(datos[c] for c in CAMPOS_PRINCIPAL))
+
+    fila = db.session.query(
+        Usuario.id, Usuario.rol, Usuario.activo, Usuario.nombre, Usuario.apellido
+    ).filter(Usuario.id == user_id).first()
+
+    if fila is None or not fila.activo:
+        limpiar_principal()
+        return None
+
+    guardar_principal(fila, generacion)
+    return PrincipalSesion(fila.id, fila.rol, fila.activo, fila.nombre, fila.apellido)
+
+
+def register_principal(login_manager):
+    """Registra el principal en sesión como user_loader de Flask-Login"""
+    login_manager.user_loader(cargar_principal)
+
+
+@event.listens_for(Usuario, 'after_update')
+def _invalidar_si_cambia(mapper, connection, target):
+    estado = db.inspect(target)
+    if any(estado.attrs[c].history.has_changes() for c in CAMPOS_INVALIDANTES):
+        invalidar_principales(connection)
@@ -0,0 +1,222 @@
+"""
+Réplica de solo lectura para reportes
+Las vistas marcadas con @solo_lectura (reportes, dashboard de pagos, exportaciones,
+historial médico) y los trabajos de fondo dentro de `with usar_replica():` envían sus
+SELECT al bind 'replica' (REPLICA_DATABASE_URL), liberando el pool de la primaria
+para las escrituras transaccionales (pagar_cita, atender_cita...).
+
+Se vuelve a la primaria cuando:
+- No hay réplica configurada o no responde
+- Su retraso supera REPLICA_MAX_RETRASO segundos (presupuesto de datos desactualizados)
+- La sesión ya escribió algo en el request (leer lo propio siempre desde la primaria)
+
+El retraso se mide con un latido: cada REPLICA_VERIFICAR_CADA segundos se escribe la
+hora en `configuracion_sistema` de la primaria y se compara con el último latido que
+llegó a la réplica.
+
+Para probar en local con dos archivos SQLite:
+    REPLICA_DATABASE_URL=sqlite:///replica.db flask --app run copiar-replica
+    REPLICA_DATABASE_URL=sqlite:///replica.db flask --app run replica-estado
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import click
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+CLAVE_BIND = 'replica'
+CLAVE_LATIDO = 'latido_replica'
+
+_lectura_en_replica = contextvars.ContextVar('lectura_en_replica', default=False)
+
+
+# ============================================
+# MARCADO DE VISTAS Y TRABAJOS
+# ============================================
+
+@contextmanager
+def usar_replica():
+    """Envía a la réplica los SELECT ejecutados dentro del bloque"""
+    token = _lectura_en_replica.set(True)
+    try:
+        yield
+    finally:
+        _lectura_en_replica.reset(token)
+
+
+def solo_lectura(f):
+    """Decorador para vistas que solo consultan: sus SELECT van a la réplica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with usar_replica():
+            return f(*args, **kwargs)
+    return decorated_function
+
+
+# ============================================
+# SALUD Y RETRASO
+# ============================================
+
+def medir_retraso(primaria, replica):
+    """
+    Compara el latido de la primaria con el de la réplica y escribe uno nuevo
+
+    Returns:
+        tuple: (segundos de retraso o None si aún no hay latido, motivo)
+    """
+    from app.models import ConfiguracionSistema
+
+    tabla = ConfiguracionSistema.__table__
+    consulta = select(tabla.c.valor).where(tabla.c.clave == CLAVE_LATIDO)
+    ahora = datetime.utcnow()
+
+    with primaria.connect() as conexion:
+        latido_primaria = conexion.execute(consulta).scalar()
+    with replica.connect() as conexion:
+        latido_replica = conexion.execute(consulta).scalar()
+
+    with primaria.begin() as conexion:
+        valores = {'valor': ahora.isoformat(), 'fecha_actualizacion': ahora}
+        if latido_primaria is None:
+            conexion.execute(insert(tabla).values(
+                clave=CLAVE_LATIDO, tipo='string',
+                descripcion='Latido para medir el retraso de la réplica', **valores))
+        else:
+            conexion.execute(update(tabla).where(tabla.c.clave == CLAVE_LATIDO).values(**valores))
+
+    if latido_primaria is None:
+        return None, 'sin latido previo'
+    if latido_replica is not None and latido_replica >= latido_primaria:
+        return 0.0, 'al día'
+    # La réplica todavía no recibió el latido anterior: lleva al menos este retraso
+    retraso = (ahora - datetime.fromisoformat(latido_primaria)).total_seconds()
+    return retraso, 'atrasada'
+
+
+class EstadoReplica:
+    """Disponibilidad de la réplica en este proceso, verificada periódicamente"""
+
+    def __init__(self, app):
+        self.app = app
+        self.max_retraso = app.config.get('REPLICA_MAX_RETRASO', 30)
+        self.verificar_cada = app.config.get('REPLICA_VERIFICAR_CADA', 5)
+        self.disponible = False
+        self.retraso = None
+        self.motivo = 'sin verificar'
+        self._verificado = None
+        self._lock = threading.Lock()
+
+    def verificar(self, engines, avisar=True):
+        """Mide el retraso ahora y actualiza el estado"""
+        try:
+            retraso, motivo = medir_retraso(engines[None], engines[CLAVE_BIND])
+        except SQLAlchemyError as e:
+            retraso, motivo = None, f'error: {e.__class__.__name__}'
+
+        disponible = retraso is not None and retraso <= self.max_retraso
+        if retraso is not None and not disponible:
+            motivo = f'retraso de {retraso:.0f}s supera {self.max_retraso}s'
+        if avisar and self._verificado is not None and disponible != self.disponible:
+            if disponible:
+                print(f"[OK] Réplica disponible de nuevo para lecturas ({motivo})")
+            else:
+                print(f"[WARN] Lecturas de solo lectura vuelven a la primaria: {motivo}")
+
+        self.disponible, self.retraso, self.motivo = disponible, retraso, motivo
+        self._verificado = time.monotonic()
+        return disponible
+
+    def usable(self, engines):
+        """Disponibilidad, verificando solo si pasó REPLICA_VERIFICAR_CADA"""
+        if self._verificado is not None and time.monotonic() - self._verificado < self.verificar_cada:
+            return self.disponible
+        # Un solo hilo verifica; los demás usan el último estado conocido
+        if not self._lock.acquire(blocking=False):
+            return self.disponible
+        try:
+            return self.verificar(engines)
+        finally:
+            self._lock.release()
+
+
+# ============================================
+# ENRUTAMIENTO DE LA SESIÓN
+# ============================================
+
+class SesionEnrutada(Session):
+    """Sesión de Flask-SQLAlchemy que envía a la réplica los SELECT marcados"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and _lectura_en_replica.get() and not self._flushing
+                and not self.info.get('escribio') and getattr(clause, 'is_select', False)):
+            engines = self._db.engines
+            estado = current_app.extensions.get('replica')
+            if estado is not None and CLAVE_BIND in engines and estado.usable(engines):
+                return engines[CLAVE_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _marcar_escritura(session, flush_context):
+    session.info['escribio'] = True
+
+
+# ============================================
+# REGISTRO Y COMANDOS
+# ============================================
+
+def register_replica(app):
+    """
+    Agrega el bind de la réplica si REPLICA_DATABASE_URL está configurada.
+    Debe llamarse antes de db.init_app(app).
+    """
+    url = app.config.get('REPLICA_DATABASE_URL')
+    if url:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[CLAVE_BIND] = url
+        app.config['SQLALCHEMY_BINDS'] = binds
+        app.extensions['replica'] = EstadoReplica(app)
+        print("[OK] Réplica de solo lectura configurada para reportes")
+
+    @app.cli.command('replica-estado')
+    def replica_estado():
+        """Verifica la réplica y muestra su retraso"""
+        from app import db
+
+        estado = app.extensions.get('replica')
+        if estado is None:
+            click.echo("[WARN] No hay réplica configurada (REPLICA_DATABASE_URL)")
+            return
+        # El primer latido solo se escribe; el segundo ya permite medir
+        for _ in range(2):
+            estado.verificar(db.engines, avisar=False)
+        retraso = 'desconocido' if estado.retraso is None else f'{estado.retraso:.1f}s'
+        click.echo(f"Disponible: {'sí' if estado.disponible else 'no'} | retraso: {retraso} | {estado.motivo}")
+
+    @app.cli.command('copiar-replica')
+    def copiar_replica():
+        """Copia la BD primaria sobre la réplica (solo SQLite, para pruebas locales)"""
+        from app import db
+
+        if 'replica' not in app.extensions:
+            click.echo("[ERROR] No hay réplica configurada (REPLICA_DATABASE_URL)")
+            return
+        primaria, replica = db.engines[None], db.engines[CLAVE_BIND]
+        if primaria.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            click.echo("[ERROR] copiar-replica solo funciona entre archivos SQLite")
+            return
+
+        origen, destino = primaria.raw_connection(), replica.raw_connection()
+        try:
+            origen.driver_connection.backup(destino.driver_connection)
+        finally:
+            origen.close()
+            destino.close()
+        click.echo(f"[OK] Réplica actualizada desde {primaria.url.database}")
@@ -0,0 +1,222 @@
+"""
+Tareas programadas de la clínica
+Se registran en el planificador (app/services/planificador.py) con su horario cron.
+Todas recorren los registros por bloques de ids y escriben con sentencias por
+conjuntos (INSERT masivo, INSERT ... SELECT, UPDATE/DELETE ... WHERE id IN): ninguna
+carga los registros en el ORM.
+
+- recordatorios_citas: notificación al tutor de sus citas dentro de
+  `recordatorio_cita_horas` (configuracion_sistema).
+- recordatorios_vacunas: una notificación por mascota con vacunas próximas.
+- vencer_qr: borra la imagen y los datos de los QR vencidos (se pueden regenerar).
+- vencer_pagos: cancela los pagos pendientes pasada su fecha límite, con su historial.
+- purgar_notificaciones: borra las notificaciones expiradas.
+- enviar_notificaciones: entrega por email/SMS (app/services/notificaciones.py).
+- purgar_eventos: borra los eventos en vivo ya entregados (app/services/eventos.py).
+- escanear_inventario y archivar_auditoria: mantenimiento diario.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import delete, exists, func, insert, literal, select, update
+
+from app import db
+from app.models import (Cita, ConfiguracionSistema, ContadorNotificaciones, Evento, HistorialPago, Mascota,
+                        Notificacion, Pago, Vacuna)
+from app.services.notificaciones import entregar_pendientes, recontar
+from app.services.planificador import actualizar_en_lotes, borrar_en_lotes, en_lotes, tarea
+
+ESTADOS_CITA_ABIERTA = ('pendiente', 'confirmada')
+HORAS_RECORDATORIO_CITA = 24  # si no está en configuracion_sistema
+DIAS_RECORDATORIO_VACUNA = 7
+DIAS_EXPIRACION_RECORDATORIO = 1  # tras la cita o la fecha de la vacuna
+
+
+def _a_utc(local):
+    """Hora local sin zona (citas, vacunas) a UTC sin zona, como fecha_expiracion de las notificaciones"""
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _configuracion_entera(clave, defecto):
+    valor = db.session.execute(
+        select(ConfiguracionSistema.valor).where(ConfiguracionSistema.clave == clave)
+    ).scalar()
+    try:
+        return int(valor) if valor is not None else defecto
+    except ValueError:
+        return defecto
+
+
+# ============================================
+# RECORDATORIOS
+# ============================================
+
+@tarea('recordatorios_citas', '*/15 * * * *')
+def recordatorios_citas():
+    """Recordatorio de las citas abiertas que empiezan dentro del plazo configurado"""
+    ahora = datetime.now()
+    horas = _configuracion_entera('recordatorio_cita_horas', HORAS_RECORDATORIO_CITA)
+    condiciones = (
+        Cita.estado.in_(ESTADOS_CITA_ABIERTA),
+        Cita.fecha > ahora,
+        Cita.fecha <= ahora + timedelta(hours=horas),
+        ~exists().where(Notificacion.cita_id == Cita.id, Notificacion.tipo == 'cita_recordatorio'),
+    )
+
+    def crear(ids):
+        citas = db.session.execute(
+            select(Cita.id, Cita.tutor_id, Cita.mascota_id, Cita.fecha, Cita.tipo,
+                   Mascota.nombre.label('mascota'))
+            .join(Mascota, Mascota.id == Cita.mascota_id)
+            .where(Cita.id.in_(ids))
+        ).all()
+        if citas:
+            db.session.execute(insert(Notificacion.__table__), [{
+                'usuario_id': c.tutor_id,
+                'tipo': 'cita_recordatorio',
+                'titulo': f'Recordatorio: cita de {c.mascota}',
+                'mensaje': f"{c.mascota} tiene una cita de {c.tipo.lower()} el "
+                           f"{c.fecha.strftime('%d/%m/%Y')} a las {c.fecha.strftime('%H:%M')}.",
+                'url_accion': f'/tutor/cita/{c.id}',
+                'cita_id': c.id,
+                'mascota_id': c.mascota_id,
+                'prioridad': 'alta',
+                'fecha_expiracion': _a_utc(c.fecha + timedelta(days=DIAS_EXPIRACION_RECORDATORIO)),
+            } for c in citas])
+            recontar({c.tutor_id for c in citas})
+        return len(citas)
+
+    return {'creadas': en_lotes(Cita.id, condiciones, crear)}
+
+
+@tarea('recordatorios_vacunas', '0 8 * * *')
+def recordatorios_vacunas():
+    """Una notificación por mascota con vacunas en los próximos DIAS_RECORDATORIO_VACUNA días"""
+    hoy = date.today()
+    condiciones = (
+        Vacuna.fecha_proxima >= hoy,
+        Vacuna.fecha_proxima <= hoy + timedelta(days=DIAS_RECORDATORIO_VACUNA),
+        exists().where(Mascota.id == Vacuna.mascota_id, Mascota.activo == True),
+        # Ya avisada en esta ventana
+        ~exists().where(
+            Notificacion.mascota_id == Vacuna.mascota_id,
+            Notificacion.tipo == 'vacuna_pendiente',
+            Notificacion.fecha_creacion >= datetime.utcnow() - timedelta(days=DIAS_RECORDATORIO_VACUNA),
+        ),
+    )
+
+    def crear(ids):
+        por_mascota = {}
+        for v in db.session.execute(
+            select(Vacuna.mascota_id, Vacuna.nombre, Vacuna.fecha_proxima, Mascota.tutor_id,
+                   Mascota.nombre.label('mascota'))
+            .join(Mascota, Mascota.id == Vacuna.mascota_id)
+            .where(Vacuna.id.in_(ids))
+            .order_by(Vacuna.fecha_proxima)
+        ):
+            por_mascota.setdefault(v.mascota_id, []).append(v)
+        if por_mascota:
+            db.session.execute(insert(Notificacion.__table__), [{
+                'usuario_id': vacunas[0].tutor_id,
+                'tipo': 'vacuna_pendiente',
+                'titulo': f'Vacunas próximas de {vacunas[0].mascota}',
+                'mensaje': f"{vacunas[0].mascota}: " + ', '.join(
+                    f"{v.nombre} ({v.fecha_proxima.strftime('%d/%m/%Y')})" for v in vacunas) + '.',
+                'url_accion': f'/tutor/mascota/{mascota_id}',
+                'mascota_id': mascota_id,
+                'prioridad': 'normal',
+                'fecha_expiracion': _a_utc(datetime.combine(vacunas[-1].fecha_proxima, time())
+                                           + timedelta(days=DIAS_EXPIRACION_RECORDATORIO)),
+            } for mascota_id, vacunas in por_mascota.items()])
+            recontar({vacunas[0].tutor_id for vacunas in por_mascota.values()})
+        return len(por_mascota)
+
+    return {'creadas': en_lotes(Vacuna.id, condiciones, crear)}
+
+
+# ============================================
+# VENCIMIENTOS
+# ============================================
+
+@tarea('vencer_qr', '*/30 * * * *')
+def vencer_qr():
+    """Libera la imagen y los datos de los QR vencidos; el pago conserva su vencimiento"""
+    condiciones = (Pago.qr_vencimiento < datetime.utcnow(), Pago.qr_code_image.isnot(None))
+    return {'qr_vencidos': actualizar_en_lotes(Pago, condiciones, {'qr_code_image': None, 'qr_code_data': None})}
+
+
+@tarea('vencer_pagos', '5 * * * *')
+def vencer_pagos():
+    """Cancela los pagos pendientes con la fecha límite vencida y lo registra en su historial"""
+    ahora = datetime.utcnow()
+    condiciones = (Pago.estado == 'pendiente', Pago.fecha_vencimiento < ahora)
+    pagos = Pago.__table__
+
+    def vencer(ids):
+        db.session.execute(insert(HistorialPago.__table__).from_select(
+            ['pago_id', 'accion', 'estado_anterior', 'estado_nuevo', 'monto_anterior', 'monto_nuevo',
+             'descripcion', 'fecha'],
+            select(Pago.id, literal('vencido'), Pago.estado, literal('cancelado'), Pago.monto, Pago.monto,
+                   literal('Fecha límite de pago vencida (tarea programada)'), literal(ahora, db.DateTime))
+            .where(Pago.id.in_(ids), *condiciones)
+        ))
+        return db.session.execute(
+            update(pagos).where(pagos.c.id.in_(ids), *condiciones).values(estado='cancelado')
+        ).rowcount
+
+    return {'cancelados': en_lotes(Pago.id, condiciones, vencer)}
+
+
+# ============================================
+# LIMPIEZA Y MANTENIMIENTO
+# ============================================
+
+@tarea('purgar_notificaciones', '30 3 * * *')
+def purgar_notificaciones():
+    """Borra las notificaciones expiradas y recalcula el contador de sus usuarios"""
+    condiciones = (Notificacion.fecha_expiracion < datetime.utcnow(),)
+    tabla = Notificacion.__table__
+
+    def purgar(ids):
+        usuarios = db.session.execute(
+            select(tabla.c.usuario_id).where(tabla.c.id.in_(ids), tabla.c.leida == False).distinct()
+        ).scalars().all()
+        eliminadas = db.session.execute(delete(tabla).where(tabla.c.id.in_(ids), *condiciones)).rowcount
+        recontar(usuarios)
+        return eliminadas
+
+    return {'eliminadas': en_lotes(Notificacion.id, condiciones, purgar)}
+
+
+@tarea('enviar_notificaciones', '*/5 * * * *', bloqueo=1800)
+def enviar_notificaciones():
+    """Entrega las notificaciones pendientes por los canales configurados"""
+    return entregar_pendientes()
+
+
+@tarea('recontar_notificaciones', '45 3 * * *')
+def recontar_notificaciones():
+    """Recalcula todos los contadores de no leídas (corrige desvíos de escrituras externas)"""
+    recontar()
+    return {'usuarios': db.session.execute(select(func.count()).select_from(ContadorNotificaciones)).scalar()}
+
+
+@tarea('purgar_eventos', '15 * * * *')
+def purgar_eventos():
+    """Borra los eventos en vivo con más de EVENTOS_RETENCION_HORAS horas"""
+    limite = datetime.utcnow() - timedelta(hours=current_app.config.get('EVENTOS_RETENCION_HORAS', 24))
+    return {'eliminados': borrar_en_lotes(Evento, (Evento.fecha < limite,))}
+
+
+@tarea('escanear_inventario', '5 0 * * *')
+def escanear_inventario():
+    """Alertas de vencimiento y stock del día (app/services/alertas_inventario.py)"""
+    from app.services.alertas_inventario import escanear
+    return escanear()
+
+
+@tarea('archivar_auditoria', '0 4 * * *', bloqueo=3600)
+def archivar_auditoria():
+    """Mueve a la tabla de archivo la auditoría con más de AUDITORIA_DIAS_ACTIVOS días"""
+    from app.services.auditoria import archivar_auditoria as archivar
+    return {'archivados': archivar(dias=current_app.config.get('AUDITORIA_DIAS_ACTIVOS', 90))}
@@ -0,0 +1,145 @@
+"""
+Buffer de escritura diferida (write-behind)
+Saca del camino crítico del login las escrituras de `ultimo_acceso` y de auditoría:
+se acumulan en memoria y un hilo de fondo las vuelca en una sola transacción
+(UPDATE masivo + INSERT masivo) cada cierto tiempo o al alcanzar un número de pendientes.
+La cola de auditoría es acotada: si se llena, quien encola vacía en el momento.
+Al terminar el proceso se hace un vaciado final.
+"""
+import atexit
+import os
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, update
+
+from app import db
+
+
+class BufferEscritura:
+    """Acumula escrituras de baja prioridad y las vuelca en lote"""
+
+    def __init__(self, app):
+        self.app = app
+        self.intervalo = app.config.get('WRITE_BEHIND_INTERVALO', 5)
+        self.max_pendientes = app.config.get('WRITE_BEHIND_MAX_PENDIENTES', 50)
+        self.habilitado = app.config.get('WRITE_BEHIND_ENABLED', True)
+        self.capacidad = app.config.get('AUDITORIA_CAPACIDAD_COLA', 5000)
+
+        self._lock = threading.Lock()
+        self._accesos = {}  # usuario_id -> fecha (se conserva solo el último acceso)
+        self._auditorias = []
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pid = None
+
+        atexit.register(self.vaciar)
+
+    # --------------------------------------------
+    # Encolado
+    # --------------------------------------------
+
+    def registrar_acceso(self, usuario_id, fecha=None):
+        """Encola la actualización de `ultimo_acceso` de un usuario"""
+        with self._lock:
+            self._accesos[usuario_id] = fecha or datetime.utcnow()
+        self._despues_de_encolar()
+
+    def registrar_auditoria(self, datos):
+        """Encola una fila de `auditoria_acciones` (dict con las columnas)"""
+        self.registrar_auditorias([datos])
+
+    def registrar_auditorias(self, filas):
+        """Encola varias filas de auditoría de una vez"""
+        with self._lock:
+            self._auditorias.extend(filas)
+            llena = len(self._auditorias) >= self.capacidad
+        if llena:
+            # Contrapresión: no se descartan registros, se vacía en el hilo actual
+            self.vaciar()
+            return
+        self._despues_de_encolar()
+
+    @property
+    def pendientes(self):
+        with self._lock:
+            return len(self._accesos) + len(self._auditorias)
+
+    def _despues_de_encolar(self):
+        if not self.habilitado:
+            self.vaciar()
+            return
+        self._asegurar_hilo()
+        if self.pendientes >= self.max_pendientes:
+            self._despertar.set()
+
+    # --------------------------------------------
+    # Vaciado
+    # --------------------------------------------
+
+    def _asegurar_hilo(self):
+        # Tras un fork (servidor con preload) el hilo del padre no existe en el hijo
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._hilo = threading.Thread(target=self._bucle, name='write-behind', daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            self.vaciar()
+
+    def _tomar_pendientes(self):
+        with self._lock:
+            accesos, self._accesos = self._accesos, {}
+            auditorias, self._auditorias = self._auditorias, []
+        return accesos, auditorias
+
+    def _reencolar(self, accesos, auditorias):
+        with self._lock:
+            for usuario_id, fecha in accesos.items():
+                self._accesos.setdefault(usuario_id, fecha)
+            # Límite para no crecer sin control si la BD no está disponible
+            espacio = max(self.capacidad - len(self._auditorias), 0)
+            self._auditorias[:0] = auditorias[:espacio]
+
+    def vaciar(self):
+        """Vuelca todo lo pendiente en una sola transacción. Retorna filas escritas."""
+        accesos, auditorias = self._tomar_pendientes()
+        if not accesos and not auditorias:
+            return 0
+
+        from app.models import Usuario, AuditoriaAccion
+        from app.services.auditoria import resolver_user_agents
+
+        with self.app.app_context():
+            try:
+                if accesos:
+                    db.session.execute(update(Usuario), [
+                        {'id': usuario_id, 'ultimo_acceso': fecha}
+                        for usuario_id, fecha in accesos.items()
+                    ])
+                if auditorias:
+                    db.session.execute(insert(AuditoriaAccion), resolver_user_agents(auditorias))
+                db.session.commit()
+                return len(accesos) + len(auditorias)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error al vaciar buffer de escritura: {e}")
+                self._reencolar(accesos, auditorias)
+                return 0
+            finally:
+                db.session.remove()
+
+
+def register_write_behind(app):
+    """Crea el buffer de escritura diferida de la aplicación"""
+    app.extensions['write_behind'] = BufferEscritura(app)
+
+
+def buffer_escritura():
+    """Buffer de la aplicación actual"""
+    return current_app.extensions['write_behind']
@@ -0,0 +1,192 @@
+// Citas en vivo para el portal del veterinario (app/services/eventos.py)
+// Escucha el canal de citas por Server-Sent Events y actualiza las listas y contadores
+// marcados en la página sin recargarla. Si el servidor no tiene lugar para otro stream
+// (503) o la conexión se corta, consulta /veterinario/eventos/sondeo cada pocos segundos
+// y vuelve a intentar el stream más tarde.
+// Los eventos pueden llegar desordenados o repetidos (un worker confirma después que
+// otro con id mayor): se descartan por id los ya aplicados, no por ser menores al último.
+//
+// Marcado que usa:
+//   <body data-eventos-url data-sondeo-url data-veterinario-id data-eventos-vistos="id,id,...">
+//   [data-lista-citas][data-plantilla="id-template"][data-filtro="mias|todas"][data-hoy]
+//     con filtros opcionales data-especialidad, data-urgencia, data-desde, data-hasta
+//     (AAAA-MM-DD) y, en listas paginadas, data-orden-desde/data-orden-hasta
+//   [data-cita-id] en cada fila, [data-vacio] para el estado vacío
+//   [data-contador-citas] con los mismos filtros (total de pendientes) y
+//   [data-contador-lista="id-lista"] (filas de la lista)
+//   <template> con [data-campo="mascota|tutor|motivo|fecha_texto|hora"] y
+//   [data-url="url_aceptar|url_atender|url_ver"] (href o action)
+
+(function () {
+    const TIPOS = ['cita_nueva', 'cita_confirmada', 'cita_aceptada', 'cita_pospuesta'];
+    const SONDEO_MS = 20000;
+    const REINTENTO_SSE_MS = 120000;
+    const MARGEN_VISTOS = 500;  // ids recordados por debajo del último (> HUECO_MAXIMO del servidor)
+
+    document.addEventListener('DOMContentLoaded', function () {
+        const body = document.body;
+        const urlEventos = body.dataset.eventosUrl;
+        const urlSondeo = body.dataset.sondeoUrl;
+        if (!urlEventos || !urlSondeo) return;
+
+        const veterinarioId = parseInt(body.dataset.veterinarioId, 10);
+        const hoy = fechaLocal(new Date());
+        const vistos = new Set((body.dataset.eventosVistos || '').split(',').filter(Boolean).map(Number));
+        let ultimo = Math.max(0, ...vistos);
+        let fuente = null;
+        let temporizador = null;
+
+        function esMia(datos) {
+            return datos.veterinario_id === veterinarioId;
+        }
+
+        function coincide(elemento, datos) {
+            const filtros = elemento.dataset;
+            if (filtros.filtro === 'mias' && !esMia(datos)) return false;
+            if (elemento.hasAttribute('data-hoy') && datos.fecha !== hoy) return false;
+            if (filtros.especialidad && datos.especialidad !== filtros.especialidad) return false;
+            if (filtros.urgencia && datos.urgencia !== filtros.urgencia) return false;
+            if (filtros.desde && datos.fecha < filtros.desde) return false;
+            if (filtros.hasta && datos.fecha > filtros.hasta) return false;
+            return true;
+        }
+
+        function enPagina(lista, datos) {
+            // Listas paginadas: solo las citas que caen entre la primera y la última fila
+            const clave = datos.fecha + ' ' + datos.hora;
+            const filtros = lista.dataset;
+            if (filtros.ordenDesde && clave < filtros.ordenDesde) return false;
+            if (filtros.ordenHasta && clave > filtros.ordenHasta) return false;
+            return true;
+        }
+
+        function crearFila(lista, datos) {
+            const plantilla = document.getElementById(lista.dataset.plantilla);
+            if (!plantilla) return null;
+            const fila = plantilla.content.firstElementChild.cloneNode(true);
+            fila.dataset.citaId = datos.id;
+            fila.querySelectorAll('[data-campo]').forEach(function (el) {
+                el.textContent = datos[el.dataset.campo] || '';
+            });
+            fila.querySelectorAll('[data-url]').forEach(function (el) {
+                const url = datos[el.dataset.url];
+                if (el.tagName === 'FORM') el.action = url; else el.href = url;
+            });
+            return fila;
+        }
+
+        function insertarOrdenada(lista, fila, datos) {
+            // Las listas van por fecha ascendente
+            const clave = datos.fecha + ' ' + datos.hora;
+            const siguiente = Array.from(lista.querySelectorAll('[data-cita-id]')).find(function (el) {
+                return (el.dataset.orden || '') > clave;
+            });
+            fila.dataset.orden = clave;
+            lista.insertBefore(fila, siguiente || null);
+        }
+
+        function actualizarVacios(lista) {
+            const hay = lista.querySelector('[data-cita-id]') !== null;
+            const contenedor = lista.parentElement;
+            const vacio = contenedor ? contenedor.querySelector('[data-vacio]') : null;
+            if (vacio) vacio.style.display = hay ? 'none' : '';
+            lista.style.display = hay ? '' : 'none';
+            document.querySelectorAll('[data-contador-lista="' + lista.id + '"]').forEach(function (el) {
+                el.textContent = lista.querySelectorAll('[data-cita-id]').length;
+            });
+        }
+
+        function ajustarContadores(datos) {
+            // Cuentan citas pendientes: se compara el estado antes y después del cambio
+            const antes = Object.assign({}, datos, datos.antes);
+            document.querySelectorAll('[data-contador-citas]').forEach(function (el) {
+                const delta = (datos.pendiente && coincide(el, datos) ? 1 : 0)
+                    - (antes.pendiente && coincide(el, antes) ? 1 : 0);
+                if (!delta) return;
+                el.textContent = Math.max(0, (parseInt(el.textContent, 10) || 0) + delta);
+            });
+        }
+
+        function aplicar(tipo, id, datos) {
+            if (vistos.has(id)) return;  // repetido (reenvío tras reconectar)
+            vistos.add(id);
+            if (id > ultimo) {
+                ultimo = id;
+                vistos.forEach(function (v) { if (v < ultimo - MARGEN_VISTOS) vistos.delete(v); });
+            }
+
+            document.querySelectorAll('[data-lista-citas]').forEach(function (lista) {
+                const existente = lista.querySelector('[data-cita-id="' + datos.id + '"]');
+                if (datos.pendiente && coincide(lista, datos)) {
+                    if (!existente && enPagina(lista, datos)) {
+                        const fila = crearFila(lista, datos);
+                        if (fila) insertarOrdenada(lista, fila, datos);
+                    }
+                } else if (existente) {
+                    existente.remove();
+                }
+                actualizarVacios(lista);
+            });
+
+            ajustarContadores(datos);
+
+            if (tipo === 'cita_nueva' && esMia(datos) && window.toastr) {
+                toastr.info(datos.mascota + ' (' + datos.tutor + ') - ' + datos.fecha_texto + ' ' + datos.hora,
+                    'Nueva cita');
+            }
+        }
+
+        function recargar() {
+            window.location.reload();
+        }
+
+        function conectar() {
+            detenerSondeo();
+            fuente = new EventSource(urlEventos + '?desde=' + ultimo);
+            TIPOS.forEach(function (tipo) {
+                fuente.addEventListener(tipo, function (e) {
+                    aplicar(tipo, parseInt(e.lastEventId, 10), JSON.parse(e.data));
+                });
+            });
+            fuente.addEventListener('recargar', recargar);
+            fuente.onerror = function () {
+                // Cierre normal al cumplir EVENTOS_SSE_DURACION: el navegador reconecta solo.
+                // Con 503 el EventSource queda cerrado: se pasa al sondeo.
+                if (fuente.readyState === EventSource.CLOSED) {
+                    fuente = null;
+                    iniciarSondeo();
+                }
+            };
+        }
+
+        function sondear() {
+            fetch(urlSondeo + '?desde=' + ultimo, { credentials: 'same-origin' })
+                .then(function (r) { return r.ok ? r.json() : null; })
+                .then(function (respuesta) {
+                    if (!respuesta) return;
+                    if (respuesta.recargar) return recargar();
+                    respuesta.eventos.forEach(function (e) { aplicar(e.tipo, e.id, e.datos); });
+                })
+                .catch(function () {});
+        }
+
+        function iniciarSondeo() {
+            if (temporizador) return;
+            temporizador = setInterval(sondear, SONDEO_MS);
+            setTimeout(conectar, REINTENTO_SSE_MS);
+        }
+
+        function detenerSondeo() {
+            if (temporizador) clearInterval(temporizador);
+            temporizador = null;
+        }
+
+        if (window.EventSource) conectar(); else temporizador = setInterval(sondear, SONDEO_MS);
+    });
+
+    function fechaLocal(d) {
+        const mes = String(d.getMonth() + 1).padStart(2, '0');
+        const dia = String(d.getDate()).padStart(2, '0');
+        return d.getFullYear() + '-' + mes + '-' + dia;
+    }
+})();
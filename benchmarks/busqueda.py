@@ -0,0 +1,136 @@
+"""
+Benchmark del autocompletado de tutores
+
+Compara, sobre una BD SQLite con muchos tutores sintéticos (500k por defecto, se
+genera una vez y se reutiliza), la búsqueda anterior de api_buscar_usuario
+(`LIKE '%texto%'` en nombre, apellido y email, que recorre la tabla) con el índice
+de búsqueda por prefijo (app/services/busqueda.py).
+
+Mide la latencia por tecla (p50/p95) de varias consultas típicas. Termina con código 1
+si el p95 del índice supera --max-ms.
+
+Uso:
+    python benchmarks/busqueda.py
+    python benchmarks/busqueda.py --tutores 100000 --max-ms 10 --salida busqueda.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+from comun import crear_app
+
+CONSULTAS = ['ju', 'juan', 'juan pe', 'gabriela quis', 'rodriguez', 'sint.tutor.012345', 'xyz']
+
+
+def preparar_datos(tutores, directorio, semilla):
+    """URI de la BD con `tutores` tutores sintéticos, generándola si no existe"""
+    ruta = os.path.join(directorio, f'busqueda-{tutores}-s{semilla}.db')
+    uri = f'sqlite:///{ruta}'
+    app = crear_app(uri)
+    from app.services.arranque import asegurar_esquema, inicializar_bd
+    from app.services.datos_sinteticos import GeneradorDatos
+
+    with app.app_context():
+        if os.path.exists(ruta):
+            with contextlib.redirect_stdout(io.StringIO()):
+                asegurar_esquema(app)
+        else:
+            os.makedirs(directorio, exist_ok=True)
+            print(f"Generando {tutores} tutores (solo la primera vez)...")
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicializar_bd()
+            GeneradorDatos(semilla=semilla, fecha_base=date(2025, 1, 1), tutores=tutores,
+                           veterinarios=0, mascotas=0, citas=0, medicamentos=0, lotes=0).ejecutar()
+    return app
+
+
+def buscar_like(texto):
+    """La consulta que hacía api_buscar_usuario antes del índice"""
+    from sqlalchemy import and_, or_
+    from app.models import Usuario
+
+    return Usuario.query.filter(
+        and_(
+            Usuario.rol == 'tutor',
+            Usuario.activo == True,
+            or_(
+                Usuario.nombre.contains(texto),
+                Usuario.apellido.contains(texto),
+                Usuario.email.contains(texto)
+            )
+        )
+    ).limit(10).all()
+
+
+def buscar_indice(texto):
+    from app.models import Usuario
+    from app.services.busqueda import buscar_modelos
+
+    return buscar_modelos('usuario', texto, limite=10,
+                          filtros=(Usuario.rol == 'tutor', Usuario.activo == True))
+
+
+def medir(funcion, texto, rondas):
+    """Milisegundos por llamada (tras una llamada de calentamiento)"""
+    from app import db
+
+    funcion(texto)
+    tiempos = []
+    for _ in range(rondas):
+        db.session.expunge_all()
+        inicio = time.perf_counter()
+        resultados = funcion(texto)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        'p50_ms': round(statistics.median(tiempos), 2),
+        'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 2),
+        'resultados': len(resultados),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark del autocompletado de tutores')
+    parser.add_argument('--tutores', type=int, default=500000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--datos-dir', default=os.path.join(tempfile.gettempdir(), 'sistemavete_bench'),
+                        help='Dónde se guardan (y reutilizan) las BD generadas')
+    parser.add_argument('--rondas', type=int, default=50, help='Rondas del índice por consulta')
+    parser.add_argument('--rondas-like', type=int, default=3, help='Rondas de LIKE (recorre la tabla)')
+    parser.add_argument('--max-ms', type=float, default=10.0, help='Presupuesto del p95 del índice')
+    parser.add_argument('--salida', help='Guardar los resultados en un archivo JSON')
+    args = parser.parse_args(argv)
+
+    app = preparar_datos(args.tutores, args.datos_dir, args.semilla)
+    resultados = {}
+    with app.app_context():
+        print(f"\n{'consulta':<22} {'LIKE p50':>10} {'índice p50':>11} {'índice p95':>11} {'mejora':>8} {'filas':>6}")
+        for texto in CONSULTAS:
+            like = medir(buscar_like, texto, args.rondas_like)
+            indice = medir(buscar_indice, texto, args.rondas)
+            resultados[texto] = {'like': like, 'indice': indice}
+            mejora = like['p50_ms'] / indice['p50_ms'] if indice['p50_ms'] else float('inf')
+            print(f"{texto:<22} {like['p50_ms']:>8.2f}ms {indice['p50_ms']:>9.2f}ms "
+                  f"{indice['p95_ms']:>9.2f}ms {mejora:>7.0f}x {indice['resultados']:>6}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({'tutores': args.tutores, 'resultados': resultados}, f, indent=2, ensure_ascii=False)
+
+    lentas = [texto for texto, r in resultados.items() if r['indice']['p95_ms'] > args.max_ms]
+    if lentas:
+        print(f"\n[ERROR] p95 del índice supera {args.max_ms:.0f} ms en: {', '.join(lentas)}")
+        return 1
+    print(f"\n[OK] p95 del índice bajo {args.max_ms:.0f} ms en todas las consultas")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,517 @@
+"""
+Prueba de carga del flujo de citas y pagos
+
+Simula usuarios concurrentes con una mezcla configurable de roles:
+- tutor: nueva_cita -> pagar_cita -> pago_exitoso -> descargar_factura
+- veterinario: dashboard -> mis_citas -> atender_cita
+- admin: listados del panel (dashboard, tutores, pagos, inventario, reportes)
+
+Cada usuario virtual inicia sesión por `auth.login` y se reporta por paso:
+latencia p50/p90/p95/p99, tasa de error y consultas a la BD por request
+(cabecera `X-Consultas-BD`, requiere PERFIL_CONSULTAS=1 en el servidor).
+
+Las cuentas son las del generador de datos sintéticos (`flask generar-datos`):
+sint.tutor.NNNNNN / sint.vet.NNNNNN con contraseña demo123, más el admin.
+
+Uso:
+    # En proceso (test_client) contra un archivo SQLite, generando los datos
+    python benchmarks/carga.py --bd sqlite:///carga.db --preparar --usuarios 20 --duracion 60
+
+    # Por HTTP contra un servidor en marcha (iniciado con PERFIL_CONSULTAS=1)
+    python benchmarks/carga.py --modo http --url http://localhost:5000 \\
+        --usuarios 50 --mezcla tutor=80,veterinario=15,admin=5 --salida resultado.json
+"""
+import argparse
+import http.cookies
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+
+from comun import crear_app
+
+RUTAS_ADMIN = [
+    '/admin/dashboard',
+    '/admin/tutores',
+    '/admin/veterinarios',
+    '/admin/inventario/',
+    '/admin/pagos/listar',
+    '/admin/reportes/',
+]
+
+METODOS_PAGO = ['efectivo', 'tarjeta_credito', 'qr_bancario']
+
+DIAGNOSTICOS = ['Control general sin hallazgos', 'Otitis externa leve', 'Dermatitis alérgica',
+                'Gastroenteritis aguda', 'Parasitosis intestinal']
+
+
+# ============================================
+# CLIENTES
+# ============================================
+
+class Respuesta:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def location(self):
+        return self.headers.get('Location') or ''
+
+    @property
+    def texto(self):
+        return self.body.decode('utf-8', 'replace')
+
+
+class ClienteProceso:
+    """Ejecuta los requests dentro del proceso con el test_client de Flask"""
+
+    def __init__(self, app):
+        self._cliente = app.test_client()
+
+    def request(self, metodo, ruta, datos=None):
+        r = self._cliente.open(ruta, method=metodo, data=datos, follow_redirects=False)
+        return Respuesta(r.status_code, r.headers, r.get_data())
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP mínimo (urllib) que no sigue redirecciones
+
+    Las cookies se manejan a mano: la de sesión se marca Secure y la cookiejar
+    estándar no la reenviaría a un servidor de pruebas sin HTTPS.
+    """
+
+    def __init__(self, url_base, timeout=30):
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+        self.cookies = {}
+        self._opener = urllib.request.build_opener(_SinRedirecciones)
+
+    def _guardar_cookies(self, headers):
+        for cabecera in headers.get_all('Set-Cookie') or []:
+            galleta = http.cookies.SimpleCookie()
+            galleta.load(cabecera)
+            for nombre, morsel in galleta.items():
+                if morsel.value and morsel['max-age'] not in ('0',):
+                    self.cookies[nombre] = morsel.value
+                else:
+                    self.cookies.pop(nombre, None)
+
+    def request(self, metodo, ruta, datos=None):
+        cuerpo = urllib.parse.urlencode(datos).encode() if datos is not None else None
+        req = urllib.request.Request(self.url_base + ruta, data=cuerpo, method=metodo)
+        if self.cookies:
+            req.add_header('Cookie', '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        try:
+            with self._opener.open(req, timeout=self.timeout) as r:
+                status, headers, body = r.status, r.headers, r.read()
+        except urllib.error.HTTPError as e:  # 3xx/4xx/5xx
+            status, headers, body = e.code, e.headers, e.read()
+        self._guardar_cookies(headers)
+        return Respuesta(status, headers, body)
+
+
+# ============================================
+# MÉTRICAS
+# ============================================
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+class Metricas:
+    """Acumula por paso latencias, errores y consultas a la BD (seguro entre hilos)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pasos = {}
+        self._omitidos = {}
+        self.inicio = time.perf_counter()
+        self.fin = None
+
+    def registrar(self, paso, latencia, ok, consultas=None, tiempo_bd=None, detalle=None):
+        with self._lock:
+            item = self._pasos.setdefault(paso, {
+                'latencias': [], 'errores': 0, 'consultas': [], 'tiempo_bd': [], 'detalles': {},
+            })
+            item['latencias'].append(latencia)
+            if not ok:
+                item['errores'] += 1
+                if detalle:
+                    item['detalles'][detalle] = item['detalles'].get(detalle, 0) + 1
+            if consultas is not None:
+                item['consultas'].append(consultas)
+            if tiempo_bd is not None:
+                item['tiempo_bd'].append(tiempo_bd)
+
+    def omitir(self, motivo):
+        with self._lock:
+            self._omitidos[motivo] = self._omitidos.get(motivo, 0) + 1
+
+    def resumen(self):
+        duracion = (self.fin or time.perf_counter()) - self.inicio
+        with self._lock:
+            pasos = {}
+            for paso, item in self._pasos.items():
+                latencias = sorted(item['latencias'])
+                n = len(latencias)
+                pasos[paso] = {
+                    'n': n,
+                    'errores': item['errores'],
+                    'error_pct': round(100 * item['errores'] / n, 2) if n else 0,
+                    'rps': round(n / duracion, 2) if duracion else None,
+                    **{f'p{p}_ms': round(_percentil(latencias, p) * 1000, 1) for p in (50, 90, 95, 99)},
+                    'max_ms': round(latencias[-1] * 1000, 1),
+                    'consultas_prom': (round(sum(item['consultas']) / len(item['consultas']), 1)
+                                       if item['consultas'] else None),
+                    'consultas_max': max(item['consultas']) if item['consultas'] else None,
+                    'tiempo_bd_prom_ms': (round(sum(item['tiempo_bd']) / len(item['tiempo_bd']), 1)
+                                          if item['tiempo_bd'] else None),
+                    'detalle_errores': dict(item['detalles']),
+                }
+            return {'duracion_s': round(duracion, 2), 'pasos': pasos, 'omitidos': dict(self._omitidos)}
+
+
+# ============================================
+# USUARIOS VIRTUALES
+# ============================================
+
+def _opciones(html, nombre):
+    """Valores no vacíos de las <option> del <select name=...>"""
+    bloque = re.search(r'<select[^>]*name="' + re.escape(nombre) + r'"[^>]*>(.*?)</select>', html, re.S)
+    if not bloque:
+        return []
+    return [v for v in re.findall(r'<option[^>]*value="([^"]*)"', bloque.group(1)) if v]
+
+
+class UsuarioVirtual:
+    """Un usuario que repite el escenario de su rol con su propia sesión"""
+
+    def __init__(self, rol, username, password, cliente, metricas, rng):
+        self.rol = rol
+        self.username = username
+        self.password = password
+        self.cliente = cliente
+        self.metricas = metricas
+        self.rng = rng
+
+    def paso(self, nombre, metodo, ruta, datos=None, esperado=(200,), destino=None):
+        """
+        Ejecuta y mide un request
+
+        Es error si el status no es el esperado, si redirige al login o si la
+        redirección no coincide con `destino`. Retorna la respuesta o None si falló.
+        """
+        inicio = time.perf_counter()
+        try:
+            r = self.cliente.request(metodo, ruta, datos)
+        except Exception as e:
+            self.metricas.registrar(nombre, time.perf_counter() - inicio, False, detalle=type(e).__name__)
+            return None
+        latencia = time.perf_counter() - inicio
+
+        consultas = r.headers.get('X-Consultas-BD')
+        tiempo_bd = r.headers.get('X-Tiempo-BD-ms')
+        detalle = None
+        if r.status not in esperado:
+            detalle = f'HTTP {r.status}'
+        elif '/auth/login' in r.location:
+            detalle = 'redirige al login'
+        elif destino and r.status in (301, 302, 303) and not re.search(destino, r.location):
+            detalle = f'redirige a {urllib.parse.urlsplit(r.location).path}'
+
+        self.metricas.registrar(
+            nombre, latencia, detalle is None,
+            int(consultas) if consultas is not None else None,
+            float(tiempo_bd) if tiempo_bd is not None else None,
+            detalle,
+        )
+        return r if detalle is None else None
+
+    def login(self):
+        return self.paso('auth.login', 'POST', '/auth/login',
+                         {'username': self.username, 'password': self.password},
+                         esperado=(302,), destino=r'/dashboard') is not None
+
+    def iteracion(self):
+        getattr(self, f'escenario_{self.rol}')()
+
+    # --------------------------------------------
+    # Escenarios
+    # --------------------------------------------
+
+    def escenario_tutor(self):
+        r = self.paso('tutor.nueva_cita GET', 'GET', '/tutor/cita/nueva', esperado=(200, 302))
+        if r is None:
+            return
+        if r.status == 302:  # el tutor no tiene mascotas registradas
+            self.metricas.omitir('tutor sin mascotas')
+            return
+
+        html = r.texto
+        mascotas = _opciones(html, 'mascota_id')
+        servicios = _opciones(html, 'servicio_id')
+        veterinarios = _opciones(html, 'veterinario_id')
+        if not (mascotas and servicios and veterinarios):
+            self.metricas.omitir('formulario de cita incompleto')
+            return
+
+        dia = date.today() + timedelta(days=self.rng.randint(1, 30))
+        r = self.paso('tutor.nueva_cita POST', 'POST', '/tutor/cita/nueva', {
+            'mascota_id': self.rng.choice(mascotas),
+            'servicio_id': self.rng.choice(servicios),
+            'veterinario_id': self.rng.choice(veterinarios),
+            'fecha': dia.isoformat(),
+            'hora': f'{self.rng.randint(8, 18):02d}:{self.rng.choice((0, 15, 30, 45)):02d}',
+            'motivo': 'Prueba de carga',
+        }, esperado=(302,), destino=r'/tutor/pagar-cita/\d+')
+        if r is None:
+            return
+        ruta_pago = urllib.parse.urlsplit(r.location).path
+
+        if self.paso('tutor.pagar_cita GET', 'GET', ruta_pago) is None:
+            return
+
+        datos = {'metodo_pago': self.rng.choice(METODOS_PAGO), 'monto': '0'}
+        if self.rng.random() < 0.5:
+            datos.update({
+                'requiere_factura': '1',
+                'tipo_documento': 'nit',
+                'nit_cliente': str(self.rng.randint(1000000, 9999999)),
+                'razon_social': 'Cliente de prueba',
+            })
+        r = self.paso('tutor.pagar_cita POST', 'POST', ruta_pago, datos,
+                      esperado=(302,), destino=r'/tutor/pago-exitoso/\d+')
+        if r is None:
+            return
+        pago_id = re.search(r'/tutor/pago-exitoso/(\d+)', r.location).group(1)
+
+        self.paso('tutor.pago_exitoso', 'GET', f'/tutor/pago-exitoso/{pago_id}')
+        r = self.paso('tutor.descargar_factura', 'GET', f'/tutor/descargar-factura/{pago_id}')
+        if r is not None and not r.body.startswith(b'%PDF'):
+            self.metricas.registrar('tutor.descargar_factura (contenido)', 0, False, detalle='no es PDF')
+
+    def escenario_veterinario(self):
+        if self.paso('veterinario.dashboard', 'GET', '/veterinario/dashboard') is None:
+            return
+        r = self.paso('veterinario.mis_citas', 'GET', '/veterinario/citas/mis-citas?estado=confirmada')
+        if r is None:
+            return
+
+        ids = sorted(set(re.findall(r'/veterinario/cita/(\d+)/atender', r.texto)))
+        if not ids:
+            self.metricas.omitir('veterinario sin citas confirmadas')
+            return
+        ruta = f'/veterinario/cita/{self.rng.choice(ids)}/atender'
+
+        r = self.paso('veterinario.atender_cita GET', 'GET', ruta)
+        if r is None:
+            return
+
+        datos = {
+            'diagnostico': self.rng.choice(DIAGNOSTICOS),
+            'tratamiento': 'Tratamiento sintomático y control en 7 días',
+            'observaciones': 'Prueba de carga',
+        }
+        medicamentos = _opciones(r.texto, 'medicamento_id[]')
+        if medicamentos and self.rng.random() < 0.5:
+            datos.update({
+                'medicamento_id[]': self.rng.choice(medicamentos),
+                'cantidad[]': '1',
+                'dosis[]': '1 cada 12 horas',
+                'duracion[]': '5 días',
+                'indicaciones[]': 'Con comida',
+            })
+        self.paso('veterinario.atender_cita POST', 'POST', ruta, datos,
+                  esperado=(302,), destino=r'/veterinario/citas/mis-citas')
+
+    def escenario_admin(self):
+        ruta = self.rng.choice(RUTAS_ADMIN)
+        self.paso(f'admin {ruta}', 'GET', ruta)
+
+
+# ============================================
+# EJECUCIÓN
+# ============================================
+
+def _parsear_mezcla(texto):
+    mezcla = {}
+    for parte in texto.split(','):
+        rol, _, peso = parte.partition('=')
+        rol = rol.strip()
+        if rol not in ('tutor', 'veterinario', 'admin'):
+            raise argparse.ArgumentTypeError(f'Rol desconocido en la mezcla: {rol}')
+        mezcla[rol] = float(peso or 1)
+    return mezcla
+
+
+def repartir_roles(mezcla, usuarios):
+    """Asigna roles a los usuarios virtuales respetando las proporciones (mayor resto)"""
+    total = sum(mezcla.values())
+    cuotas = {rol: usuarios * peso / total for rol, peso in mezcla.items()}
+    asignados = {rol: int(c) for rol, c in cuotas.items()}
+    for rol in sorted(cuotas, key=lambda r: cuotas[r] - asignados[r], reverse=True):
+        if sum(asignados.values()) >= usuarios:
+            break
+        asignados[rol] += 1
+    roles = []
+    for rol, cantidad in asignados.items():
+        roles.extend([rol] * cantidad)
+    return roles
+
+
+def _cuenta(args, rol, indice):
+    from app.services.datos_sinteticos import PREFIJO_TUTOR, PREFIJO_VETERINARIO
+
+    if rol == 'tutor':
+        return f'{PREFIJO_TUTOR}{indice % args.cuentas_tutor:06d}', args.password
+    if rol == 'veterinario':
+        return f'{PREFIJO_VETERINARIO}{indice % args.cuentas_veterinario:06d}', args.password
+    return args.admin_usuario, args.admin_password
+
+
+def crear_app_en_proceso(args):
+    """Crea la app con la BD indicada y el perfilado de consultas activo"""
+    app = crear_app(args.bd, PERFIL_CONSULTAS=True, WRITE_BEHIND_ENABLED=True)
+
+    if args.preparar:
+        from app.services.arranque import inicializar_bd
+        from app.services.datos_sinteticos import GeneradorDatos, PERFILES
+
+        with app.app_context():
+            inicializar_bd()
+            GeneradorDatos(semilla=args.semilla, **PERFILES[args.perfil]).ejecutar()
+    return app
+
+
+def ejecutar(args):
+    mezcla = _parsear_mezcla(args.mezcla)
+    roles = repartir_roles(mezcla, args.usuarios)
+
+    if args.modo == 'proceso':
+        app = crear_app_en_proceso(args)
+        nuevo_cliente = lambda: ClienteProceso(app)
+    else:
+        nuevo_cliente = lambda: ClienteHTTP(args.url)
+
+    metricas = Metricas()
+    fin = time.perf_counter() + args.duracion if args.duracion else None
+    contadores = {}
+
+    def trabajar(i, rol):
+        indice = contadores[(i, rol)]
+        rng = random.Random(f'{args.semilla}-{rol}-{indice}')
+        time.sleep(args.rampa * i / max(1, len(roles)))
+        username, password = _cuenta(args, rol, indice)
+        usuario = UsuarioVirtual(rol, username, password, nuevo_cliente(), metricas, rng)
+        if not usuario.login():
+            return
+        hechas = 0
+        while True:
+            if fin is not None and time.perf_counter() >= fin:
+                break
+            if args.iteraciones and hechas >= args.iteraciones:
+                break
+            usuario.iteracion()
+            hechas += 1
+            if args.pausa:
+                time.sleep(rng.uniform(0, 2 * args.pausa))
+
+    por_rol = {}
+    for i, rol in enumerate(roles):
+        contadores[(i, rol)] = por_rol.get(rol, 0)
+        por_rol[rol] = por_rol.get(rol, 0) + 1
+
+    print(f"[OK] {len(roles)} usuarios virtuales ({', '.join(f'{r}={n}' for r, n in por_rol.items())}), "
+          f"modo {args.modo}")
+    hilos = [threading.Thread(target=trabajar, args=(i, rol), daemon=True) for i, rol in enumerate(roles)]
+    metricas.inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    metricas.fin = time.perf_counter()
+
+    resumen = metricas.resumen()
+    resumen['parametros'] = {
+        'modo': args.modo, 'usuarios': len(roles), 'mezcla': por_rol,
+        'duracion': args.duracion, 'iteraciones': args.iteraciones, 'semilla': args.semilla,
+    }
+    return resumen
+
+
+def imprimir_resumen(resumen):
+    columnas = ('n', 'error_pct', 'rps', 'p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'max_ms', 'consultas_prom')
+    print(f"\nDuración: {resumen['duracion_s']}s")
+    print(f"{'paso':<34}" + ''.join(f'{c:>15}' for c in columnas))
+    for paso in sorted(resumen['pasos']):
+        datos = resumen['pasos'][paso]
+        print(f'{paso:<34}' + ''.join(f"{'-' if datos[c] is None else datos[c]:>15}" for c in columnas))
+        for detalle, cantidad in datos['detalle_errores'].items():
+            print(f'    ! {detalle}: {cantidad}')
+    for motivo, cantidad in resumen['omitidos'].items():
+        print(f'  (omitido) {motivo}: {cantidad}')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga del flujo de citas y pagos')
+    parser.add_argument('--modo', choices=('proceso', 'http'), default='proceso')
+    parser.add_argument('--url', default='http://localhost:5000', help='Servidor (modo http)')
+    parser.add_argument('--bd', default='sqlite:///carga.db', help='URI de la BD (modo proceso)')
+    parser.add_argument('--preparar', action='store_true',
+                        help='Crear tablas y datos sintéticos antes de la prueba (modo proceso)')
+    parser.add_argument('--perfil', default='pequeno', help='Perfil de datos sintéticos para --preparar')
+    parser.add_argument('--usuarios', type=int, default=10, help='Usuarios virtuales concurrentes')
+    parser.add_argument('--mezcla', default='tutor=70,veterinario=20,admin=10',
+                        help='Proporción de roles, p. ej. tutor=70,veterinario=20,admin=10')
+    parser.add_argument('--duracion', type=float, default=30, help='Segundos de prueba (0 = sin límite)')
+    parser.add_argument('--iteraciones', type=int, default=0, help='Iteraciones por usuario (0 = sin límite)')
+    parser.add_argument('--rampa', type=float, default=0, help='Segundos para arrancar a todos los usuarios')
+    parser.add_argument('--pausa', type=float, default=0, help='Tiempo de pensar promedio entre iteraciones')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--cuentas-tutor', type=int, default=1000, help='Cuentas sint.tutor.* disponibles')
+    parser.add_argument('--cuentas-veterinario', type=int, default=20, help='Cuentas sint.vet.* disponibles')
+    parser.add_argument('--password', default='demo123', help='Contraseña de las cuentas sintéticas')
+    parser.add_argument('--admin-usuario', default='admin')
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--salida', help='Guardar el resumen en un archivo JSON')
+    args = parser.parse_args(argv)
+
+    if args.modo == 'http' and args.preparar:
+        parser.error('--preparar solo aplica al modo proceso (en el servidor: flask generar-datos)')
+    if not args.duracion and not args.iteraciones:
+        parser.error('Indique --duracion o --iteraciones')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    resumen = ejecutar(args)
+    imprimir_resumen(resumen)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resumen, f, indent=2, ensure_ascii=False)
+        print(f"\n[OK] Resumen guardado en {args.salida}")
+    total = sum(p['n'] for p in resumen['pasos'].values())
+    errores = sum(p['errores'] for p in resumen['pasos'].values())
+    return 0 if total and not errores else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
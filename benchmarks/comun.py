@@ -0,0 +1,59 @@
+"""
+Utilidades compartidas por los benchmarks
+"""
+import os
+import sys
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+def crear_app(uri, **extra):
+    """
+    Crea la app (configuración de pruebas) contra la BD indicada
+
+    `extra` sobrescribe otras opciones de configuración (PERFIL_CONSULTAS, etc.).
+    """
+    from config import config, TestingConfig
+    from app import create_app
+
+    atributos = {'TESTING': False, 'SQLALCHEMY_DATABASE_URI': uri, **extra}
+    config['benchmark'] = type('ConfigBenchmark', (TestingConfig,), atributos)
+    return create_app('benchmark')
+
+
+class ContadorConsultas:
+    """
+    Cuenta las sentencias SQL ejecutadas por el hilo actual mientras está activo
+
+        with ContadorConsultas() as contador:
+            ...
+        contador.total
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.total = 0
+
+    @classmethod
+    def _contar(cls, *args):
+        actual = getattr(cls._local, 'contador', None)
+        if actual is not None:
+            actual.total += 1
+
+    def __enter__(self):
+        if not event.contains(Engine, 'before_cursor_execute', ContadorConsultas._contar):
+            event.listen(Engine, 'before_cursor_execute', ContadorConsultas._contar)
+        self._anterior = getattr(self._local, 'contador', None)
+        self._local.contador = self
+        return self
+
+    def __exit__(self, *exc):
+        self._local.contador = self._anterior
+        return False
@@ -0,0 +1,118 @@
+"""
+Perfil de importación y memoria del arranque de un worker
+
+Lanza un intérprete nuevo con `-X importtime` que solo ejecuta create_app() y reporta:
+- Los módulos con mayor tiempo de importación acumulado
+- Si alguna dependencia pesada (pandas, plotly, reportlab, qrcode/PIL...) quedó cargada
+  al arrancar: deben importarse en el primer uso (app/services/carga_diferida.py)
+- El RSS máximo del worker recién arrancado frente al de uno que ya cargó todas
+  las dependencias pesadas (gráficos, Excel, PDF y QR)
+
+Termina con código 1 si se carga alguna dependencia pesada al arrancar o si se
+supera el presupuesto de --max-ms.
+
+Uso:
+    python benchmarks/importacion.py
+    python benchmarks/importacion.py --top 30 --max-ms 1500 --salida importacion.json
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+from comun import RAIZ
+
+CODIGO = '''
+import json, resource, sys, time
+inicio = time.perf_counter()
+from app import create_app
+create_app({config!r})
+segundos = time.perf_counter() - inicio
+from app.services.carga_diferida import MODULOS_PESADOS
+cargados = sorted(m for m in MODULOS_PESADOS if m in sys.modules)
+if {forzar!r}:
+    import pandas, openpyxl, plotly.express, plotly.io, qrcode, reportlab.platypus
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'segundos': segundos, 'pesados': cargados, 'rss_kb': rss,
+                  'modulos': len(sys.modules)}}))
+'''
+
+LINEA_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def perfilar(config, forzar=False):
+    """Ejecuta el arranque en un proceso nuevo y retorna (resultado, filas de importtime)"""
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CODIGO.format(config=config, forzar=forzar)],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr[-2000:])
+
+    filas = []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, modulo = coincidencia.groups()
+            filas.append({
+                'modulo': modulo,
+                'propio_us': int(propio),
+                'acumulado_us': int(acumulado),
+                'nivel': (len(sangria) - 1) // 2,
+            })
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return resultado, filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perfil de importación del arranque')
+    parser.add_argument('--config', default='testing', help='Configuración para create_app()')
+    parser.add_argument('--top', type=int, default=20, help='Módulos a listar')
+    parser.add_argument('--max-ms', type=float, help='Presupuesto de tiempo de importación total')
+    parser.add_argument('--salida', help='Guardar el reporte en un archivo JSON')
+    args = parser.parse_args(argv)
+
+    arranque, filas = perfilar(args.config)
+    completo, _ = perfilar(args.config, forzar=True)
+
+    # Solo los de primer nivel suman el total sin contar dos veces
+    total_ms = sum(f['acumulado_us'] for f in filas if f['nivel'] == 0) / 1000
+    print(f"Arranque (create_app('{args.config}')): {arranque['segundos'] * 1000:.0f} ms, "
+          f"importación {total_ms:.0f} ms, {arranque['modulos']} módulos")
+    print(f"\n{'módulo':<50} {'acumulado':>12} {'propio':>10}")
+    for fila in sorted(filas, key=lambda f: f['acumulado_us'], reverse=True)[:args.top]:
+        print(f"{'  ' * fila['nivel'] + fila['modulo']:<50} "
+              f"{fila['acumulado_us'] / 1000:>10.1f}ms {fila['propio_us'] / 1000:>8.1f}ms")
+
+    print(f"\nRSS por worker: {arranque['rss_kb'] / 1024:.1f} MB al arrancar, "
+          f"{completo['rss_kb'] / 1024:.1f} MB con gráficos/Excel/PDF/QR cargados "
+          f"(+{(completo['rss_kb'] - arranque['rss_kb']) / 1024:.1f} MB)")
+
+    errores = []
+    if arranque['pesados']:
+        errores.append(f"Dependencias pesadas cargadas al arrancar: {', '.join(arranque['pesados'])}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        errores.append(f"Importación de {total_ms:.0f} ms supera el presupuesto de {args.max_ms:.0f} ms")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({
+                'arranque': arranque,
+                'con_dependencias': completo,
+                'importacion_ms': total_ms,
+                'top': sorted(filas, key=lambda f: f['acumulado_us'], reverse=True)[:args.top],
+                'errores': errores,
+            }, f, indent=2, ensure_ascii=False)
+
+    if errores:
+        print()
+        for error in errores:
+            print(f"[ERROR] {error}")
+        return 1
+    print("\n[OK] Ninguna dependencia pesada se carga al arrancar")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
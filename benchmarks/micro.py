@@ -0,0 +1,461 @@
+"""
+Micro-benchmarks de los caminos críticos de los modelos
+
+Mide (al estilo pytest-benchmark: calibración, rondas, mediana/mínimo/desviación)
+los métodos más usados en las vistas y cuenta las consultas a la BD por llamada:
+
+- Medicamento.reducir_stock con muchos lotes
+- Pago.generar_codigo_pago, Pago.generar_qr, Pago.calcular_division_ingresos
+- Mascota.edad_detallada, Mascota.get_historial_peso
+- Usuario.get_estadisticas_veterinario
+- Filtros de plantilla dateformat y currency
+- Arranque en frío: proceso nuevo con la verificación de versión de esquema
+  frente al create_all() + init_database() que se hacía en cada arranque
+
+Los casos con BD se ejecutan contra archivos SQLite con datos sintéticos de varios
+tamaños (se generan una vez y se reutilizan). El resultado se compara con el baseline
+guardado en `benchmarks/baseline.json`: si el tiempo mínimo (o la mediana, con
+--estadistico) empeora más que la tolerancia o aumentan las consultas por llamada,
+el script termina con código 1.
+
+Uso:
+    python benchmarks/micro.py                            # compara con el baseline
+    python benchmarks/micro.py --guardar-baseline         # regenera el baseline
+    python benchmarks/micro.py --tamanos xs,pequeno,mediano --filtro reducir_stock
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from comun import RAIZ, ContadorConsultas, crear_app
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Volúmenes de datos por tamaño (además de los perfiles del generador)
+TAMANOS = {
+    'xs': {'tutores': 100, 'veterinarios': 5, 'mascotas': 300, 'citas': 5000,
+           'medicamentos': 20, 'lotes': 100},
+}
+
+LOTES_REDUCIR_STOCK = (10, 100, 1000)
+FECHA_BASE_DATOS = date(2025, 1, 1)  # fija para que el conjunto sea idéntico entre ejecuciones
+
+
+class Caso:
+    """
+    Un benchmark
+
+    Args:
+        nombre: Identificador estable (clave del baseline)
+        funcion: Lo que se mide
+        preparar: Se ejecuta fuera de la medición antes de cada ronda; si se indica,
+                  cada ronda es una sola llamada (para métodos que modifican estado)
+        rondas: Rondas propias del caso (para los costosos, como lanzar procesos)
+    """
+
+    def __init__(self, nombre, funcion, preparar=None, terminar=None, rondas=None):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.preparar = preparar
+        self.terminar = terminar
+        self.rondas = rondas
+
+
+def medir(caso, rondas=20, tiempo_min=0.01):
+    """
+    Ejecuta el caso y retorna sus estadísticas (segundos por llamada)
+
+    Sin `preparar`, cada ronda repite la función las veces necesarias para durar
+    al menos `tiempo_min` (calibradas en el calentamiento).
+    """
+    rondas = caso.rondas or rondas
+    iteraciones = 1
+    if caso.preparar is None:
+        while True:
+            inicio = time.perf_counter()
+            for _ in range(iteraciones):
+                caso.funcion()
+            transcurrido = time.perf_counter() - inicio
+            if transcurrido >= tiempo_min or iteraciones >= 1_000_000:
+                break
+            iteraciones *= 10 if transcurrido < tiempo_min / 10 else 2
+    else:
+        caso.preparar()
+        caso.funcion()
+
+    tiempos, consultas = [], []
+    for _ in range(rondas):
+        if caso.preparar is not None:
+            caso.preparar()
+        # Sin recolector durante la medición: sus pausas dominan la desviación
+        gc.collect()
+        gc.disable()
+        try:
+            with ContadorConsultas() as contador:
+                inicio = time.perf_counter()
+                for _ in range(iteraciones):
+                    caso.funcion()
+                transcurrido = time.perf_counter() - inicio
+        finally:
+            gc.enable()
+        tiempos.append(transcurrido / iteraciones)
+        consultas.append(contador.total / iteraciones)
+    if caso.terminar is not None:
+        caso.terminar()
+
+    return {
+        'mediana': statistics.median(tiempos),
+        'minimo': min(tiempos),
+        'media': statistics.fmean(tiempos),
+        'desviacion': statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+        'rondas': rondas,
+        'iteraciones': iteraciones,
+        'consultas': round(max(consultas), 2),
+    }
+
+
+# ============================================
+# CASOS
+# ============================================
+
+def casos_sin_datos(app):
+    """Métodos que no consultan la BD: no dependen del tamaño del conjunto"""
+    from app.models import Mascota, Pago
+
+    pago = Pago(codigo_pago='PAG-20250101-0001', monto=150.0, descripcion='Consulta general')
+    division = Pago(monto=350.0)
+    mascota = Mascota(nombre='Firulais', fecha_nacimiento=date(2019, 3, 14))
+    dateformat = app.jinja_env.filters['dateformat']
+    currency = app.jinja_env.filters['currency']
+    momento = datetime(2025, 6, 1, 10, 30)
+
+    return [
+        Caso('Pago.generar_qr', pago.generar_qr),
+        Caso('Pago.calcular_division_ingresos', division.calcular_division_ingresos),
+        Caso('Mascota.edad_detallada', lambda: mascota.edad_detallada),
+        Caso('filtro dateformat', lambda: dateformat(momento)),
+        Caso('filtro dateformat (cadena)', lambda: dateformat('2025-06-01 10:30:00')),
+        Caso('filtro currency', lambda: currency(1234567.891)),
+    ]
+
+
+def _medicamento_con_lotes(cantidad):
+    """Medicamento de prueba con `cantidad` lotes de una unidad (se crea una sola vez)"""
+    from datetime import timedelta
+
+    from sqlalchemy import insert
+
+    from app import db
+    from app.models import Lote, Medicamento
+
+    codigo = f'BENCH-MED-{cantidad}'
+    medicamento = Medicamento.query.filter_by(codigo=codigo).first()
+    if medicamento is None:
+        medicamento = Medicamento(codigo=codigo, nombre=f'Benchmark {cantidad} lotes',
+                                  stock_actual=cantidad, precio_venta=10.0, activo=False)
+        db.session.add(medicamento)
+        db.session.flush()
+        db.session.execute(insert(Lote.__table__), [{
+            'medicamento_id': medicamento.id,
+            'cantidad': 1,
+            'lote': f'BENCH-{cantidad}-{i:05d}',
+            # Vencimientos desordenados para que el ordenamiento PEPS trabaje
+            'fecha_vencimiento': FECHA_BASE_DATOS + timedelta(days=(i * 7919) % (cantidad * 3)),
+            'fecha_ingreso': datetime(2025, 1, 1),
+        } for i in range(cantidad)])
+        db.session.commit()
+    return medicamento.id
+
+
+def casos_con_datos(app):
+    """Métodos que consultan la BD (dependen del tamaño del conjunto)"""
+    from sqlalchemy import func, select
+
+    from app import db
+    from app.models import Cita, HistorialClinico, Mascota, Medicamento, Pago, Usuario
+
+    casos = []
+
+    for cantidad in LOTES_REDUCIR_STOCK:
+        medicamento_id = _medicamento_con_lotes(cantidad)
+        estado = {}
+
+        def preparar(medicamento_id=medicamento_id, estado=estado):
+            # Descarta la reducción anterior: cada ronda parte del mismo stock con los lotes sin cargar
+            db.session.rollback()
+            estado['medicamento'] = db.session.get(Medicamento, medicamento_id)
+            estado['medicamento'].stock_actual
+
+        casos.append(Caso(
+            f'Medicamento.reducir_stock[{cantidad} lotes]',
+            lambda estado=estado, cantidad=cantidad: estado['medicamento'].reducir_stock(cantidad // 2),
+            preparar=preparar,
+            terminar=db.session.rollback,
+        ))
+
+    casos.append(Caso('Pago.generar_codigo_pago', lambda: Pago().generar_codigo_pago()))
+
+    mascota_id = db.session.execute(
+        select(HistorialClinico.mascota_id)
+        .group_by(HistorialClinico.mascota_id)
+        .order_by(func.count().desc(), HistorialClinico.mascota_id)
+        .limit(1)
+    ).scalar()
+    if mascota_id is not None:
+        mascota = db.session.get(Mascota, mascota_id)
+        casos.append(Caso('Mascota.get_historial_peso', mascota.get_historial_peso))
+
+    veterinario_id = db.session.execute(
+        select(Cita.veterinario_id)
+        .group_by(Cita.veterinario_id)
+        .order_by(func.count().desc(), Cita.veterinario_id)
+        .limit(1)
+    ).scalar()
+    if veterinario_id is not None:
+        veterinario = db.session.get(Usuario, veterinario_id)
+        casos.append(Caso('Usuario.get_estadisticas_veterinario', veterinario.get_estadisticas_veterinario))
+
+    # Listado de pagos: la última página por OFFSET frente a la misma por llave
+    from app.services.paginacion import paginar_keyset
+
+    columnas = [(Pago.fecha_creacion, True), (Pago.id, True)]
+    ultima = paginar_keyset(Pago.query, columnas, per_page=20, total=None).last_cursor
+    paginas = max(1, (Pago.query.count() + 19) // 20)
+    casos.append(Caso(
+        'pagos.listar[ultima pagina, offset]',
+        lambda: Pago.query.order_by(Pago.fecha_creacion.desc(), Pago.id.desc())
+        .paginate(page=paginas, per_page=20, error_out=False).items,
+    ))
+    casos.append(Caso(
+        'pagos.listar[ultima pagina, keyset]',
+        lambda: paginar_keyset(Pago.query, columnas, ultima, per_page=20).items,
+    ))
+
+    return casos
+
+
+CODIGO_ARRANQUE = '''
+import sys
+sys.path.insert(0, {benchmarks!r})
+from comun import crear_app
+app = crear_app({uri!r})
+with app.app_context():
+{cuerpo}
+'''
+
+ARRANQUES = {
+    'asegurar_esquema': (
+        '    from app.services.arranque import asegurar_esquema\n'
+        '    asegurar_esquema(app)'
+    ),
+    'create_all + init_database': (
+        '    from app import db, init_database\n'
+        '    db.create_all()\n'
+        '    init_database()'
+    ),
+}
+
+
+def casos_arranque(uri):
+    """Costo de arranque de un worker sobre una BD ya inicializada"""
+    from app import db, init_database
+    from app.services.arranque import asegurar_esquema
+
+    app = crear_app(uri)
+    directorio = os.path.dirname(os.path.abspath(__file__))
+
+    def proceso_nuevo(cuerpo):
+        codigo = CODIGO_ARRANQUE.format(benchmarks=directorio, uri=uri, cuerpo=cuerpo)
+        return lambda: subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, check=True,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def en_contexto(funcion):
+        def llamar():
+            with app.app_context():
+                funcion()
+                db.session.remove()
+        return llamar
+
+    def init_completo():
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.create_all()
+            init_database()
+
+    casos = [
+        Caso('asegurar_esquema', en_contexto(lambda: asegurar_esquema(app))),
+        Caso('create_all + init_database', en_contexto(init_completo)),
+    ]
+    casos.extend(
+        Caso(f'proceso nuevo ({nombre})', proceso_nuevo(cuerpo), rondas=5)
+        for nombre, cuerpo in ARRANQUES.items()
+    )
+    return casos
+
+
+# ============================================
+# EJECUCIÓN
+# ============================================
+
+def preparar_datos(tamano, directorio, semilla):
+    """Retorna la URI de la BD del tamaño indicado, generándola si no existe"""
+    from app.services.arranque import asegurar_esquema
+    from app.services.datos_sinteticos import PERFILES
+
+    volumenes = TAMANOS.get(tamano) or PERFILES[tamano]
+    ruta = os.path.join(directorio, f'{tamano}-s{semilla}.db')
+    uri = f"sqlite:///{ruta}"
+    if os.path.exists(ruta):
+        # Una BD generada con un esquema anterior recibe las tablas e índices nuevos
+        app = crear_app(uri)
+        with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+            asegurar_esquema(app)
+        return uri, False
+
+    os.makedirs(directorio, exist_ok=True)
+    app = crear_app(uri)
+    from app.services.arranque import inicializar_bd
+    from app.services.datos_sinteticos import GeneradorDatos
+
+    with app.app_context():
+        inicializar_bd()
+        GeneradorDatos(semilla=semilla, fecha_base=FECHA_BASE_DATOS,
+                       log=lambda m: None, **volumenes).ejecutar()
+    return uri, True
+
+
+def ejecutar(args):
+    resultados = {}
+    filtro = (args.filtro or '').lower()
+
+    def correr(grupo, casos):
+        for caso in casos:
+            if filtro and filtro not in caso.nombre.lower():
+                continue
+            clave = f'{grupo}/{caso.nombre}'
+            resultados[clave] = medir(caso, rondas=args.rondas)
+            r = resultados[clave]
+            print(f"  {clave:<55} {r['mediana'] * 1e6:>12.1f} µs  "
+                  f"(±{r['desviacion'] * 1e6:.1f}, {r['consultas']:g} consultas)")
+
+    memoria = crear_app('sqlite://')
+    with memoria.app_context():
+        print("Sin BD:")
+        correr('sin_datos', casos_sin_datos(memoria))
+
+    uris = {}
+    for tamano in args.tamanos:
+        inicio = time.perf_counter()
+        uri, generada = uris[tamano] = preparar_datos(tamano, args.datos_dir, args.semilla)
+        if generada:
+            print(f"[OK] Datos '{tamano}' generados en {time.perf_counter() - inicio:.1f}s")
+        app = crear_app(uri)
+        with app.app_context():
+            print(f"Datos '{tamano}':")
+            correr(tamano, casos_con_datos(app))
+            from app import db
+            db.session.remove()
+            db.engine.dispose()
+
+    if uris:
+        print("Arranque:")
+        uri = next(iter(uris.values()))[0]
+        correr('arranque', casos_arranque(uri))
+
+    return resultados
+
+
+def comparar(resultados, baseline, tolerancia, estadistico='minimo'):
+    """Retorna la lista de regresiones respecto al baseline"""
+    regresiones = []
+    print(f"\n{'benchmark':<55} {'baseline':>12} {'actual':>12} {'cambio':>9}")
+    for clave, actual in resultados.items():
+        base = baseline.get(clave)
+        if base is None:
+            print(f"{clave:<55} {'-':>12} {actual[estadistico] * 1e6:>10.1f}µs {'nuevo':>9}")
+            continue
+        cambio = actual[estadistico] / base[estadistico] - 1 if base[estadistico] else 0
+        marca = ''
+        if cambio > tolerancia:
+            marca = '  << más lento'
+            regresiones.append(f"{clave}: {cambio:+.0%} ({estadistico})")
+        if actual['consultas'] > base['consultas']:
+            marca += f"  << consultas {base['consultas']:g} -> {actual['consultas']:g}"
+            regresiones.append(f"{clave}: {base['consultas']:g} -> {actual['consultas']:g} consultas por llamada")
+        print(f"{clave:<55} {base[estadistico] * 1e6:>10.1f}µs {actual[estadistico] * 1e6:>10.1f}µs "
+              f"{cambio:>+8.0%}{marca}")
+    return regresiones
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Micro-benchmarks de los modelos')
+    parser.add_argument('--tamanos', default='xs,pequeno',
+                        type=lambda s: [t.strip() for t in s.split(',') if t.strip()],
+                        help='Conjuntos de datos: xs, pequeno, mediano, grande')
+    parser.add_argument('--filtro', help='Solo los casos cuyo nombre contiene este texto')
+    parser.add_argument('--rondas', type=int, default=20)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--datos-dir', default=os.path.join(tempfile.gettempdir(), 'sistemavete_bench'),
+                        help='Dónde se guardan (y reutilizan) las BD generadas')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--guardar-baseline', action='store_true', help='Reemplazar el baseline con esta ejecución')
+    parser.add_argument('--tolerancia', type=float, default=0.3,
+                        help='Empeoramiento relativo que se considera regresión')
+    parser.add_argument('--estadistico', choices=('minimo', 'mediana'), default='minimo',
+                        help='Estadístico comparado con el baseline (el mínimo es el menos ruidoso)')
+    parser.add_argument('--salida', help='Guardar los resultados en un archivo JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    resultados = ejecutar(args)
+
+    documento = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'resultados': resultados,
+    }
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(documento, f, indent=2, ensure_ascii=False)
+
+    if args.guardar_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                anterior = json.load(f)
+            # Conserva los casos que no se ejecutaron esta vez (otros tamaños o filtros)
+            documento['resultados'] = {**anterior.get('resultados', {}), **resultados}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(documento, f, indent=2, ensure_ascii=False, sort_keys=True)
+        print(f"\n[OK] Baseline guardado en {os.path.relpath(args.baseline, RAIZ)}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo hay baseline; ejecute con --guardar-baseline para crearlo")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['resultados']
+    regresiones = comparar(resultados, baseline, args.tolerancia, args.estadistico)
+    if regresiones:
+        print("\nRegresiones:")
+        for regresion in regresiones:
+            print(f"  - {regresion}")
+        return 1
+    print("\n[OK] Sin regresiones respecto al baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
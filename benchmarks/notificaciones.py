@@ -0,0 +1,234 @@
+"""
+Benchmark del motor de notificaciones con servidores de prueba locales
+
+Levanta un servidor SMTP mínimo y una API de SMS (HTTP) en 127.0.0.1 que solo cuentan
+lo que reciben, y sobre una copia de una BD con muchos tutores sintéticos mide:
+- La creación masiva para la cohorte de todos los tutores (INSERT ... SELECT por bloques)
+- La entrega por email y por SMS (lotes, límite por segundo y reintentos). Con --fallas
+  la API de SMS responde 503 a una de cada N solicitudes para ejercitar los reintentos
+- La lectura del contador de no leídas frente al COUNT que hacía
+  Usuario.get_notificaciones_no_leidas()
+
+Termina con código 1 si algún servidor no recibió exactamente lo que se marcó como
+entregado, o si una segunda entrega vuelve a enviar algo.
+
+Uso:
+    python benchmarks/notificaciones.py
+    python benchmarks/notificaciones.py --tutores 20000 --fallas 7 --salida notificaciones.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from comun import ContadorConsultas, crear_app
+
+
+# ============================================
+# SERVIDORES DE PRUEBA
+# ============================================
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    """SMTP mínimo (sin TLS ni autenticación) que cuenta los mensajes aceptados"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.mensajes = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), ManejadorSMTP)
+
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linea):
+        self.wfile.write(f'{linea}\r\n'.encode())
+
+    def handle(self):
+        self.responder('220 prueba')
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode(errors='replace').strip().upper()
+            if comando.startswith(('EHLO', 'HELO')):
+                self.responder('250 prueba')
+            elif comando == 'DATA':
+                self.responder('354 fin con .')
+                while self.rfile.readline().rstrip(b'\r\n') != b'.':
+                    pass
+                with self.server.lock:
+                    self.server.mensajes += 1
+                self.responder('250 aceptado')
+            elif comando == 'QUIT':
+                self.responder('221 adios')
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.responder('250 ok')
+
+
+class ServidorSMS(ThreadingHTTPServer):
+    """API de SMS que acepta POST JSON; con `fallas` responde 503 a una de cada N"""
+
+    daemon_threads = True
+
+    def __init__(self, fallas=0):
+        self.mensajes = 0
+        self.solicitudes = 0
+        self.fallas = fallas
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), ManejadorSMS)
+
+
+class ManejadorSMS(BaseHTTPRequestHandler):
+    def do_POST(self):
+        cuerpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        servidor = self.server
+        with servidor.lock:
+            servidor.solicitudes += 1
+            falla = servidor.fallas and servidor.solicitudes % servidor.fallas == 0
+            if not falla and cuerpo.get('telefono'):
+                servidor.mensajes += 1
+        self.send_response(503 if falla else 200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar(servidor):
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor.server_address[1]
+
+
+# ============================================
+# DATOS
+# ============================================
+
+def preparar_datos(tutores, directorio, semilla):
+    """Copia de trabajo de una BD con `tutores` tutores sintéticos (se genera una vez)"""
+    base = os.path.join(directorio, f'notificaciones-{tutores}-s{semilla}.db')
+    if not os.path.exists(base):
+        from app.services.arranque import inicializar_bd
+        from app.services.datos_sinteticos import GeneradorDatos
+
+        os.makedirs(directorio, exist_ok=True)
+        print(f"Generando {tutores} tutores (solo la primera vez)...")
+        app = crear_app(f'sqlite:///{base}', PLANIFICADOR_ENABLED=False)
+        with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+            inicializar_bd()
+            GeneradorDatos(semilla=semilla, fecha_base=date(2025, 1, 1), tutores=tutores,
+                           veterinarios=0, mascotas=0, citas=0, medicamentos=0, lotes=0).ejecutar()
+    trabajo = os.path.join(directorio, 'notificaciones-trabajo.db')
+    shutil.copyfile(base, trabajo)
+    return trabajo
+
+
+def medir(funcion):
+    """(resultado, segundos, consultas)"""
+    with ContadorConsultas() as contador:
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+    return resultado, segundos, contador.total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark del motor de notificaciones')
+    parser.add_argument('--tutores', type=int, default=5000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--datos-dir', default=os.path.join(tempfile.gettempdir(), 'sistemavete_bench'))
+    parser.add_argument('--sms-cada', type=int, default=4, help='Uno de cada N tutores acepta SMS')
+    parser.add_argument('--fallas', type=int, default=0, help='La API de SMS falla una de cada N solicitudes')
+    parser.add_argument('--por-segundo', type=float, default=0, help='Límite de envíos por canal (0: sin límite)')
+    parser.add_argument('--salida', help='Guardar los resultados en un archivo JSON')
+    args = parser.parse_args(argv)
+
+    smtp, sms = ServidorSMTP(), ServidorSMS(args.fallas)
+    puerto_smtp, puerto_sms = iniciar(smtp), iniciar(sms)
+    ruta = preparar_datos(args.tutores, args.datos_dir, args.semilla)
+    app = crear_app(
+        f'sqlite:///{ruta}', PLANIFICADOR_ENABLED=False,
+        NOTIFICACIONES_EMAIL=True, MAIL_SERVER='127.0.0.1', MAIL_PORT=puerto_smtp, MAIL_USE_TLS=False,
+        MAIL_USERNAME=None, SMS_API_URL=f'http://127.0.0.1:{puerto_sms}/sms',
+        NOTIFICACIONES_EMAIL_POR_SEGUNDO=args.por_segundo, NOTIFICACIONES_SMS_POR_SEGUNDO=args.por_segundo,
+    )
+
+    from flask import g
+    from sqlalchemy import func, select, update
+    from app import db
+    from app.models import Notificacion, Usuario
+    from app.services import notificaciones
+
+    resultados, errores = {}, []
+    with app.app_context():
+        db.session.execute(update(Usuario).where(Usuario.rol == 'tutor', Usuario.id % args.sms_cada == 0)
+                           .values(notificaciones_sms=True, telefono='70000000'))
+        db.session.commit()
+
+        creadas, segundos, consultas = medir(lambda: notificaciones.notificar_cohorte(
+            'tutores', 'aviso', 'Campaña de vacunación', 'Vacunación antirrábica gratuita este sábado.'))
+        resultados['crear'] = {'notificaciones': creadas, 'segundos': round(segundos, 3), 'consultas': consultas}
+        print(f"Crear para la cohorte: {creadas} notificaciones en {segundos * 1000:.0f} ms, {consultas} consultas")
+
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            entregadas, segundos, consultas = medir(notificaciones.entregar_pendientes)
+        resultados['entregar'] = {**entregadas, 'segundos': round(segundos, 3), 'consultas': consultas,
+                                  'solicitudes_sms': sms.solicitudes}
+        print(f"Entregar: {entregadas.get('email')} emails y {entregadas.get('sms')} SMS en {segundos:.2f} s "
+              f"({consultas} consultas, {sms.solicitudes} solicitudes a la API de SMS)")
+
+        marcadas = {canal: db.session.execute(select(func.count()).where(getattr(Notificacion, f'enviada_{canal}')))
+                    .scalar() for canal in ('email', 'sms')}
+        for canal, recibidos in (('email', smtp.mensajes), ('sms', sms.mensajes)):
+            if marcadas[canal] != recibidos:
+                errores.append(f"{canal}: {marcadas[canal]} marcadas como enviadas, el servidor recibió {recibidos}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            repetidas = notificaciones.entregar_pendientes()
+        if any(repetidas.values()):
+            errores.append(f"La segunda entrega volvió a enviar: {repetidas}")
+
+        usuario_id = db.session.execute(select(Usuario.id).where(Usuario.rol == 'tutor').limit(1)).scalar()
+        inicio = time.perf_counter()
+        for _ in range(200):
+            db.session.get(Usuario, usuario_id).notificaciones.filter_by(leida=False).count()
+            db.session.expunge_all()
+        count_ms = (time.perf_counter() - inicio) / 200 * 1000
+        inicio = time.perf_counter()
+        for _ in range(200):
+            db.session.expunge_all()
+            g.pop('notificaciones_no_leidas', None)
+            notificaciones.no_leidas(usuario_id)
+        contador_ms = (time.perf_counter() - inicio) / 200 * 1000
+        resultados['no_leidas'] = {'count_ms': round(count_ms, 3), 'contador_ms': round(contador_ms, 3)}
+        print(f"No leídas: contador {contador_ms:.3f} ms (1 consulta) frente a carga + COUNT {count_ms:.3f} ms")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({'tutores': args.tutores, 'resultados': resultados, 'errores': errores},
+                      f, indent=2, ensure_ascii=False)
+
+    smtp.shutdown()
+    sms.shutdown()
+    if errores:
+        print()
+        for error in errores:
+            print(f"[ERROR] {error}")
+        return 1
+    print("\n[OK] Cada canal recibió exactamente lo que se marcó como entregado")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
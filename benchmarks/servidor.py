@@ -0,0 +1,174 @@
+"""
+Comparación servidor de desarrollo (Werkzeug) vs Gunicorn con preload
+
+Levanta cada servidor contra la misma BD SQLite con datos sintéticos, ejecuta la
+prueba de carga por HTTP (benchmarks/carga.py) y compara tiempo de arranque,
+throughput, latencias por paso y memoria (PSS total del árbol de procesos, que
+refleja lo compartido copy-on-write entre workers).
+
+Solo Linux (Gunicorn y /proc).
+
+Uso:
+    python benchmarks/servidor.py --usuarios 20 --duracion 30
+    python benchmarks/servidor.py --servidores gunicorn --workers 4 --hilos 4
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import carga
+from comun import RAIZ
+from micro import preparar_datos
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def comando_servidor(nombre, uri, puerto, args):
+    fabrica = f"crear_app({uri!r}, PERFIL_CONSULTAS=True)"
+    if nombre == 'dev':
+        codigo = (f"from comun import crear_app\n"
+                  f"{fabrica}.run(host='127.0.0.1', port={puerto}, threaded=True)")
+        return [sys.executable, '-c', codigo], {}
+    return [
+        sys.executable, '-m', 'gunicorn',
+        '-c', os.path.join(RAIZ, 'gunicorn.conf.py'),
+        '--bind', f'127.0.0.1:{puerto}',
+        '--pythonpath', DIRECTORIO,
+        '--access-logfile', os.devnull,
+        f'comun:{fabrica}',
+    ], {
+        'FLASK_CONFIG': 'testing',
+        'WEB_WORKERS': str(args.workers),
+        'WEB_THREADS': str(args.hilos),
+    }
+
+
+def esperar_listo(proceso, url, limite=120):
+    """Segundos hasta que el servidor responde la página de login"""
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'El servidor terminó con código {proceso.returncode}')
+        try:
+            with urllib.request.urlopen(url + '/auth/login', timeout=2) as r:
+                if r.status == 200:
+                    return time.perf_counter() - inicio
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'El servidor no respondió en {limite}s')
+
+
+def _descendientes(pid):
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            for hijo in f.read().split():
+                pids.extend(_descendientes(int(hijo)))
+    except OSError:
+        pass
+    return pids
+
+
+def memoria_mb(pid):
+    """(PSS, RSS) en MB sumados sobre el proceso y sus hijos"""
+    pss = rss = 0
+    for proceso in _descendientes(pid):
+        try:
+            with open(f'/proc/{proceso}/smaps_rollup') as f:
+                for linea in f:
+                    if linea.startswith('Pss:'):
+                        pss += int(linea.split()[1])
+                    elif linea.startswith('Rss:'):
+                        rss += int(linea.split()[1])
+        except OSError:
+            pass
+    return round(pss / 1024, 1), round(rss / 1024, 1)
+
+
+def medir_servidor(nombre, uri, puerto, args):
+    comando, entorno = comando_servidor(nombre, uri, puerto, args)
+    proceso = subprocess.Popen(
+        comando, cwd=DIRECTORIO, env={**os.environ, **entorno},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    url = f'http://127.0.0.1:{puerto}'
+    try:
+        arranque = esperar_listo(proceso, url)
+        resumen = carga.ejecutar(carga.parse_args([
+            '--modo', 'http', '--url', url,
+            '--usuarios', str(args.usuarios), '--duracion', str(args.duracion),
+            '--mezcla', args.mezcla, '--semilla', str(args.semilla),
+            '--cuentas-tutor', str(args.cuentas_tutor),
+            '--cuentas-veterinario', str(args.cuentas_veterinario),
+        ]))
+        pss, rss = memoria_mb(proceso.pid)
+    finally:
+        os.killpg(proceso.pid, signal.SIGTERM)
+        try:
+            proceso.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proceso.pid, signal.SIGKILL)
+
+    pasos = resumen['pasos']
+    total = sum(p['n'] for p in pasos.values())
+    errores = sum(p['errores'] for p in pasos.values())
+    return {
+        'arranque_s': round(arranque, 2),
+        'requests': total,
+        'rps': round(total / resumen['duracion_s'], 1),
+        'error_pct': round(100 * errores / total, 2) if total else 0,
+        'pss_mb': pss,
+        'rss_mb': rss,
+        'p95_ms': {paso: datos['p95_ms'] for paso, datos in pasos.items()},
+    }
+
+
+def imprimir(resultados):
+    nombres = list(resultados)
+    print(f"\n{'':<34}" + ''.join(f'{n:>16}' for n in nombres))
+    for clave in ('arranque_s', 'requests', 'rps', 'error_pct', 'pss_mb', 'rss_mb'):
+        print(f'{clave:<34}' + ''.join(f'{resultados[n][clave]:>16}' for n in nombres))
+    pasos = sorted({p for r in resultados.values() for p in r['p95_ms']})
+    print('\np95 por paso (ms)')
+    for paso in pasos:
+        print(f'{paso:<34}' + ''.join(f"{resultados[n]['p95_ms'].get(paso, '-'):>16}" for n in nombres))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servidor de desarrollo vs Gunicorn')
+    parser.add_argument('--servidores', default='dev,gunicorn')
+    parser.add_argument('--tamano', default='xs', help='Conjunto de datos sintéticos (ver micro.py)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--datos-dir', default=os.path.join(tempfile.gettempdir(), 'sistemavete_bench'))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--duracion', type=float, default=20)
+    parser.add_argument('--mezcla', default='tutor=70,veterinario=20,admin=10')
+    parser.add_argument('--cuentas-tutor', type=int, default=100)
+    parser.add_argument('--cuentas-veterinario', type=int, default=5)
+    parser.add_argument('--puerto', type=int, default=5199)
+    parser.add_argument('--salida', help='Guardar la comparación en un archivo JSON')
+    args = parser.parse_args(argv)
+
+    uri, _ = preparar_datos(args.tamano, args.datos_dir, args.semilla)
+    resultados = {}
+    for i, nombre in enumerate(args.servidores.split(',')):
+        print(f"[OK] Midiendo servidor '{nombre}'...")
+        resultados[nombre] = medir_servidor(nombre, uri, args.puerto + i, args)
+    imprimir(resultados)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,54 @@ from urllib.parse import quote_plus
 # Cargar variables de entorno
 load_dotenv()
 
+
+def _entero_env(nombre, defecto):
+    return int(os.environ.get(nombre) or defecto)
+
+
+def capacidad_web():
+    """(workers, hilos por worker) del servidor de aplicaciones (ver gunicorn.conf.py)"""
+    workers = _entero_env('WEB_WORKERS', (os.cpu_count() or 1) * 2 + 1)
+    hilos = _entero_env('WEB_THREADS', 4)
+    return workers, hilos
+
+
+def opciones_pool(workers=None, hilos=None):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS dimensionado según los workers y los hilos de cada uno
+
+    - pool_size: un hilo atiende un request a la vez, así que una conexión por hilo
+      evita esperas en el pool en estado estable.
+    - max_overflow: margen para los hilos de fondo (escritura diferida, auditoría) y picos.
+    - DB_MAX_CONEXIONES: límite total de conexiones que el servidor de BD admite para
+      la aplicación; se reparte entre los workers recortando primero el overflow.
+    - pool_pre_ping valida con un SELECT 1 al tomar la conexión; pool_recycle cierra
+      conexiones más viejas que DB_POOL_RECYCLE segundos antes de que lo haga un firewall.
+    - pool_use_lifo reutiliza siempre las conexiones más recientes y deja envejecer las
+      sobrantes, lo que reduce la rotación de conexiones fuera de los picos.
+    """
+    workers_defecto, hilos_defecto = capacidad_web()
+    workers = workers or workers_defecto
+    hilos = hilos or hilos_defecto
+
+    pool_size = _entero_env('DB_POOL_SIZE', hilos)
+    max_overflow = _entero_env('DB_POOL_OVERFLOW', max(2, hilos // 2))
+    limite = _entero_env('DB_MAX_CONEXIONES', 0)
+    if limite:
+        por_worker = max(1, limite // workers)
+        pool_size = min(pool_size, por_worker)
+        max_overflow = max(0, min(max_overflow, por_worker - pool_size))
+
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': _entero_env('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _entero_env('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,
+    }
+
+
 class Config:
     """Configuración base"""
     # Configuración de la aplicación
@@ -29,6 +77,8 @@ class Config:
     LOGIN_VIEW = 'auth.login'
     LOGIN_MESSAGE = 'Por favor, inicia sesión para acceder a esta página.'
     LOGIN_MESSAGE_CATEGORY = 'info'
+    PRINCIPAL_CACHE_TTL = 60  # segundos antes de revalidar rol/activo contra la BD
+    PRINCIPAL_SINCRONIZACION = 5  # segundos entre lecturas de la generación de principales (por proceso)
     
     # Configuración de correo
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
@@ -43,6 +93,60 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx'}
     
+    # Configuración de assets estáticos (ver `flask build-assets`)
+    ASSETS_FINGERPRINT = True
+    ASSETS_MAX_AGE = 31536000  # 1 año, los nombres con huella son inmutables
+    
+    # Configuración de compresión de respuestas HTML/JSON
+    COMPRESS_MIN_SIZE = 1024  # bytes
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIMETYPES = ('text/html', 'application/json')
+    
+    # Escritura diferida de último acceso y auditoría de login
+    WRITE_BEHIND_ENABLED = True
+    WRITE_BEHIND_INTERVALO = 5  # segundos entre vaciados
+    WRITE_BEHIND_MAX_PENDIENTES = 50  # vaciado anticipado al alcanzar este número
+
+    # Auditoría
+    AUDITORIA_CAPACIDAD_COLA = 5000  # máximo de registros en memoria antes de vaciar en el momento
+    AUDITORIA_DIAS_ACTIVOS = 90  # antigüedad a partir de la cual se mueven a la tabla de archivo
+
+    # Tareas programadas (ver app/services/planificador.py); con PLANIFICADOR=0 solo por `flask ejecutar-tareas`
+    PLANIFICADOR_ENABLED = os.environ.get('PLANIFICADOR', '1') == '1'
+    PLANIFICADOR_INTERVALO = 30  # segundos entre revisiones de tareas pendientes
+
+    # Entrega de notificaciones (ver app/services/notificaciones.py)
+    NOTIFICACIONES_EMAIL = os.environ.get('NOTIFICACIONES_EMAIL') == '1'  # por SMTP con MAIL_*
+    SMS_API_URL = os.environ.get('SMS_API_URL')  # POST JSON {telefono, mensaje}; sin URL no se envían SMS
+    SMS_API_TOKEN = os.environ.get('SMS_API_TOKEN')
+    NOTIFICACIONES_EMAIL_POR_SEGUNDO = 10
+    NOTIFICACIONES_SMS_POR_SEGUNDO = 5
+    NOTIFICACIONES_VENTANA_HORAS = 24  # las que no salieron en este plazo ya no se reintentan
+    NOTIFICACIONES_URL_BASE = os.environ.get('URL_BASE')  # para los enlaces de los emails
+
+    # Eventos en vivo para los veterinarios (ver app/services/eventos.py)
+    EVENTOS_INTERVALO = 1.0  # segundos entre lecturas de eventos nuevos (solo con navegadores conectados)
+    EVENTOS_ESPERA_HUECOS = 10  # segundos que se reconsulta un id saltado (INSERT de otro worker aún sin confirmar)
+    EVENTOS_MAX_STREAMS = _entero_env('EVENTOS_MAX_STREAMS', 0)  # por proceso; 0: la mitad de WEB_THREADS
+    EVENTOS_SSE_DURACION = 120  # segundos por conexión SSE antes de reconectar (libera el hilo)
+    EVENTOS_RETENCION_HORAS = 24
+
+    # Cabeceras X-Consultas-BD / X-Tiempo-BD-ms por request (benchmarks/carga.py)
+    PERFIL_CONSULTAS = os.environ.get('PERFIL_CONSULTAS') == '1'
+    
+    # Arranque: inicializar la BD automáticamente si falta la versión de esquema (si no, `flask init-db`)
+    AUTO_INIT_DB = os.environ.get('AUTO_INIT_DB', '1') == '1'
+    
+    # Réplica de solo lectura para reportes y exportaciones (ver app/services/replica.py)
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    REPLICA_MAX_RETRASO = int(os.environ.get('REPLICA_MAX_RETRASO') or 30)  # segundos de datos desactualizados tolerados
+    REPLICA_VERIFICAR_CADA = 5  # segundos entre mediciones del retraso
+    
+    # Métricas del pool de conexiones por worker (ver app/services/pool_bd.py)
+    POOL_METRICAS = os.environ.get('POOL_METRICAS', '1') == '1'
+    POOL_METRICAS_INTERVALO = 300  # segundos entre resúmenes en el log
+    POOL_UMBRAL_ESPERA_MS = 50  # checkout más lento que esto cuenta como espera por conexión
+    
     # Configuración de paginación
     ITEMS_PER_PAGE = 10
     
@@ -91,10 +195,8 @@ class DevelopmentSQLServerConfig(Config):
     )
     
     SQLALCHEMY_DATABASE_URI = f'mssql+pyodbc:///?odbc_connect={quote_plus(connection_params)}'
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 3600,
-    }
+    # Servidor de desarrollo: un solo proceso con hilos
+    SQLALCHEMY_ENGINE_OPTIONS = opciones_pool(workers=1)
     
 class ProductionConfig(Config):
     """Configuración de producción con SQL Server"""
@@ -118,12 +220,7 @@ class ProductionConfig(Config):
     )
     
     SQLALCHEMY_DATABASE_URI = f'mssql+pyodbc:///?odbc_connect={quote_plus(connection_params)}'
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 3600,
-        'pool_size': 10,
-        'max_overflow': 20
-    }
+    SQLALCHEMY_ENGINE_OPTIONS = opciones_pool()
     
     @classmethod
     def init_app(cls, app):
@@ -142,6 +239,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    WRITE_BEHIND_ENABLED = False  # Escrituras síncronas para pruebas deterministas
+    PLANIFICADOR_ENABLED = False  # Las tareas se ejecutan a mano en las pruebas
 
 class SQLServerConfig(Config):
     """
@@ -198,8 +297,7 @@ class SQLServerConfig(Config):
 
     SQLALCHEMY_DATABASE_URI = get_sqlserver_uri.__func__()
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 3600,
+        **opciones_pool(),
         'echo_pool': False
     }
 
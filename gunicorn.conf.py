@@ -0,0 +1,92 @@
+"""
+Configuración de Gunicorn para producción (Linux)
+
+    FLASK_CONFIG=production gunicorn -c gunicorn.conf.py wsgi:app
+
+- preload_app: la app se importa una vez en el maestro y los workers se crean con
+  fork, compartiendo copy-on-write los módulos importados.
+- Workers e hilos: config.capacidad_web(); el pool de cada worker se dimensiona con
+  los mismos valores (config.opciones_pool), una conexión por hilo más overflow.
+- Reciclado: cada worker se reinicia tras WEB_MAX_REQUESTS requests (+ jitter
+  aleatorio para que no se reinicien todos a la vez).
+- Recarga sin cortes: con preload_app, HUP no vuelve a importar el código. Para
+  desplegar código nuevo: `kill -USR2 <maestro>` (arranca un maestro nuevo), luego
+  `kill -WINCH <maestro anterior>` y, cuando los nuevos workers respondan,
+  `kill -QUIT <maestro anterior>`.
+
+Variables de entorno: WEB_BIND, WEB_WORKERS, WEB_THREADS, WEB_MAX_REQUESTS,
+WEB_MAX_REQUESTS_JITTER, WEB_TIMEOUT, WEB_GRACEFUL_TIMEOUT, FLASK_CONFIG y las del
+pool (DB_POOL_SIZE, DB_POOL_OVERFLOW, DB_MAX_CONEXIONES, DB_POOL_RECYCLE, DB_POOL_TIMEOUT).
+"""
+import os
+import sys
+
+# Permite lanzar gunicorn desde otro directorio (--chdir, systemd, benchmarks)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import capacidad_web  # noqa: E402
+
+
+def _entero(nombre, defecto):
+    return int(os.environ.get(nombre) or defecto)
+
+
+def opciones_pool_activas():
+    """(pool_size, max_overflow) de la configuración activa (defaults de SQLAlchemy si no se fijan)"""
+    # `config` es el nombre de una opción de gunicorn: no puede quedar a nivel de módulo
+    from config import config
+
+    clase = config[os.environ.get('FLASK_CONFIG', 'production')]
+    opciones = getattr(clase, 'SQLALCHEMY_ENGINE_OPTIONS', None) or {}
+    return opciones.get('pool_size', 5), opciones.get('max_overflow', 10)
+
+
+pool_size, max_overflow = opciones_pool_activas()
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:8000')
+workers, threads = capacidad_web()
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+preload_app = True
+
+max_requests = _entero('WEB_MAX_REQUESTS', 1000)
+max_requests_jitter = _entero('WEB_MAX_REQUESTS_JITTER', max(1, max_requests // 10))
+
+timeout = _entero('WEB_TIMEOUT', 60)
+graceful_timeout = _entero('WEB_GRACEFUL_TIMEOUT', 30)
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    workers, threads = server.cfg.workers, server.cfg.threads
+    conexiones = workers * (pool_size + max_overflow)
+    server.log.info(
+        f"[OK] {workers} workers x {threads} hilos ({server.cfg.worker_class_str}); pool por worker "
+        f"{pool_size}+{max_overflow}, hasta {conexiones} conexiones a la BD"
+    )
+    if threads > pool_size + max_overflow:
+        server.log.warning(
+            f"[WARN] {threads} hilos por worker y solo {pool_size + max_overflow} conexiones "
+            f"en el pool: los requests esperarán conexión en los picos"
+        )
+
+
+def post_fork(server, worker):
+    """Cada worker descarta las conexiones heredadas del maestro y abre las suyas"""
+    from app import db
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Resumen de las métricas del pool del worker que termina (reciclado o apagado)"""
+    from app.services.pool_bd import metricas
+
+    # resumen() descarta los contadores heredados del maestro (preload) si el worker no los tocó
+    if metricas.resumen()['checkouts']:
+        server.log.info(f"[POOL] {metricas.resumen_texto()}")
@@ -0,0 +1,72 @@
+-- Script para el pipeline de auditoría en SQL Server
+-- Crea el catálogo de user-agents, la tabla de archivo y el índice por entidad
+
+-- 1. Catálogo de user-agents (una fila por cadena distinta)
+IF OBJECT_ID('user_agents', 'U') IS NULL
+BEGIN
+    CREATE TABLE user_agents (
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        huella VARCHAR(40) NOT NULL,
+        valor NVARCHAR(MAX) NOT NULL
+    );
+    CREATE UNIQUE INDEX ix_user_agents_huella ON user_agents (huella);
+    PRINT '✓ Tabla user_agents creada';
+END
+ELSE
+BEGIN
+    PRINT '⚠ Tabla user_agents ya existe';
+END
+
+-- 2. Referencia al user-agent en auditoria_acciones
+IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.COLUMNS
+               WHERE TABLE_NAME = 'auditoria_acciones' AND COLUMN_NAME = 'user_agent_id')
+BEGIN
+    ALTER TABLE auditoria_acciones ADD user_agent_id INT NULL
+        CONSTRAINT fk_auditoria_user_agent FOREIGN KEY REFERENCES user_agents(id);
+    PRINT '✓ Columna user_agent_id agregada';
+END
+ELSE
+BEGIN
+    PRINT '⚠ Columna user_agent_id ya existe';
+END
+
+-- 3. Índices de consulta
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'ix_auditoria_entidad_fecha')
+BEGIN
+    CREATE INDEX ix_auditoria_entidad_fecha ON auditoria_acciones (entidad, entidad_id, fecha);
+    PRINT '✓ Índice ix_auditoria_entidad_fecha creado';
+END
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'ix_auditoria_acciones_fecha')
+BEGIN
+    CREATE INDEX ix_auditoria_acciones_fecha ON auditoria_acciones (fecha);
+    PRINT '✓ Índice ix_auditoria_acciones_fecha creado';
+END
+
+-- 4. Tabla de archivo (registros antiguos, ver `flask archivar-auditoria`)
+IF OBJECT_ID('auditoria_acciones_archivo', 'U') IS NULL
+BEGIN
+    CREATE TABLE auditoria_acciones_archivo (
+        id INT PRIMARY KEY,
+        usuario_id INT NULL,
+        accion NVARCHAR(100) NULL,
+        entidad NVARCHAR(50) NULL,
+        entidad_id INT NULL,
+        descripcion NVARCHAR(MAX) NOT NULL,
+        datos_anteriores NVARCHAR(MAX) NULL,
+        datos_nuevos NVARCHAR(MAX) NULL,
+        ip_address VARCHAR(45) NULL,
+        user_agent NVARCHAR(MAX) NULL,
+        user_agent_id INT NULL,
+        fecha DATETIME NULL
+    );
+    CREATE INDEX ix_auditoria_archivo_entidad_fecha
+        ON auditoria_acciones_archivo (entidad, entidad_id, fecha);
+    PRINT '✓ Tabla auditoria_acciones_archivo creada';
+END
+ELSE
+BEGIN
+    PRINT '⚠ Tabla auditoria_acciones_archivo ya existe';
+END
+
+PRINT 'Cambios aplicados correctamente.';
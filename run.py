@@ -2,8 +2,9 @@
 Punto de entrada de la aplicación Flask Veterinaria
 """
 import os
-from app import create_app, db, init_database
+from app import create_app, db
 from app.models import *
+from app.services.arranque import asegurar_esquema
 
 # Obtener configuración del entorno
 # CORRECCIÓN: Leer 'FLASK_CONFIG' y usar 'default' (SQL Server) como fallback
@@ -14,11 +15,9 @@ app = create_app(config_name)
 
 # Contexto de la aplicación
 with app.app_context():
-    # Crear todas las tablas
-    db.create_all()
-    
-    # Inicializar datos de ejemplo
-    init_database()
+    # Solo verifica la versión del esquema (una consulta); la creación de tablas y
+    # datos base se hace una única vez, o con `flask init-db`
+    asegurar_esquema(app)
     
     print(f"""
     ========================================
@@ -36,7 +35,7 @@ with app.app_context():
     """)
 
 if __name__ == '__main__':
-    # Ejecutar la aplicación
+    # Servidor de desarrollo. En producción: gunicorn -c gunicorn.conf.py wsgi:app
     app.run(
         host='0.0.0.0',
         port=5000,
@@ -1,6 +1,8 @@
 from app import create_app, db
 from app.models.servicio import Servicio
 from app.models.user import Usuario
+from app.services.carga_masiva import upsert_por_clave
+from werkzeug.security import generate_password_hash
 from datetime import date
 
 app = create_app()
@@ -51,21 +53,15 @@ def seed_services():
     ]
 
     print("Sembrando servicios...")
-    for s in servicios:
-        servicio = Servicio.query.filter_by(codigo=s['codigo']).first()
-        if not servicio:
-            nuevo_servicio = Servicio(
-                codigo=s['codigo'],
-                nombre=s['nombre'],
-                categoria=s['categoria'],
-                descripcion=s['descripcion'],
-                precio=s['precio'],
-                duracion_estimada=s['duracion']
-            )
-            db.session.add(nuevo_servicio)
-            print(f"  + Creado: {s['nombre']}")
-        else:
-            print(f"  * Ya existe: {s['nombre']}")
+    insertados, _ = upsert_por_clave(Servicio, 'codigo', [{
+        'codigo': s['codigo'],
+        'nombre': s['nombre'],
+        'categoria': s['categoria'],
+        'descripcion': s['descripcion'],
+        'precio': s['precio'],
+        'duracion_estimada': s['duracion']
+    } for s in servicios])
+    print(f"  + Creados: {insertados} | * Ya existían: {len(servicios) - insertados}")
     
     db.session.commit()
 
@@ -107,24 +103,20 @@ def seed_veterinarians():
     ]
 
     print("\nSembrando veterinarios...")
-    for v in veterinarios:
-        user = Usuario.query.filter_by(email=v['email']).first()
-        if not user:
-            nuevo_vet = Usuario(
-                username=v['email'].split('@')[0],
-                email=v['email'],
-                password=v['password'],
-                nombre=v['nombre'],
-                apellido=v['apellido'],
-                rol='veterinario',
-                especialidad=v['especialidad'],
-                licencia_profesional=v['licencia'],
-                activo=True
-            )
-            db.session.add(nuevo_vet)
-            print(f"  + Creado: Dr. {v['nombre']} {v['apellido']}")
-        else:
-            print(f"  * Ya existe: Dr. {v['nombre']} {v['apellido']}")
+    # Un hash por contraseña distinta (generar cada hash es lento)
+    hashes = {p: generate_password_hash(p) for p in {v['password'] for v in veterinarios}}
+    insertados, _ = upsert_por_clave(Usuario, 'email', [{
+        'username': v['email'].split('@')[0],
+        'email': v['email'],
+        'password_hash': hashes[v['password']],
+        'nombre': v['nombre'],
+        'apellido': v['apellido'],
+        'rol': 'veterinario',
+        'especialidad': v['especialidad'],
+        'licencia_profesional': v['licencia'],
+        'activo': True
+    } for v in veterinarios])
+    print(f"  + Creados: {insertados} | * Ya existían: {len(veterinarios) - insertados}")
 
     db.session.commit()
 
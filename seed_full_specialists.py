@@ -4,6 +4,8 @@ Script to seed comprehensive list of specialists and services.
 from app import create_app, db
 from app.models.servicio import Servicio
 from app.models.user import Usuario
+from app.services.carga_masiva import upsert_por_clave
+from werkzeug.security import generate_password_hash
 
 app = create_app()
 
@@ -61,21 +63,15 @@ def seed_data():
     ]
 
     print("=== SEMBRANDO SERVICIOS ===")
-    for s in services_data:
-        servicio = Servicio.query.filter_by(codigo=s['codigo']).first()
-        if not servicio:
-            nuevo_servicio = Servicio(
-                codigo=s['codigo'],
-                nombre=s['nombre'],
-                categoria=s['categoria'],
-                descripcion=s['descripcion'],
-                precio=s['precio'],
-                duracion_estimada=s['duracion']
-            )
-            db.session.add(nuevo_servicio)
-            print(f"  + Creado: {s['nombre']}")
-        else:
-            print(f"  * Ya existe: {s['nombre']}")
+    insertados, _ = upsert_por_clave(Servicio, 'codigo', [{
+        'codigo': s['codigo'],
+        'nombre': s['nombre'],
+        'categoria': s['categoria'],
+        'descripcion': s['descripcion'],
+        'precio': s['precio'],
+        'duracion_estimada': s['duracion']
+    } for s in services_data])
+    print(f"  + Creados: {insertados} | * Ya existían: {len(services_data) - insertados}")
     
     db.session.commit()
 
@@ -126,29 +122,20 @@ def seed_data():
     ]
 
     print("\n=== SEMBRANDO VETERINARIOS ===")
-    for v in vets_data:
-        user = Usuario.query.filter_by(email=v['email']).first()
-        if not user:
-            nuevo_vet = Usuario(
-                username=v['email'].split('@')[0],
-                email=v['email'],
-                password='vet123', # Default password
-                nombre=v['nombre'],
-                apellido=v['apellido'],
-                rol='veterinario',
-                especialidad=v['especialidad'],
-                licencia_profesional=v['licencia'],
-                activo=True,
-                verificado=True
-            )
-            db.session.add(nuevo_vet)
-            print(f"  + Creado: Dr. {v['nombre']} {v['apellido']} ({v['especialidad']})")
-        else:
-            print(f"  * Ya existe: Dr. {v['nombre']} {v['apellido']}")
-            # Update specialty if needed to match new service names
-            if user.especialidad != v['especialidad']:
-                user.especialidad = v['especialidad']
-                print(f"    -> Actualizada especialidad a: {v['especialidad']}")
+    password_hash = generate_password_hash('vet123') # Default password
+    insertados, actualizados = upsert_por_clave(Usuario, 'email', [{
+        'username': v['email'].split('@')[0],
+        'email': v['email'],
+        'password_hash': password_hash,
+        'nombre': v['nombre'],
+        'apellido': v['apellido'],
+        'rol': 'veterinario',
+        'especialidad': v['especialidad'],
+        'licencia_profesional': v['licencia'],
+        'activo': True,
+        'verificado': True
+    } for v in vets_data], actualizar=('especialidad',))  # Update specialty to match new service names
+    print(f"  + Creados: {insertados} | -> Especialidad actualizada: {actualizados}")
 
     db.session.commit()
     print("\n=== PROCESO COMPLETADO ===")
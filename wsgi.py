@@ -0,0 +1,20 @@
+"""
+Punto de entrada WSGI para producción
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Con `preload_app` (ver gunicorn.conf.py) este módulo se importa una sola vez en el
+proceso maestro y los workers se crean con fork, compartiendo los módulos ya cargados.
+"""
+import os
+
+from app import create_app, db
+from app.services.arranque import asegurar_esquema
+
+app = create_app(os.getenv('FLASK_CONFIG', 'production'))
+
+with app.app_context():
+    asegurar_esquema(app)
+    db.session.remove()
+    # Las conexiones abiertas en el maestro no deben heredarse a los workers
+    db.engine.dispose()